@@ -0,0 +1,56 @@
+# 同一直播间下完整浏览器与精简无头配置的CPU/内存对比（需要psutil和Chrome）
+# 用法: python benchmarks/bench_browser_profiles.py <直播间链接> [每种配置采样秒数]
+import sys
+import os
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.crawler.live_crawler import LiveCrawler, PROFILE_FULL, PROFILE_LEAN
+
+
+def measure(live_url, profile, seconds):
+    """采集指定时长，每秒采样一次浏览器资源占用"""
+    crawler = LiveCrawler(profile=profile)
+    crawler.setup()
+    samples = []
+    message_count = 0
+    try:
+        crawler.start(live_url)
+        crawler.sample_browser_usage()  # 第一次采样只用于初始化CPU计数
+        end = time.time() + seconds
+        next_sample = time.time() + 1
+        while time.time() < end:
+            message_count += len(crawler.fetch_messages())
+            if time.time() >= next_sample:
+                next_sample += 1
+                usage = crawler.sample_browser_usage()
+                if usage:
+                    samples.append(usage)
+            time.sleep(0.2)
+    finally:
+        crawler.close()
+
+    if not samples:
+        print(f"[{profile}] 没有采样数据")
+        return
+    cpu = sum(s['cpu_percent'] for s in samples) / len(samples)
+    rss = sum(s['rss_mb'] for s in samples) / len(samples)
+    peak_rss = max(s['rss_mb'] for s in samples)
+    print(f"[{profile}] 平均CPU {cpu:.1f}%, 平均内存 {rss:.0f}MB, 峰值内存 {peak_rss:.0f}MB, "
+          f"采集消息 {message_count} 条")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python benchmarks/bench_browser_profiles.py <直播间链接> [每种配置采样秒数]")
+        return
+    live_url = sys.argv[1]
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    for profile in (PROFILE_FULL, PROFILE_LEAN):
+        measure(live_url, profile, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# 内容指纹基准：计算耗时和碰撞率
+# 用法: python benchmarks/bench_fingerprint.py [消息条数]
+import sys
+import os
+import random
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.crawler.fingerprint import FingerprintAssigner, content_fingerprint
+from src.models.message import Message, MessageType
+
+TEXTS = ["666", "主播晚上好", "来了", "为主播点赞了", "哈哈哈哈", "[比心]", "这把能赢吗", "生成僵尸"]
+GIFTS = [None, "a1b2c3d4e5f6", "0f9e8d7c6b5a", "1234567890ab"]
+
+
+def random_content(rng):
+    """生成一条随机消息内容，取值范围小，模拟直播间大量相似消息"""
+    user = f"用户{rng.randrange(5000)}"
+    text = rng.choice(TEXTS) if rng.random() < 0.8 else f"{rng.choice(TEXTS)}{rng.randrange(1000)}"
+    gift_md5 = rng.choice(GIFTS)
+    gift_count = rng.randrange(1, 100) if gift_md5 else None
+    return user, text, gift_md5, gift_count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(42)
+
+    # 碰撞率：不同的 (内容, 时间段, 序号) 应得到不同的指纹
+    keys = set()
+    fingerprints = set()
+    start = time.perf_counter()
+    for i in range(count):
+        key = random_content(rng) + (i // 500, rng.randrange(3))
+        if key in keys:
+            continue
+        keys.add(key)
+        fingerprints.add(content_fingerprint(*key))
+    elapsed = time.perf_counter() - start
+    collisions = len(keys) - len(fingerprints)
+    print(f"不同消息 {len(keys)} 条, 指纹碰撞 {collisions} 次, 碰撞率 {collisions / len(keys):.2e}, "
+          f"{elapsed / count * 1e6:.2f}us/条")
+
+    # 每次轮询为整个列表分配指纹的耗时（200条消息的列表）
+    assigner = FingerprintAssigner()
+    snapshot = [Message(message_id=None, type=MessageType.CHAT, content=text, user_name=user,
+                        gift_md5=gift_md5, gift_count=gift_count)
+                for user, text, gift_md5, gift_count in (random_content(rng) for _ in range(200))]
+    rounds = 1000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        assigner.assign(snapshot, replace_ids=True)
+    elapsed = time.perf_counter() - start
+    print(f"200条列表分配指纹: {elapsed / rounds * 1000:.3f}ms/次")
+
+
+if __name__ == "__main__":
+    main()
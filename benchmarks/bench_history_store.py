@@ -0,0 +1,82 @@
+# SQLite历史消息库基准：批量写入吞吐量和常用查询耗时
+# 用法: python benchmarks/bench_history_store.py [消息条数] [数据库路径]
+import sys
+import os
+import random
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.history_store import HistoryStore
+from src.models.message import Message, MessageType
+from src.models.message_store import MessageStore
+
+GIFTS = ["a1b2c3d4e5f6a1b2c3d4e5f6a1b2c3d4", "0f9e8d7c6b5a0f9e8d7c6b5a0f9e8d7c", "1234567890abcdef1234567890abcdef"]
+
+
+def synthetic_messages(count, now_ms):
+    rng = random.Random(3)
+    messages = []
+    for i in range(count):
+        # 时间均匀分布在最近两小时内
+        timestamp_ms = now_ms - (count - i) * 7200000 // count
+        user_name = f"用户{rng.randrange(20000)}"
+        if rng.random() < 0.2:
+            messages.append(Message(str(i), MessageType.GIFT, "送出了礼物", user_name, timestamp_ms,
+                                    rng.choice(GIFTS), rng.randrange(1, 10)))
+        else:
+            messages.append(Message(str(i), MessageType.CHAT, "主播晚上好", user_name, timestamp_ms))
+    return messages
+
+
+def timed(name, func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name}: {elapsed * 1000:.2f}ms")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), "bench_history.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    messages = synthetic_messages(count, int(time.time() * 1000))
+
+    # 经由MessageStore和游标写入，与程序中的路径相同
+    store = MessageStore(ttl_seconds=10 ** 9, lazy_expiry=True)
+    history = HistoryStore(db_path, store)
+    start = time.perf_counter()
+    for message in messages:
+        store.add_message(message)
+    while history.sync_once():
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"写入 {history.inserted} 条, {history.inserted / elapsed:,.0f} 条/秒（含MessageStore写入）")
+
+    conn = history._read_conn
+    for sql, params in [
+        ("SELECT user_name, SUM(gift_count) FROM messages WHERE type = ? AND timestamp_ms >= ? GROUP BY user_name",
+         (MessageType.GIFT.value, 0)),
+        ("SELECT * FROM messages WHERE user_name = ? AND timestamp_ms >= ? ORDER BY timestamp_ms DESC", ("用户1", 0)),
+    ]:
+        plan = " | ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        print(f"查询计划: {plan}")
+
+    top = timed("最近一小时送礼最多的用户", lambda: history.top_gifters(3600, 10))
+    print(f"  第一名: {top[0] if top else None}")
+    timed("最近一小时各礼物总数", lambda: history.gift_totals(3600))
+    user_messages = timed("某个用户的全部消息", lambda: history.messages_by_user("用户1", limit=1000))
+    print(f"  共 {len(user_messages)} 条")
+    history.stop()
+    store.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# 消息总线基准：一个很慢的订阅者（模拟RCON）在不同队列策略下对发布方耗时的影响
+# 用法: python benchmarks/bench_message_bus.py [批次数] [每批条数] [慢订阅者每批耗时(ms)]
+import sys
+import os
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.message import Message, MessageType
+from src.models.message_batch import MessageBatch
+from src.models.message_bus import MessageBus, POLICY_BLOCK, POLICY_COALESCE, POLICY_DROP_OLDEST
+from src.models.message_store import MessageStore
+
+
+def synthetic_batches(batches, per_batch):
+    result = []
+    for b in range(batches):
+        messages = []
+        for i in range(per_batch):
+            n = b * per_batch + i
+            if n % 5 == 0:
+                messages.append(Message(str(n), MessageType.GIFT, "送出了礼物", f"用户{n % 2000}",
+                                        gift_md5="a1b2c3d4e5f6a1b2c3d4e5f6a1b2c3d4", gift_count=1))
+            else:
+                messages.append(Message(str(n), MessageType.CHAT, "主播晚上好", f"用户{n % 2000}"))
+        result.append(MessageBatch.from_messages(messages))
+    return result
+
+
+def consume(subscription, delay, stop):
+    while not stop.is_set() or subscription.get_stats()['queued_batches']:
+        batch = subscription.get(timeout=0.1)
+        if batch:
+            time.sleep(delay)
+
+
+def run(policy, batches, delay):
+    store = MessageStore(ttl_seconds=10 ** 9, lazy_expiry=True)
+    bus = MessageBus(store)
+    slow = bus.subscribe('slow', types=(MessageType.GIFT, MessageType.CHAT), maxsize=10,
+                         policy=policy, block_timeout=0.05)
+    fast = bus.subscribe('fast', maxsize=10, policy=POLICY_COALESCE)
+    stop = threading.Event()
+    consumers = [threading.Thread(target=consume, args=(slow, delay, stop)),
+                 threading.Thread(target=consume, args=(fast, 0, stop))]
+    for consumer in consumers:
+        consumer.start()
+
+    worst = 0.0
+    start = time.perf_counter()
+    for batch in batches:
+        t = time.perf_counter()
+        bus.publish(batch)
+        worst = max(worst, time.perf_counter() - t)
+        time.sleep(0.001)  # 采集线程的轮询间隔
+    elapsed = time.perf_counter() - start
+    lag = slow.get_stats()['lag_seconds']
+    stop.set()
+    for consumer in consumers:
+        consumer.join()
+
+    stats = slow.get_stats()
+    total = sum(len(batch) for batch in batches)
+    print(f"{policy:>11}: 发布 {total / elapsed:,.0f} 条/秒, 单次发布最长 {worst * 1000:.1f}ms, "
+          f"发布结束时慢订阅者延迟 {lag * 1000:.0f}ms, 送达 {stats['delivered']}, "
+          f"丢弃 {stats['dropped']}, 合并 {stats['coalesced']}, 阻塞 {stats['blocked_seconds']:.2f}s")
+    store.shutdown()
+
+
+def main():
+    batches = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    per_batch = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    delay = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+    data = synthetic_batches(batches, per_batch)
+    for policy in (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_COALESCE):
+        run(policy, data, delay)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# 消息编解码吞吐量基准：二进制记录、JSON Lines 与 pickle 的对比
+# 用法: python benchmarks/bench_message_codec.py [消息条数]
+import sys
+import os
+import io
+import pickle
+import random
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.message import Message, MessageType
+from src.models.message_codec import iter_binary, iter_jsonl, write_binary, write_jsonl
+
+TEXTS = ["666", "主播晚上好", "这把能赢吗", "哈哈哈哈哈哈笑死我了", "生成僵尸"]
+GIFTS = ["a1b2c3d4e5f6a1b2c3d4e5f6a1b2c3d4", "0f9e8d7c6b5a0f9e8d7c6b5a0f9e8d7c"]
+
+
+def synthetic_messages(count):
+    rng = random.Random(7)
+    messages = []
+    for i in range(count):
+        if rng.random() < 0.2:
+            gift_count = rng.randrange(1, 100)
+            messages.append(Message(str(7300000000000000000 + i), MessageType.GIFT,
+                                    f"送出了 [md5: x] × {gift_count}", f"用户{rng.randrange(20000)}",
+                                    gift_md5=rng.choice(GIFTS), gift_count=gift_count, room_id="123456"))
+        else:
+            messages.append(Message(str(7300000000000000000 + i), MessageType.CHAT, rng.choice(TEXTS),
+                                    f"用户{rng.randrange(20000)}", room_id="123456"))
+    return messages
+
+
+def bench(name, encode, decode, messages):
+    start = time.perf_counter()
+    data = encode(messages)
+    encode_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = decode(data)
+    decode_seconds = time.perf_counter() - start
+    assert len(decoded) == len(messages) and decoded[-1] == messages[-1]
+    count = len(messages)
+    print(f"{name}: {len(data) / count:.0f} 字节/条, 编码 {count / encode_seconds:,.0f} 条/秒, "
+          f"解码 {count / decode_seconds:,.0f} 条/秒")
+
+
+def encode_binary_stream(messages):
+    stream = io.BytesIO()
+    write_binary(stream, messages)
+    return stream.getvalue()
+
+
+def encode_jsonl_stream(messages):
+    stream = io.StringIO()
+    write_jsonl(stream, messages)
+    return stream.getvalue()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    messages = synthetic_messages(count)
+    print(f"{count} 条消息")
+    bench("二进制记录", encode_binary_stream, lambda data: list(iter_binary(io.BytesIO(data))), messages)
+    bench("JSON Lines", encode_jsonl_stream, lambda data: list(iter_jsonl(io.StringIO(data))), messages)
+    bench("pickle", pickle.dumps, pickle.loads, messages)
+
+
+if __name__ == "__main__":
+    main()
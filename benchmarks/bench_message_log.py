@@ -0,0 +1,72 @@
+# 持久化消息日志基准：成组提交与逐条提交的写入吞吐量，以及回放速度
+# 用法: python benchmarks/bench_message_log.py [消息条数] [日志目录]
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.message import Message, MessageType
+from src.models.message_log import MessageLog
+
+
+def synthetic_messages(count):
+    return [Message(str(7300000000000000000 + i), MessageType.CHAT, "主播晚上好", f"用户{i % 20000}",
+                    room_id="123456") for i in range(count)]
+
+
+def bench_write(name, directory, messages, per_message_commit):
+    shutil.rmtree(directory, ignore_errors=True)
+    log = MessageLog(directory, segment_bytes=16 * 1024 * 1024, retain_segments=None)
+    start = time.perf_counter()
+    for sequence, message in enumerate(messages, 1):
+        log.append(sequence, message)
+        if per_message_commit:
+            log.flush()
+    log.flush()
+    elapsed = time.perf_counter() - start
+    commits = log.commits
+    log.close()
+    print(f"{name}: {len(messages) / elapsed:,.0f} 条/秒, 提交 {commits} 次")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    directory = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.gettempdir(), "bench_message_log")
+    messages = synthetic_messages(count)
+
+    # 逐条提交每条都刷盘，条数取少一些
+    bench_write("逐条提交", directory, messages[:min(count, 2000)], per_message_commit=True)
+    bench_write("成组提交", directory, messages, per_message_commit=False)
+
+    log = MessageLog(directory, retain_segments=None)
+    start = time.perf_counter()
+    replayed = sum(1 for _ in log.replay(1))
+    elapsed = time.perf_counter() - start
+    print(f"全部回放: {replayed} 条, {replayed / elapsed:,.0f} 条/秒")
+
+    start = time.perf_counter()
+    replayed = sum(1 for _ in log.replay(count - 1000))
+    elapsed = time.perf_counter() - start
+    print(f"从第 {count - 1000} 条回放: {replayed} 条, {elapsed * 1000:.1f}ms")
+
+    # 历史库追赶的方式：每次从游标开始只取500条就停止迭代，总耗时应与条数成正比
+    start = time.perf_counter()
+    cursor = 0
+    batches = 0
+    while cursor < count:
+        for cursor, _ in log.replay(cursor + 1):
+            if cursor % 500 == 0:
+                break
+        batches += 1
+    elapsed = time.perf_counter() - start
+    print(f"按500条分批追赶: {batches} 批, {count / elapsed:,.0f} 条/秒")
+    log.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# 消息内存占用基准：原来的dataclass + (消息, datetime)元组 与紧凑消息的对比
+# 用法: python benchmarks/bench_message_memory.py [消息条数]
+import sys
+import os
+import gc
+import random
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.message import Message, MessageType
+
+
+@dataclass
+class LegacyMessage:
+    """原来的消息表示"""
+    message_id: str
+    type: MessageType
+    content: str
+    user_name: str
+    timestamp: datetime = None
+    gift_md5: Optional[str] = None
+    gift_count: Optional[int] = None
+    room_id: Optional[str] = None
+
+
+TEXTS = ["666", "主播晚上好", "来了", "为主播点赞了", "哈哈哈哈", "送出了 × 1"]
+GIFTS = ["a1b2c3d4e5f6a1b2c3d4e5f6a1b2c3d4", "0f9e8d7c6b5a0f9e8d7c6b5a0f9e8d7c"]
+
+
+def raw_messages(count):
+    """模拟解析结果：每条消息的用户名和md5都是新解析出的字符串"""
+    rng = random.Random(1)
+    for i in range(count):
+        gift = rng.random() < 0.2
+        yield (str(7300000000000000000 + i), MessageType.GIFT if gift else MessageType.CHAT,
+               rng.choice(TEXTS), "".join(["用户", str(rng.randrange(20000))]),
+               "".join([rng.choice(GIFTS)]) if gift else None, rng.randrange(1, 10) if gift else None)
+
+
+def build_legacy(count):
+    storage = {}
+    for message_id, message_type, content, user_name, gift_md5, gift_count in raw_messages(count):
+        message = LegacyMessage(message_id, message_type, content, user_name, datetime.now(), gift_md5, gift_count)
+        storage[message_id] = (message, datetime.now())
+    return storage
+
+
+def build_compact(count):
+    storage = {}
+    for message_id, message_type, content, user_name, gift_md5, gift_count in raw_messages(count):
+        storage[message_id] = Message(message_id, message_type, content, user_name, None, gift_md5, gift_count)
+    return storage
+
+
+def measure(builder, count):
+    gc.collect()
+    tracemalloc.start()
+    storage = builder(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del storage
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    legacy = measure(build_legacy, count)
+    compact = measure(build_compact, count)
+    print(f"{count} 条消息（含存储字典）")
+    print(f"原来: {legacy / 1024 / 1024:.1f}MB, {legacy / count:.0f} 字节/条")
+    print(f"紧凑: {compact / 1024 / 1024:.1f}MB, {compact / count:.0f} 字节/条 ({compact / legacy:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# 消息存储过期清理基准：10k条/秒写入时的 add/get 延迟
+# 对比原来每秒全量扫描、按到达顺序清理（后台线程）和读写时顺带清理三种方式
+# 用法: python benchmarks/bench_message_store.py [每秒消息数] [运行秒数] [保留秒数]
+import sys
+import os
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.message import Message, MessageType
+from src.models.message_store import MessageStore
+
+TYPES = [MessageType.CHAT] * 7 + [MessageType.GIFT, MessageType.LIKE, MessageType.ENTER]
+
+
+class FullScanMessageStore(MessageStore):
+    """原来的清理方式：持有锁扫描所有消息"""
+
+    def _cleanup_expired_messages(self):
+        with self._lock:
+            expiration_ms = int((time.time() - self.ttl_seconds) * 1000)
+            expired_count = 0
+            for storage in self._storages.values():
+                expired_keys = [key for key, message in storage.items() if message.timestamp_ms < expiration_ms]
+                for key in expired_keys:
+                    del storage[key]
+                expired_count += len(expired_keys)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(name, store, rate, seconds):
+    add_latencies = []
+    get_latencies = []
+    interval = 1 / rate
+    start = time.perf_counter()
+    next_time = start
+    index = 0
+    while time.perf_counter() - start < seconds:
+        message = Message(str(index), TYPES[index % len(TYPES)], "666", f"用户{index % 5000}")
+        t0 = time.perf_counter()
+        store.add_message(message)
+        t1 = time.perf_counter()
+        store.get_message_by_id(str(index // 2))
+        t2 = time.perf_counter()
+        add_latencies.append(t1 - t0)
+        get_latencies.append(t2 - t1)
+        index += 1
+
+        next_time += interval
+        delay = next_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    store.shutdown()
+
+    def fmt(values):
+        return (f"p50 {percentile(values, 0.5) * 1e6:.1f}us, p99 {percentile(values, 0.99) * 1e6:.1f}us, "
+                f"p99.9 {percentile(values, 0.999) * 1e6:.1f}us, 最大 {max(values) * 1e3:.2f}ms")
+    print(f"{name}: {index} 条, 存储 {sum(store.get_stats().values())} 条")
+    print(f"  add: {fmt(add_latencies)}")
+    print(f"  get: {fmt(get_latencies)}")
+
+
+def main():
+    rate = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+    ttl = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    run("全量扫描", FullScanMessageStore(ttl_seconds=ttl), rate, seconds)
+    run("按到达顺序清理", MessageStore(ttl_seconds=ttl), rate, seconds)
+    run("读写时清理", MessageStore(ttl_seconds=ttl, lazy_expiry=True), rate, seconds)
+
+
+if __name__ == "__main__":
+    main()
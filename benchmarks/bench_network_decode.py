@@ -0,0 +1,103 @@
+# 网络帧解码与DOM快照解析的吞吐量对比
+# 用法: python benchmarks/bench_network_decode.py [录制帧目录]
+# 不指定目录时使用合成的推送帧
+import sys
+import os
+import gzip
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.crawler.live_crawler import LiveCrawler
+from src.crawler.webcast_decoder import decode_push_frame, iter_fixture_frames
+
+GIFT_URL = "https://p3-webcast.douyinpic.com/img/webcast/7ef47758a435313180e6b78b056dda4e~tplv-obj.png"
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, value):
+    """编码一个protobuf字段（int为varint，其余为长度类型）"""
+    if isinstance(value, int):
+        return _varint(number << 3) + _varint(value)
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return _varint((number << 3) | 2) + _varint(len(value)) + value
+
+
+def build_frame(first_id, messages_per_frame=20):
+    """构造一个包含聊天/礼物/点赞/进入消息的PushFrame"""
+    items = b''
+    for i in range(messages_per_frame):
+        msg_id = first_id + i
+        user = _field(3, f"用户{msg_id % 500}")
+        kind = i % 4
+        if kind == 0:
+            method, payload = "WebcastChatMessage", _field(2, user) + _field(3, f"主播好 {msg_id}")
+        elif kind == 1:
+            gift = _field(1, _field(1, GIFT_URL))
+            method, payload = "WebcastGiftMessage", _field(6, 3) + _field(7, user) + _field(15, gift)
+        elif kind == 2:
+            method, payload = "WebcastLikeMessage", _field(2, 10) + _field(5, user)
+        else:
+            method, payload = "WebcastMemberMessage", _field(2, user)
+        items += _field(1, _field(1, method) + _field(2, payload) + _field(3, msg_id))
+    header = _field(1, "compress_type") + _field(2, "gzip")
+    return _field(5, header) + _field(7, "msg") + _field(8, gzip.compress(items))
+
+
+def build_snapshot_items(count):
+    """构造与合成帧等量的DOM快照数据"""
+    items = []
+    for msg_id in range(count):
+        user = f"用户{msg_id % 500}："
+        kind = msg_id % 4
+        if kind == 0:
+            items.append({'id': str(msg_id), 'user': user, 'text': f"主播好 {msg_id}", 'img_srcs': []})
+        elif kind == 1:
+            items.append({'id': str(msg_id), 'user': user, 'text': "送出了 × 3",
+                          'img_srcs': ["https://p3/new_user_grade_level_v1_12.png", GIFT_URL]})
+        elif kind == 2:
+            items.append({'id': str(msg_id), 'user': user, 'text': "为主播点赞了", 'img_srcs': []})
+        else:
+            items.append({'id': str(msg_id), 'user': user, 'text': "来了", 'img_srcs': []})
+    return items
+
+
+def main():
+    if len(sys.argv) > 1:
+        frames = list(iter_fixture_frames(sys.argv[1]))
+        print(f"读取录制帧: {len(frames)} 个")
+    else:
+        frames = [build_frame(i * 20) for i in range(5000)]
+        print(f"合成推送帧: {len(frames)} 个")
+
+    start = time.perf_counter()
+    decoded = 0
+    for frame in frames:
+        decoded += len(decode_push_frame(frame))
+    elapsed = time.perf_counter() - start
+    print(f"网络帧解码: {decoded} 条消息, {elapsed:.3f}s, {decoded / elapsed:,.0f} 条/秒")
+
+    # DOM快照路径只统计Python端的分类耗时，不含浏览器渲染和WebDriver往返
+    crawler = LiveCrawler()
+    items = build_snapshot_items(max(decoded, 1))
+    start = time.perf_counter()
+    built = sum(1 for item in items if crawler._build_message(item))
+    elapsed = time.perf_counter() - start
+    print(f"DOM快照解析: {built} 条消息, {elapsed:.3f}s, {built / elapsed:,.0f} 条/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# 吞吐量统计基准：每条消息的记录开销，以及不同窗口下速率和百分位数查询的耗时
+# 用法: python benchmarks/bench_throughput.py [消息条数]
+import sys
+import os
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.message import Message, MessageType
+from src.models.throughput import ThroughputMetrics
+
+TYPES = [MessageType.CHAT, MessageType.GIFT, MessageType.LIKE, MessageType.ENTER]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    messages = [Message(str(i), TYPES[i % 4], "主播晚上好", f"用户{i % 20000}", room_id=f"room{i % 4}")
+                for i in range(count)]
+
+    now = time.time()
+    # 消息均匀分布在最近一小时内；逐条记录与按50条一批记录（MessageStore.add_batch的路径）
+    metrics = ThroughputMetrics(history_seconds=3600)
+    start = time.perf_counter()
+    for i, message in enumerate(messages):
+        metrics.record(message, now=now - 3600 + i * 3600 / count)
+    elapsed = time.perf_counter() - start
+    print(f"逐条记录 {count} 条: {count / elapsed:,.0f} 条/秒, 每条 {elapsed / count * 1e9:.0f}ns")
+
+    metrics = ThroughputMetrics(history_seconds=3600)
+    start = time.perf_counter()
+    for i in range(0, count, 50):
+        metrics.record_many(messages[i:i + 50], now=now - 3600 + i * 3600 / count)
+    elapsed = time.perf_counter() - start
+    print(f"按批记录 {count} 条: {count / elapsed:,.0f} 条/秒, 每条 {elapsed / count * 1e9:.0f}ns")
+
+    for window in (10, 60, 3599):
+        start = time.perf_counter()
+        for _ in range(100):
+            rate = metrics.rate(window, now=now)
+        rate_us = (time.perf_counter() - start) / 100 * 1e6
+        start = time.perf_counter()
+        for _ in range(100):
+            p95 = metrics.percentile(95, window, MessageType.GIFT, now=now)
+        p95_us = (time.perf_counter() - start) / 100 * 1e6
+        print(f"窗口 {window}s: 速率 {rate:.1f}条/秒 ({rate_us:.0f}us), 礼物P95 {p95:.0f}条/秒 ({p95_us:.0f}us)")
+
+    start = time.perf_counter()
+    summary = metrics.get_summary(10)
+    print(f"状态栏汇总: {(time.perf_counter() - start) * 1e6:.0f}us, 直播间 {len(summary['rooms'])} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# 用户统计索引基准：写入吞吐量、惰性堆前k名查询与全量排序的耗时对比，以及快照大小
+# 用法: python benchmarks/bench_user_index.py [消息条数] [用户数]
+import sys
+import os
+import random
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from src.models.message import Message, MessageType
+from src.models.user_index import UserAggregateIndex, METRIC_GIFTS
+
+GIFTS = ["a1b2c3d4e5f6a1b2c3d4e5f6a1b2c3d4", "0f9e8d7c6b5a0f9e8d7c6b5a0f9e8d7c", "1234567890abcdef1234567890abcdef"]
+
+
+def synthetic_messages(count, users):
+    rng = random.Random(5)
+    messages = []
+    for i in range(count):
+        # 少数活跃用户发送大部分消息，其余用户均匀分布
+        if rng.random() < 0.3:
+            user_name = f"用户{int(rng.paretovariate(1.2)) % users}"
+        else:
+            user_name = f"用户{rng.randrange(users)}"
+        if rng.random() < 0.2:
+            messages.append(Message(str(i), MessageType.GIFT, "送出了礼物", user_name, 1700000000000 + i,
+                                    rng.choice(GIFTS), rng.randrange(1, 10)))
+        else:
+            messages.append(Message(str(i), MessageType.CHAT, "主播晚上好", user_name, 1700000000000 + i))
+    return messages
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    messages = synthetic_messages(count, users)
+
+    index = UserAggregateIndex(max_users=users)
+    start = time.perf_counter()
+    for message in messages:
+        index.add(message)
+    elapsed = time.perf_counter() - start
+    print(f"写入 {count} 条: {count / elapsed:,.0f} 条/秒, 用户 {index.get_stats()['users']}")
+
+    # 写入与查询交替：每100条消息查询一次前10名
+    queries = 0
+    query_seconds = 0.0
+    for position in range(0, min(count, 100000), 100):
+        for message in messages[position:position + 100]:
+            index.add(message)
+        start = time.perf_counter()
+        index.top(10, METRIC_GIFTS)
+        query_seconds += time.perf_counter() - start
+        queries += 1
+    print(f"惰性堆前10名（每100条写入后查询）: 平均 {query_seconds / queries * 1e6:.0f}us")
+
+    start = time.perf_counter()
+    for _ in range(20):
+        with index._lock:
+            sorted(index._users.values(), key=lambda stats: stats.gift_total, reverse=True)[:10]
+    print(f"全量排序前10名: 平均 {(time.perf_counter() - start) / 20 * 1e6:.0f}us")
+    print(f"索引状态: {index.get_stats()}")
+
+    path = os.path.join(tempfile.gettempdir(), "bench_user_index.json")
+    start = time.perf_counter()
+    index.save(path)
+    save_elapsed = time.perf_counter() - start
+    restored = UserAggregateIndex(max_users=users)
+    start = time.perf_counter()
+    loaded = restored.load(path)
+    load_elapsed = time.perf_counter() - start
+    print(f"快照: {os.path.getsize(path) / 1024 / 1024:.1f}MB, 保存 {save_elapsed * 1000:.0f}ms, "
+          f"加载 {loaded} 个用户 {load_elapsed * 1000:.0f}ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
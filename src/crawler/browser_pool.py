@@ -0,0 +1,165 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import os
+import shutil
+import threading
+
+from webdriver_manager.chrome import ChromeDriverManager
+
+DRIVER_CACHE_FILE = os.path.join('config', 'driver_cache.json')
+PROFILE_ROOT = 'chrome_profile'
+
+_driver_path = None
+_driver_lock = threading.Lock()
+
+
+def resolve_driver_path(force_refresh: bool = False) -> str:
+    """
+    获取chromedriver路径
+
+    优先使用本地缓存中记录的驱动，只有缓存不存在、文件丢失或强制刷新
+    （例如驱动与Chrome版本不匹配）时才通过ChromeDriverManager联网下载。
+    """
+    global _driver_path
+    with _driver_lock:
+        if not force_refresh:
+            if _driver_path and os.path.exists(_driver_path):
+                return _driver_path
+            try:
+                if os.path.exists(DRIVER_CACHE_FILE):
+                    with open(DRIVER_CACHE_FILE, 'r', encoding='utf-8') as f:
+                        cached_path = json.load(f).get('driver_path')
+                    if cached_path and os.path.exists(cached_path):
+                        _driver_path = cached_path
+                        return _driver_path
+            except Exception as e:
+                print(f"读取驱动缓存失败: {str(e)}")
+
+        _driver_path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(DRIVER_CACHE_FILE), exist_ok=True)
+            with open(DRIVER_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'driver_path': _driver_path}, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            print(f"保存驱动缓存失败: {str(e)}")
+        return _driver_path
+
+
+class BrowserPool:
+    """
+    预热浏览器池
+
+    按启动配置（key）保存已启动、停在空白页的浏览器，采集开始时直接取用，
+    停止采集时归还而不是退出，切换直播间只需要一次页面跳转。
+    每个浏览器使用独立的持久化用户目录，同一目录不会被两个浏览器同时使用。
+    停用后（disable）归还的浏览器直接退出并删除其用户目录，目录不会在停用期间堆积。
+    """
+
+    def __init__(self, size: int = 1, profile_root: str = PROFILE_ROOT):
+        self.size = size
+        self.profile_root = profile_root
+        self._idle: Dict[tuple, List[Tuple[object, str]]] = {}
+        self._profiles_in_use = set()
+        self._warming = set()
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def reserve_profile_dir(self) -> str:
+        """分配一个当前没有浏览器使用的用户目录"""
+        with self._lock:
+            index = 0
+            while True:
+                profile_dir = os.path.abspath(os.path.join(self.profile_root, f"pool-{index}"))
+                if profile_dir not in self._profiles_in_use:
+                    self._profiles_in_use.add(profile_dir)
+                    return profile_dir
+                index += 1
+
+    def discard_profile_dir(self, profile_dir: str):
+        """释放一个未能成功启动浏览器的用户目录"""
+        with self._lock:
+            self._profiles_in_use.discard(profile_dir)
+
+    def acquire(self, key: tuple) -> Tuple[Optional[object], Optional[str]]:
+        """取出一个已预热的浏览器，没有时返回 (None, None)"""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+        return None, None
+
+    def release(self, key: tuple, driver, profile_dir: str):
+        """归还浏览器；池已满或浏览器不可用时直接退出，池已停用时同时删除用户目录"""
+        if not self.enabled:
+            self.discard(driver, profile_dir, remove_profile=True)
+            return
+        with self._lock:
+            idle_count = sum(len(drivers) for drivers in self._idle.values())
+            keep = idle_count < self.size
+        if keep:
+            try:
+                driver.get('about:blank')
+                with self._lock:
+                    self._idle.setdefault(key, []).append((driver, profile_dir))
+                return
+            except Exception as e:
+                print(f"浏览器无法复用，将其关闭: {str(e)}")
+        self.discard(driver, profile_dir)
+
+    def discard(self, driver, profile_dir: str, remove_profile: bool = False):
+        """退出浏览器并释放其用户目录；remove_profile为True时同时删除目录"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        if remove_profile and profile_dir:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+        self.discard_profile_dir(profile_dir)
+
+    def prewarm(self, key: tuple, factory: Callable[[str], object]):
+        """在后台启动一个浏览器放入池中；factory接收用户目录并返回driver"""
+        with self._lock:
+            if not self.enabled or self._idle.get(key) or key in self._warming:
+                return
+            self._warming.add(key)
+
+        def warm():
+            profile_dir = self.reserve_profile_dir()
+            try:
+                driver = factory(profile_dir)
+                driver.get('about:blank')
+                with self._lock:
+                    keep = self.enabled
+                    if keep:
+                        self._idle.setdefault(key, []).append((driver, profile_dir))
+                if not keep:
+                    # 预热期间池被停用
+                    self.discard(driver, profile_dir, remove_profile=True)
+                    return
+                print(f"预热浏览器已就绪: {key}")
+            except Exception as e:
+                print(f"预热浏览器失败: {str(e)}")
+                self.discard_profile_dir(profile_dir)
+            finally:
+                with self._lock:
+                    self._warming.discard(key)
+
+        threading.Thread(target=warm, daemon=True).start()
+
+    def enable(self):
+        """重新启用浏览器池"""
+        self.enabled = True
+
+    def disable(self):
+        """停用浏览器池：退出空闲浏览器并删除其用户目录，之后归还的浏览器也按此处理"""
+        self.enabled = False
+        self.shutdown(remove_profiles=True)
+
+    def shutdown(self, remove_profiles: bool = False):
+        """退出池中所有空闲浏览器"""
+        with self._lock:
+            idle = [item for drivers in self._idle.values() for item in drivers]
+            self._idle.clear()
+        for driver, profile_dir in idle:
+            self.discard(driver, profile_dir, remove_profile=remove_profiles)
+        print("浏览器池已关闭")
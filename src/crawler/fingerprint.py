@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+import hashlib
+import time
+
+FINGERPRINT_PREFIX = "fp:"
+
+
+def content_fingerprint(user_name: Optional[str], content: Optional[str], gift_md5: Optional[str],
+                        gift_count: Optional[int], bucket: int, ordinal: int = 0) -> str:
+    """根据消息内容计算64位指纹，作为没有可靠data-id时的消息ID"""
+    key = f"{user_name}\x1f{content}\x1f{gift_md5}\x1f{gift_count}\x1f{bucket}\x1f{ordinal}"
+    return FINGERPRINT_PREFIX + hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class FingerprintAssigner:
+    """
+    为缺少或不可靠data-id的消息分配内容指纹ID
+
+    指纹由 (用户, 内容, 礼物md5, 数量, 粗粒度时间, 同一列表中相同内容的序号) 计算。
+    粗粒度时间取该内容第一次被看到时所在的时间段，消息留在列表中期间指纹保持不变；
+    内容离开列表超过 bucket_seconds 后再次出现时视为新消息（例如同一用户重复发送“666”）。
+    """
+
+    def __init__(self, bucket_seconds: float = 30, max_keys: int = 10000):
+        self.bucket_seconds = bucket_seconds
+        self.max_keys = max_keys
+        self._first_seen: "OrderedDict[tuple, float]" = OrderedDict()  # 内容键 -> 第一次看到的时间
+        self._last_keys = set()  # 当前列表中出现的内容键
+        # 增量调用之间延续的序号：内容 -> [下一个序号, 最近一次看到的时间]
+        self._ordinals: "OrderedDict[tuple, list]" = OrderedDict()
+        # 增量模式下消息项位置 -> (内容, 序号)，同一位置的同一内容被重复读到时沿用原来的序号
+        self._slots: "OrderedDict[object, tuple]" = OrderedDict()
+
+    def _next_ordinal(self, content_key: tuple, now: float) -> int:
+        """增量模式下相同内容的序号接着之前的继续；超过bucket_seconds没再出现时从0开始"""
+        state = self._ordinals.get(content_key)
+        if state is None or now - state[1] > self.bucket_seconds:
+            state = [0, now]
+            self._ordinals[content_key] = state
+        ordinal = state[0]
+        state[0] += 1
+        state[1] = now
+        self._ordinals.move_to_end(content_key)
+        return ordinal
+
+    def assign(self, messages: Iterable, replace_ids: bool = False, now: Optional[float] = None,
+               incremental: bool = False, slots: Optional[List] = None):
+        """
+        为消息列表分配指纹ID；replace_ids为True时忽略已有的data-id
+
+        incremental为True时messages只是列表中新增的部分（游标/流式模式），其中每一项都是新消息：
+        序号接着之前调用继续计算，同一用户短时间内重复发送的相同内容不会得到相同的指纹。
+        slots与messages一一对应，是消息项在列表中的稳定位置（例如相对游标的位置），
+        同一位置、同一内容再次传入时视为同一条消息，得到与上次相同的指纹。
+        """
+        now = time.time() if now is None else now
+        occurrences = {}
+        current_keys = set()
+
+        for index, message in enumerate(messages):
+            content_key = (message.user_name, message.content, message.gift_md5, message.gift_count)
+            reread = False
+            if incremental:
+                slot = slots[index] if slots is not None else None
+                previous = self._slots.get(slot) if slot is not None else None
+                if previous is not None and previous[0] == content_key:
+                    ordinal = previous[1]
+                    reread = True
+                    self._slots.move_to_end(slot)
+                else:
+                    ordinal = self._next_ordinal(content_key, now)
+                    if slot is not None:
+                        self._slots[slot] = (content_key, ordinal)
+                        self._slots.move_to_end(slot)
+            else:
+                ordinal = occurrences.get(content_key, 0)
+                occurrences[content_key] = ordinal + 1
+            if not replace_ids and message.message_id:
+                continue
+
+            key = content_key + (ordinal,)
+            current_keys.add(key)
+            first_seen = self._first_seen.get(key)
+            # 增量部分都是新插入的消息（重复读到的位置除外），不需要判断是否仍留在列表中
+            if first_seen is None or (now - first_seen > self.bucket_seconds and not reread
+                                      and (incremental or key not in self._last_keys)):
+                first_seen = now
+                self._first_seen[key] = first_seen
+            self._first_seen.move_to_end(key)
+            message.message_id = content_fingerprint(*content_key, int(first_seen // self.bucket_seconds),
+                                                     ordinal)
+
+        if incremental:
+            # 之前的新增部分仍在列表中，全量扫描时不能把它们当作离开后重新出现
+            self._last_keys |= current_keys
+        else:
+            self._last_keys = current_keys
+            # 全量列表之后的增量部分从列表中的出现次数继续编号
+            for content_key, count in occurrences.items():
+                self._ordinals[content_key] = [count, now]
+                self._ordinals.move_to_end(content_key)
+
+        while len(self._first_seen) > self.max_keys:
+            self._first_seen.popitem(last=False)
+        while len(self._ordinals) > self.max_keys:
+            self._ordinals.popitem(last=False)
+        while len(self._slots) > self.max_keys:
+            self._slots.popitem(last=False)
+        if len(self._last_keys) > self.max_keys:
+            self._last_keys &= self._first_seen.keys()
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+import threading
+
+# 缓存中表示“不是礼物图片”的值
+_NOT_GIFT = ""
+
+
+def _md5_from_src(gift_src: str) -> Optional[str]:
+    """从单个图片地址中解析礼物md5，不是礼物图片时返回None"""
+    # 排除用户等级图标
+    if not gift_src:
+        return None
+    if "new_user_grade_level" in gift_src:
+        return None
+    if "fansclub" in gift_src:
+        return None
+    if "webcast_admin_badge" in gift_src:
+        return None
+
+    # 只处理礼物图片
+    if ("~tplv-obj" in gift_src or "webcast/gift" in gift_src):
+        if "~tplv-obj" in gift_src:
+            gift_md5 = gift_src.split("/")[-1].split("~")[0]
+        else:
+            gift_md5 = gift_src.split("/")[-1].split(".")[0]
+
+        if gift_md5.endswith('.png'):
+            gift_md5 = gift_md5[:-4]
+
+        return gift_md5
+    return None
+
+
+def extract_gift_md5(img_srcs: Iterable[str]) -> tuple[Optional[str], Optional[str]]:
+    """从图片地址中找出礼物图片，返回 (md5, 图片地址)"""
+    for gift_src in img_srcs:
+        gift_md5 = _md5_from_src(gift_src)
+        if gift_md5:
+            return gift_md5, gift_src
+    return None, None
+
+
+class GiftIconResolver:
+    """带LRU缓存的礼物图片地址 -> md5 解析器，同时记录每个md5第一次出现的图片地址"""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._image_urls: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, gift_src: str) -> Optional[str]:
+        """解析单个图片地址，不是礼物图片时返回None"""
+        if not gift_src:
+            return None
+        with self._lock:
+            cached = self._cache.get(gift_src)
+            if cached is not None:
+                self.hits += 1
+                self._cache.move_to_end(gift_src)
+                return cached or None
+
+            self.misses += 1
+            gift_md5 = _md5_from_src(gift_src)
+            self._cache[gift_src] = gift_md5 or _NOT_GIFT
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+            if gift_md5 and gift_md5 not in self._image_urls:
+                self._image_urls[gift_md5] = gift_src
+            return gift_md5
+
+    def resolve_first(self, img_srcs: Iterable[str]) -> tuple[Optional[str], Optional[str]]:
+        """在消息的所有图片中找出礼物图片，返回 (md5, 图片地址)"""
+        for gift_src in img_srcs:
+            gift_md5 = self.resolve(gift_src)
+            if gift_md5:
+                return gift_md5, gift_src
+        return None, None
+
+    def image_url(self, gift_md5: str) -> Optional[str]:
+        """获取md5对应的礼物图片地址"""
+        with self._lock:
+            return self._image_urls.get(gift_md5)
+
+    def get_stats(self) -> Dict[str, float]:
+        """获取缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "gifts": len(self._image_urls),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+# 爬虫和礼物统计面板共用的解析器
+gift_resolver = GiftIconResolver()
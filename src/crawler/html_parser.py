@@ -0,0 +1,139 @@
+from html.parser import HTMLParser
+from typing import List
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    etree = None
+    lxml_html = None
+
+# 与页面中提取脚本使用的类名一致
+ITEM_CLASS = "webcast-chatroom___item"
+USER_CLASSES = ("u2QdU6ht",)
+CONTENT_CLASSES = ("webcast-chatroom___content-with-emoji-text", "WsJsvMP9")
+
+# 没有结束标签的元素
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+              "link", "meta", "source", "track", "wbr"}
+
+
+class _ChatItemParser(HTMLParser):
+    """把聊天容器的outerHTML解析为 [{id, user, text, img_srcs}]，与页面提取脚本的结果一致"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items = []
+        self._depth = 0
+        self._item = None
+        self._item_depth = None
+        self._capture = None  # 'user' 或 'text'
+        self._capture_depth = None
+        self._buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "img":
+            if self._item is not None and attrs.get("src"):
+                self._item["img_srcs"].append(attrs["src"])
+            return
+        if tag in _VOID_TAGS:
+            return
+
+        self._depth += 1
+        classes = (attrs.get("class") or "").split()
+
+        if self._item is None:
+            # 没有data-id的消息项要求类名完全匹配，避免把聊天容器（webcast-chatroom___items）当成消息项
+            if (ITEM_CLASS in classes or
+                    (attrs.get("data-id") and any(ITEM_CLASS in c for c in classes))):
+                self._item = {"id": attrs.get("data-id"), "user": None, "text": "", "img_srcs": [],
+                              "_has_text": False}
+                self._item_depth = self._depth
+            return
+
+        if self._capture is None:
+            if self._item["user"] is None and any(c in USER_CLASSES for c in classes):
+                self._capture = "user"
+            elif not self._item["_has_text"] and any(c in CONTENT_CLASSES for c in classes):
+                self._capture = "text"
+            if self._capture:
+                self._capture_depth = self._depth
+                self._buffer = []
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS:
+            return
+        if self._capture is not None and self._depth == self._capture_depth:
+            value = "".join(self._buffer).strip()
+            if self._capture == "user":
+                self._item["user"] = value
+            else:
+                self._item["text"] = value
+                self._item["_has_text"] = True
+            self._capture = None
+        if self._item is not None and self._depth == self._item_depth:
+            del self._item["_has_text"]
+            self.items.append(self._item)
+            self._item = None
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._buffer.append(data)
+
+
+def _class_xpath(class_name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+if etree is not None:
+    # 预编译的XPath，与页面提取脚本的选择器对应
+    _ITEM_XPATH = etree.XPath(f"//div[(@data-id and contains(@class, '{ITEM_CLASS}')) or "
+                              f"{_class_xpath(ITEM_CLASS)}]")
+    _USER_XPATH = etree.XPath(f"(.//*[{_class_xpath(USER_CLASSES[0])}])[1]")
+    _CONTENT_XPATHS = [etree.XPath(f"(.//*[{_class_xpath(c)}])[1]") for c in CONTENT_CLASSES]
+    _IMG_SRC_XPATH = etree.XPath(".//img/@src")
+
+
+def parse_chat_items_lxml(html: str) -> List[dict]:
+    """使用lxml和预编译XPath解析聊天容器HTML"""
+    root = lxml_html.fromstring(html)
+    items = []
+    for element in _ITEM_XPATH(root):
+        users = _USER_XPATH(element)
+        text = ''
+        for content_xpath in _CONTENT_XPATHS:
+            contents = content_xpath(element)
+            if contents:
+                text = contents[0].text_content().strip()
+                break
+        items.append({
+            "id": element.get("data-id"),
+            "user": users[0].text_content().strip() if users else None,
+            "text": text,
+            "img_srcs": [str(src) for src in _IMG_SRC_XPATH(element) if src]
+        })
+    return items
+
+
+def parse_chat_items_stdlib(html: str) -> List[dict]:
+    """使用标准库html.parser解析聊天容器HTML"""
+    parser = _ChatItemParser()
+    parser.feed(html)
+    parser.close()
+    return parser.items
+
+
+def parse_chat_items(html: str) -> List[dict]:
+    """解析聊天容器HTML，返回消息项数据列表；安装了lxml时使用lxml"""
+    if not html:
+        return []
+    if lxml_html is not None:
+        return parse_chat_items_lxml(html)
+    return parse_chat_items_stdlib(html)
@@ -4,19 +4,282 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime
 from ..models.message import Message, MessageType
+from ..models.message_batch import MessageBatch
 from .message_cache import MessageCache
+from .seen_index import SeenIdIndex
+from .gift_resolver import gift_resolver
+from .message_classifier import MessageClassifier
+from .webcast_decoder import decode_push_frame, extract_frames_from_performance_log
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import SessionNotCreatedException
+from .browser_pool import BrowserPool, PROFILE_ROOT, resolve_driver_path
+from .html_parser import parse_chat_items
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Optional
+import json
 import os
 import time
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 消息提取模式
+MODE_ELEMENT = "element"    # 逐个元素通过WebDriver读取（每条消息多次往返）
+MODE_SNAPSHOT = "snapshot"  # 每次轮询只执行一次脚本，批量返回所有消息
+
+MODE_STREAM = "stream"      # 页面内MutationObserver推送新消息，Python端等待并取出
+MODE_NETWORK = "network"    # 通过DevTools网络日志解码直播推送帧，不依赖页面结构
+MODE_HTML = "html"          # 每次轮询取一次容器HTML，在本地（可用进程池）批量解析
+
+# 浏览器配置
+PROFILE_FULL = "full"  # 完整可见浏览器（默认）
+PROFILE_LEAN = "lean"  # 无头、静音、不加载视频/字体/样式/非礼物图片
+
+# 精简配置下屏蔽的请求；礼物图标为png（~tplv-obj.png），不在屏蔽范围内
+LEAN_BLOCKED_URL_PATTERNS = [
+    "*.flv*", "*.m3u8*", "*.mp4*", "*.m4s*",
+    "*.woff*", "*.ttf*", "*.otf*",
+    "*.css*",
+    "*.jpg*", "*.jpeg*", "*.webp*", "*.gif*", "*.awebp*",
+]
+
+# 聊天容器和消息项的候选选择器，按优先级排列
+CONTAINER_SELECTORS = [
+    "div[class*='webcast-chatroom___items']",
+    "div[class*='webcast-chatroom___list']",
+    "div[class*='ChatRoom-ScrollContent']"
+]
+ITEM_SELECTORS = [
+    "div[class*='webcast-chatroom___item'][data-id]",
+    "div[data-id]"
+]
+
+# 提取单个消息项的页面函数，供快照和流式模式共用
+_EXTRACT_ITEM_JS = """
+function(item) {
+    var userEl = item.querySelector('.u2QdU6ht');
+    var contentEl = item.querySelector('.webcast-chatroom___content-with-emoji-text') || item.querySelector('.WsJsvMP9');
+    var srcs = [];
+    var imgs = item.getElementsByTagName('img');
+    for (var j = 0; j < imgs.length; j++) {
+        if (imgs[j].src) srcs.push(imgs[j].src);
+    }
+    return {
+        id: item.getAttribute('data-id'),
+        user: userEl ? userEl.innerText.trim() : null,
+        text: contentEl ? contentEl.innerText.trim() : '',
+        img_srcs: srcs
+    };
+}
+"""
+
+# 判断元素是否为消息项的页面函数，供所有模式共用：
+# 类名包含webcast-chatroom___item的div，没有data-id时要求类名完全匹配，排除聊天容器本身
+_IS_ITEM_JS = """
+function(node) {
+    if (node.nodeType !== 1 || node.tagName !== 'DIV') return false;
+    if (String(node.className).indexOf('webcast-chatroom___item') === -1) return false;
+    return node.hasAttribute('data-id') || node.classList.contains('webcast-chatroom___item');
+}
+"""
+
+# 在页面中一次性提取所有消息项，返回 [{id, user, text, img_srcs}] 的JSON字符串
+SNAPSHOT_SCRIPT = """
+var extract = %s;
+var isItem = %s;
+var items = document.querySelectorAll("div[class*='webcast-chatroom___item']");
+var result = [];
+for (var i = 0; i < items.length; i++) {
+    if (isItem(items[i])) result.push(extract(items[i]));
+}
+return JSON.stringify(result);
+""" % (_EXTRACT_ITEM_JS, _IS_ITEM_JS)
+
+# 录制模式：取出聊天容器的完整HTML，供离线回放
+CONTAINER_HTML_SCRIPT = """
+var container = document.querySelector("div[class*='webcast-chatroom___items']");
+return container ? container.outerHTML : null;
+"""
+
+# 游标增量提取：只返回游标之后的消息项
+# 游标为最后一个有data-id的消息项，加上其后已处理过的（没有data-id的）项数cursorTail；
+# 游标位置未变时直接定位，位置偏移时按data-id反向查找，游标消息已被移出列表时才全量扫描
+INCREMENTAL_SCRIPT = """
+var extract = %s;
+var isItem = %s;
+var cursorId = arguments[0];
+var cursorPos = arguments[1];
+var cursorTail = arguments[2];
+var items = document.querySelectorAll("div[class*='webcast-chatroom___item']");
+var anchor = -1;
+if (cursorId !== null) {
+    if (cursorPos < items.length && items[cursorPos].getAttribute('data-id') === cursorId) {
+        anchor = cursorPos;
+    } else {
+        for (var i = items.length - 1; i >= 0; i--) {
+            if (items[i].getAttribute('data-id') === cursorId) {
+                anchor = i;
+                break;
+            }
+        }
+    }
+}
+var reset = anchor < 0;
+var start = reset ? 0 : anchor + 1 + cursorTail;
+var result = [];
+for (var k = start; k < items.length; k++) {
+    if (!isItem(items[k])) continue;
+    var item = extract(items[k]);
+    item.pos = k;
+    result.push(item);
+}
+return JSON.stringify({reset: reset, anchor: anchor, start: start, total: items.length, items: result});
+""" % (_EXTRACT_ITEM_JS, _IS_ITEM_JS)
+
+# 在聊天容器上安装MutationObserver，只把新插入的消息项放入页面内队列；
+# 消息项判断与快照/增量模式相同，没有data-id的项在Python端按内容指纹识别，
+# 同一个节点被移动或重新插入时不会再次放入队列
+STREAM_INSTALL_SCRIPT = """
+var container = document.querySelector("div[class*='webcast-chatroom___items']");
+if (!container) return false;
+var previous = window.__dyStream;
+if (previous && previous.observer) {
+    previous.observer.disconnect();
+}
+var extract = %s;
+var isItem = %s;
+// 旧观察器队列中尚未取出的消息保留下来，已放入过队列的节点不会再放入
+var stream = {container: container, queue: previous ? previous.queue : [], notify: null, observer: null};
+var enqueue = function(node) {
+    if (node.__dyQueued) return;
+    node.__dyQueued = true;
+    stream.queue.push(extract(node));
+};
+var push = function(node) {
+    if (isItem(node)) {
+        enqueue(node);
+    } else if (node.nodeType === 1) {
+        var nested = node.querySelectorAll("div[class*='webcast-chatroom___item']");
+        for (var i = 0; i < nested.length; i++) {
+            if (isItem(nested[i])) enqueue(nested[i]);
+        }
+    }
+};
+stream.observer = new MutationObserver(function(mutations) {
+    for (var i = 0; i < mutations.length; i++) {
+        var added = mutations[i].addedNodes;
+        for (var j = 0; j < added.length; j++) push(added[j]);
+    }
+    if (stream.queue.length && stream.notify) stream.notify();
+});
+// 先把当前已有的消息放入队列，之后只接收新插入的
+push(container);
+stream.observer.observe(container, {childList: true, subtree: true});
+window.__dyStream = stream;
+return true;
+""" % (_EXTRACT_ITEM_JS, _IS_ITEM_JS)
+
+# 等待队列中出现新消息（最多等待arguments[0]毫秒），取出并清空队列
+# 观察器失效（页面刷新或容器被替换）时返回null，由Python端重新安装
+STREAM_DRAIN_SCRIPT = """
+var timeoutMs = arguments[0];
+var done = arguments[arguments.length - 1];
+var stream = window.__dyStream;
+if (!stream || !document.contains(stream.container)) { done(null); return; }
+var timer = null;
+var flush = function() {
+    if (timer) clearTimeout(timer);
+    stream.notify = null;
+    var items = stream.queue;
+    stream.queue = [];
+    done(JSON.stringify(items));
+};
+if (stream.queue.length) { flush(); return; }
+stream.notify = flush;
+timer = setTimeout(flush, timeoutMs);
+"""
+
 class LiveCrawler:
-    def __init__(self):
+    def __init__(self, mode: str = MODE_SNAPSHOT, stream_wait_ms: int = 1000,
+                 record_dir: Optional[str] = None, incremental: bool = True,
+                 profile: str = PROFILE_FULL,
+                 user_data_dir: Optional[str] = os.path.join(PROFILE_ROOT, 'default'),
+                 browser_pool: Optional[BrowserPool] = None, parse_workers: int = 0,
+                 seen_index_file: Optional[str] = None, seen_index_save_interval: float = 30,
+                 fingerprint_ids: bool = False):
         self.driver = None
-        self.message_cache = MessageCache()
+        self.mode = mode
+        self.profile = profile
         
-    def setup(self):
-        """设置Chrome浏览器"""
+        # 启动加速：持久化用户目录和可选的预热浏览器池
+        self.user_data_dir = user_data_dir
+        self.browser_pool = browser_pool
+        self._profile_dir = None
+        self._pool = None  # 当前浏览器所属的浏览器池，关闭预热开关后仍需归还给它
+        self.startup_timings = {}
+        self._browser_processes = {}  # pid -> psutil.Process，用于资源统计
+        
+        # 快照模式下的增量游标：最后一个有data-id的消息ID、它在列表中的位置，
+        # 以及它之后已处理过的消息项数（没有data-id的项不能作为游标）
+        self.incremental = incremental
+        self._cursor_id = None
+        self._cursor_pos = 0
+        self._cursor_tail = 0
+        self.last_list_size = 0  # 最近一次看到的消息列表长度
+        self.last_fetch_failed = False  # 最近一次获取是否出错
+        
+        # 逐元素模式下缓存的选择器，以及探测/提取耗时统计
+        self._container_selector = None
+        self._item_selector = None
+        self.metrics = {
+            'discovery_runs': 0,
+            'discovery_seconds': 0.0,
+            'extraction_runs': 0,
+            'extraction_seconds': 0.0
+        }
+        self.full_scans = 0  # 游标失效导致的全量扫描次数
+        self.stream_wait_ms = stream_wait_ms  # 流式模式下单次等待新消息的最长时间
+        self._stream_installed = False
+        
+        # 网络帧模式下已识别的推送通道
+        self._push_socket_ids = set()
+        
+        # 录制目录：网络帧模式保存原始推送帧，其余模式保存聊天容器HTML快照
+        self.record_dir = record_dir
+        self._recorded_frames = 0
+        self._recorded_snapshots = 0
+        
+        # HTML批量解析模式：parse_workers > 0 时在进程池中解析，爬虫线程只负责取HTML
+        self.parse_workers = parse_workers
+        self._parse_executor = None
+        self._pending_parses = deque()
+        
+        # 已发出消息ID的索引，指定文件时跨爬虫重启保留，避免重复触发游戏命令
+        self.seen_index_file = seen_index_file
+        self.seen_index_save_interval = seen_index_save_interval
+        self._seen_index_saved_at = time.time()
+        seen_index = SeenIdIndex()
+        if seen_index_file:
+            try:
+                loaded = seen_index.load(seen_index_file)
+                if loaded:
+                    print(f"已加载 {loaded} 条已见消息ID: {seen_index_file}")
+            except Exception as e:
+                print(f"加载已见消息索引失败: {str(e)}")
+        # fingerprint_ids: 页面的data-id在重新渲染时会变化时，全部改用内容指纹识别消息
+        self.message_cache = MessageCache(seen_index, fingerprint_ids=fingerprint_ids)
+        self.classifier = MessageClassifier()
+        self.gift_resolver = gift_resolver
+        
+    def _pool_key(self) -> tuple:
+        """浏览器启动参数只取决于浏览器配置和是否开启performance日志"""
+        return (self.profile, self.mode == MODE_NETWORK)
+        
+    def _build_options(self, user_data_dir: Optional[str]):
+        """生成Chrome启动参数"""
         options = webdriver.ChromeOptions()
         options.add_argument('--no-sandbox')
         options.add_argument('--disable-dev-shm-usage')
@@ -42,167 +305,516 @@ class LiveCrawler:
         if chrome_binary:
             options.binary_location = chrome_binary
             
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=options)
+        if self.profile == PROFILE_LEAN:
+            options.add_argument('--headless=new')
+            options.add_argument('--mute-audio')
+            options.add_argument('--autoplay-policy=user-gesture-required')
+            options.add_argument('--window-size=800,600')
+            options.add_argument('--disable-background-networking')
+            
+        if self.mode == MODE_NETWORK:
+            # 开启performance日志以获取WebSocket帧
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+            options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+            
+        if user_data_dir:
+            # 持久化用户目录，避免每次以全新配置冷启动
+            options.add_argument(f'--user-data-dir={user_data_dir}')
+            
+        return options
+        
+    def _launch_driver(self, user_data_dir: Optional[str]):
+        """启动Chrome，缓存的驱动与浏览器版本不匹配时重新下载驱动"""
+        options = self._build_options(user_data_dir)
+        try:
+            return webdriver.Chrome(service=Service(resolve_driver_path()), options=options)
+        except SessionNotCreatedException as e:
+            print(f"缓存的驱动无法启动浏览器，重新获取驱动: {str(e).splitlines()[0]}")
+            return webdriver.Chrome(service=Service(resolve_driver_path(force_refresh=True)), options=options)
+        
+    def setup(self):
+        """设置Chrome浏览器"""
+        timings = {}
+        phase_start = time.perf_counter()
+        
+        # 优先使用预热好的浏览器
+        driver, profile_dir = None, None
+        if self.browser_pool:
+            driver, profile_dir = self.browser_pool.acquire(self._pool_key())
+            timings['acquire_warm'] = time.perf_counter() - phase_start
+            
+        if driver is None:
+            if self.browser_pool:
+                profile_dir = self.browser_pool.reserve_profile_dir()
+            elif self.user_data_dir:
+                profile_dir = os.path.abspath(self.user_data_dir)
+            
+            phase_start = time.perf_counter()
+            resolve_driver_path()
+            timings['driver_resolve'] = time.perf_counter() - phase_start
+            
+            phase_start = time.perf_counter()
+            try:
+                driver = self._launch_driver(profile_dir)
+            except Exception:
+                if self.browser_pool:
+                    self.browser_pool.discard_profile_dir(profile_dir)
+                raise
+            timings['chrome_launch'] = time.perf_counter() - phase_start
+            
+        self.driver = driver
+        self._profile_dir = profile_dir
+        self._pool = self.browser_pool
+        self._browser_processes = {}
+        
+        phase_start = time.perf_counter()
+        if self.profile == PROFILE_LEAN:
+            # 屏蔽视频流、字体、样式和非礼物图片的请求
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URL_PATTERNS})
+        if self.mode == MODE_NETWORK:
+            # 丢弃复用浏览器中残留的日志
+            self.driver.get_log('performance')
+        timings['configure'] = time.perf_counter() - phase_start
+        
+        self.startup_timings = timings
+        self._print_timings("浏览器启动", timings)
+        
+    def prewarm(self):
+        """按当前模式和浏览器配置在后台预热一个浏览器"""
+        if self.browser_pool:
+            self.browser_pool.prewarm(self._pool_key(), self._launch_driver)
+        
+    def _print_timings(self, title: str, timings: dict):
+        parts = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items())
+        print(f"{title}耗时: {parts}")
+        
+    def sample_browser_usage(self) -> Optional[dict]:
+        """统计chromedriver及其Chrome子进程的CPU和内存占用，需要安装psutil"""
+        if psutil is None:
+            print("统计浏览器资源需要安装psutil")
+            return None
+        if not self.driver or not self.driver.service.process:
+            return None
+        
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        
+        cpu_percent = 0.0
+        rss = 0
+        alive = {}
+        for process in processes:
+            # 复用Process对象，cpu_percent才能计算两次采样之间的占用
+            process = self._browser_processes.get(process.pid, process)
+            try:
+                cpu_percent += process.cpu_percent(interval=None)
+                rss += process.memory_info().rss
+                alive[process.pid] = process
+            except psutil.Error:
+                continue
+        self._browser_processes = alive
+        
+        return {
+            'profile': self.profile,
+            'processes': len(alive),
+            'cpu_percent': cpu_percent,
+            'rss_mb': rss / 1024 / 1024
+        }
         
     def start(self, live_url: str):
         """开始访问直播间"""
+        phase_start = time.perf_counter()
         self.driver.get(live_url)
+        navigate = time.perf_counter() - phase_start
+        
         # 等待聊天框加载
+        phase_start = time.perf_counter()
         WebDriverWait(self.driver, 20).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "div[class*='webcast-chatroom']"))
         )
+        timings = {'navigate': navigate, 'chat_ready': time.perf_counter() - phase_start}
+        self.startup_timings.update(timings)
+        self._print_timings("进入直播间", timings)
+        self._stream_installed = False
+        self._push_socket_ids = set()
+        self._cursor_id = None
+        self._cursor_pos = 0
+        self._cursor_tail = 0
+        self._container_selector = None
+        self._item_selector = None
+        if self.mode == MODE_STREAM:
+            # 异步脚本需要比单次等待时间更长的超时
+            self.driver.set_script_timeout(self.stream_wait_ms / 1000 + 5)
+        
+    @property
+    def blocks_until_messages(self) -> bool:
+        """fetch_messages 是否会自行等待新消息（无需调用方再休眠）"""
+        return self.mode == MODE_STREAM
         
     def fetch_messages(self):
         """获取新消息"""
+        if self.record_dir and self.mode != MODE_NETWORK:
+            self._record_snapshot()
+        
+        # 提取耗时不包含其中的选择器探测耗时
+        self.last_fetch_failed = False
+        start = time.perf_counter()
+        discovery_before = self.metrics['discovery_seconds']
+        messages = self._fetch_messages_by_mode()
+        elapsed = time.perf_counter() - start - (self.metrics['discovery_seconds'] - discovery_before)
+        self.metrics['extraction_runs'] += 1
+        self.metrics['extraction_seconds'] += elapsed
+        
+        if self.seen_index_file and time.time() - self._seen_index_saved_at >= self.seen_index_save_interval:
+            self.save_seen_index()
+        return messages
+        
+    def fetch_batch(self) -> MessageBatch:
+        """获取新消息，以列式批次返回"""
+        return MessageBatch.from_messages(self.fetch_messages())
+        
+    def save_seen_index(self):
+        """把已见消息ID索引保存到文件"""
+        self._seen_index_saved_at = time.time()
+        if not self.seen_index_file:
+            return
         try:
-            # 使用WebDriverWait等待聊天容器加载
-            wait = WebDriverWait(self.driver, 5)
-            chat_container = None
-            
-            # 尝试获取聊天容器
-            for selector in [
-                "div[class*='webcast-chatroom___items']",
-                "div[class*='webcast-chatroom___list']",
-                "div[class*='ChatRoom-ScrollContent']"
-            ]:
+            self.message_cache.seen_index.save(self.seen_index_file)
+        except Exception as e:
+            print(f"保存已见消息索引失败: {str(e)}")
+        
+    def _fetch_messages_by_mode(self):
+        """按当前采集模式获取新消息"""
+        if self.mode == MODE_STREAM:
+            return self._fetch_messages_by_stream()
+        if self.mode == MODE_NETWORK:
+            return self._fetch_messages_by_network()
+        if self.mode == MODE_HTML:
+            return self._fetch_messages_by_html()
+        if self.mode == MODE_SNAPSHOT:
+            if self.incremental:
+                return self._fetch_messages_after_cursor()
+            return self._fetch_messages_by_snapshot()
+        return self._fetch_messages_by_elements()
+        
+    def _fetch_messages_by_html(self):
+        """取一次聊天容器HTML并批量解析；使用进程池时返回已完成的解析结果"""
+        try:
+            html = self.driver.execute_script(CONTAINER_HTML_SCRIPT)
+            
+            if self.parse_workers <= 0:
+                return self._store_parsed_items(parse_chat_items(html) if html else [])
+            
+            if self._parse_executor is None:
+                self._parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+            if html:
+                self._pending_parses.append(self._parse_executor.submit(parse_chat_items, html))
+            
+            # 积压过多时等待最早的结果，避免内存增长
+            if len(self._pending_parses) > self.parse_workers * 2:
+                self._pending_parses[0].result()
+            
+            # 按提交顺序取出已完成的结果，保证去重按时间顺序进行
+            new_messages = []
+            while self._pending_parses and self._pending_parses[0].done():
+                items = self._pending_parses.popleft().result()
+                new_messages.extend(self._store_parsed_items(items))
+            return new_messages
+            
+        except Exception as e:
+            print(f"获取消息错误: {str(e)}")
+            self.last_fetch_failed = True
+            return []
+            
+    def _store_parsed_items(self, items):
+        """把解析出的消息项转换为消息并与上一次快照比较"""
+        self.last_list_size = len(items)
+        current_messages = []
+        for item_data in items:
+            try:
+                message = self._build_message(item_data)
+                if message:
+                    current_messages.append(message)
+            except Exception:
+                continue
+        return self.message_cache.compare_and_store(current_messages)
+            
+    def _fetch_messages_after_cursor(self):
+        """只提取游标之后的消息，游标消息被移出列表时退化为全量扫描"""
+        try:
+            payload = self.driver.execute_script(INCREMENTAL_SCRIPT, self._cursor_id, self._cursor_pos,
+                                                 self._cursor_tail)
+            if not payload:
+                return []
+            return self._store_incremental_result(json.loads(payload))
+            
+        except Exception as e:
+            print(f"获取消息错误: {str(e)}")
+            self.last_fetch_failed = True
+            self._cursor_id = None
+            return []
+            
+    def _store_incremental_result(self, result: dict):
+        """处理增量提取脚本的结果 {reset, anchor, total, items}：移动游标，返回新消息"""
+        self.last_list_size = result['total']
+        if result['reset']:
+            self.full_scans += 1
+            self._cursor_id = None
+        anchor_pos = result['anchor']
+        
+        new_messages = []
+        slots = []
+        for item_data in result['items']:
+            if item_data.get('id'):
+                self._cursor_id = item_data['id']
+                anchor_pos = item_data['pos']
+            try:
+                message = self._build_message(item_data)
+            except Exception:
+                continue
+            if message:
+                new_messages.append(message)
+                # 没有data-id的项以（前一个游标ID, 相对位置）标识，重复读到时得到相同的指纹
+                slots.append((self._cursor_id, item_data['pos'] - anchor_pos))
+        
+        # 游标之后直到列表末尾的项都已处理，包括没有data-id的项，下次从其后开始
+        if self._cursor_id is not None:
+            self._cursor_pos = anchor_pos
+            self._cursor_tail = max(0, result['total'] - 1 - anchor_pos)
+        else:
+            self._cursor_pos = 0
+            self._cursor_tail = 0
+        if not new_messages:
+            return []
+        
+        # 游标之后的消息都是新消息；全量扫描时依靠最近ID过滤重复
+        if result['reset']:
+            return self.message_cache.store_incremental(new_messages, full_list=True)
+        return self.message_cache.store_incremental(new_messages, slots=slots)
+        
+    def _fetch_messages_by_network(self):
+        """从performance日志中取出推送帧并直接解码为消息"""
+        try:
+            entries = self.driver.get_log('performance')
+            frames = extract_frames_from_performance_log(entries, self._push_socket_ids)
+            
+            new_messages = []
+            for frame in frames:
+                if self.record_dir:
+                    self._record_frame(frame)
                 try:
-                    chat_container = wait.until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    if chat_container:
-                        break
-                except:
+                    new_messages.extend(decode_push_frame(frame))
+                except Exception:
+                    # 非消息帧或无法识别的帧
                     continue
             
-            if not chat_container:
+            return self.message_cache.store_incremental(new_messages)
+            
+        except Exception as e:
+            print(f"获取消息错误: {str(e)}")
+            self.last_fetch_failed = True
+            return []
+            
+    def _record_frame(self, frame: bytes):
+        """保存原始推送帧，供离线回放和基准测试使用"""
+        try:
+            os.makedirs(self.record_dir, exist_ok=True)
+            path = os.path.join(self.record_dir, f"{self._recorded_frames:08d}.bin")
+            with open(path, 'wb') as f:
+                f.write(frame)
+            self._recorded_frames += 1
+        except Exception as e:
+            print(f"录制推送帧失败: {str(e)}")
+            
+    def _record_snapshot(self):
+        """保存聊天容器HTML快照，供回放工具(src.crawler.replay)使用"""
+        try:
+            html = self.driver.execute_script(CONTAINER_HTML_SCRIPT)
+            if not html:
+                return
+            os.makedirs(self.record_dir, exist_ok=True)
+            path = os.path.join(self.record_dir, f"{self._recorded_snapshots:08d}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            self._recorded_snapshots += 1
+        except Exception as e:
+            print(f"录制聊天快照失败: {str(e)}")
+            
+    def _fetch_messages_by_stream(self):
+        """从页面内MutationObserver队列中取出新插入的消息"""
+        try:
+            if not self._stream_installed:
+                self._stream_installed = bool(self.driver.execute_script(STREAM_INSTALL_SCRIPT))
+                if not self._stream_installed:
+                    # 聊天容器尚未出现，稍后重试
+                    time.sleep(self.stream_wait_ms / 1000)
+                    return []
+                print("消息流观察器已安装")
+            
+            payload = self.driver.execute_async_script(STREAM_DRAIN_SCRIPT, self.stream_wait_ms)
+            if payload is None:
+                # 页面刷新或容器被替换，下次重新安装观察器
+                print("消息流观察器已失效，准备重新安装")
+                self._stream_installed = False
                 return []
             
-            # 获取所有消息项
-            chat_items = []
-            try:
-                # 使用WebDriverWait等待消息项加载
-                items = wait.until(
-                    EC.presence_of_all_elements_located(
-                        (By.CSS_SELECTOR, "div[class*='webcast-chatroom___item']")
+            new_messages = []
+            for item_data in json.loads(payload):
+                try:
+                    message = self._build_message(item_data)
+                    if message:
+                        new_messages.append(message)
+                except Exception:
+                    continue
+            
+            # 观察器只推送新插入的节点，但虚拟列表可能重新插入旧节点
+            return self.message_cache.store_incremental(new_messages)
+            
+        except Exception as e:
+            print(f"获取消息错误: {str(e)}")
+            self.last_fetch_failed = True
+            self._stream_installed = False
+            return []
+        
+    def _fetch_messages_by_snapshot(self):
+        """通过一次execute_script获取整个聊天列表的快照"""
+        try:
+            payload = self.driver.execute_script(SNAPSHOT_SCRIPT)
+            if not payload:
+                return []
+            
+            items = json.loads(payload)
+            self.last_list_size = len(items)
+            current_messages = []
+            for item_data in items:
+                try:
+                    message = self._build_message(item_data)
+                    if message:
+                        current_messages.append(message)
+                except Exception:
+                    continue
+            
+            # 比较并获取新消息
+            return self.message_cache.compare_and_store(current_messages)
+            
+        except Exception as e:
+            print(f"获取消息错误: {str(e)}")
+            self.last_fetch_failed = True
+            return []
+        
+    def _validate_selectors(self) -> bool:
+        """不等待地检查缓存的容器选择器是否仍然有效"""
+        if not self._container_selector:
+            return False
+        try:
+            return bool(self.driver.find_elements(By.CSS_SELECTOR, self._container_selector))
+        except Exception:
+            return False
+        
+    def _discover_selectors(self) -> bool:
+        """探测可用的容器和消息项选择器并缓存，每个会话通常只需执行一次"""
+        start = time.perf_counter()
+        self._container_selector = None
+        self._item_selector = None
+        try:
+            # 先不等待地逐个尝试；都不存在时对所有候选只等待一次
+            found = [sel for sel in CONTAINER_SELECTORS if self.driver.find_elements(By.CSS_SELECTOR, sel)]
+            if not found:
+                try:
+                    WebDriverWait(self.driver, 5).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(CONTAINER_SELECTORS)))
                     )
-                )
-                chat_items.extend(items)
-            except:
+                except Exception:
+                    return False
+                found = [sel for sel in CONTAINER_SELECTORS if self.driver.find_elements(By.CSS_SELECTOR, sel)]
+            
+            for container_selector in found:
+                container = self.driver.find_element(By.CSS_SELECTOR, container_selector)
+                for item_selector in ITEM_SELECTORS:
+                    if container.find_elements(By.CSS_SELECTOR, item_selector):
+                        self._container_selector = container_selector
+                        self._item_selector = item_selector
+                        print(f"探测到聊天选择器: 容器={container_selector}, 消息项={item_selector}")
+                        return True
+            return False
+        except Exception as e:
+            print(f"探测聊天选择器失败: {str(e)}")
+            return False
+        finally:
+            self.metrics['discovery_runs'] += 1
+            self.metrics['discovery_seconds'] += time.perf_counter() - start
+        
+    def get_metrics(self) -> dict:
+        """获取选择器探测与消息提取的耗时统计"""
+        metrics = dict(self.metrics)
+        metrics['container_selector'] = self._container_selector
+        metrics['item_selector'] = self._item_selector
+        metrics['seen_index'] = self.message_cache.seen_index.get_stats()
+        return metrics
+        
+    def _fetch_messages_by_elements(self):
+        """逐个元素通过WebDriver获取消息"""
+        try:
+            # 使用缓存的选择器，失效时才重新探测
+            if not self._validate_selectors() and not self._discover_selectors():
+                return []
+            
+            chat_container = self.driver.find_element(By.CSS_SELECTOR, self._container_selector)
+            chat_items = chat_container.find_elements(By.CSS_SELECTOR, self._item_selector)
+            if not chat_items:
                 return []
+            self.last_list_size = len(chat_items)
             
             # 解析所有消息
             current_messages = []
             for item in chat_items:
                 try:
                     # 立即获取必要的信息，避免stale element
-                    message_data = {
+                    item_data = {
                         'id': item.get_attribute('data-id'),
-                        'html': item.get_attribute('outerHTML'),
+                        'user': None,
                         'text': '',
-                        'user_id': ''
+                        'img_srcs': []
                     }
                     
                     # 尝试获取用户名
                     try:
                         username_element = item.find_element(By.CLASS_NAME, "u2QdU6ht")
                         if username_element:
-                            message_data['user_id'] = username_element.text.strip()
-                            if message_data['user_id'].endswith('：'):
-                                message_data['user_id'] = message_data['user_id'][:-1]
+                            item_data['user'] = username_element.text.strip()
                     except:
-                        message_data['user_id'] = "未知用户"
+                        pass
                     
                     # 尝试获取消息内容
                     try:
                         content_element = item.find_element(By.CLASS_NAME, "webcast-chatroom___content-with-emoji-text")
                         if content_element:
-                            message_data['text'] = content_element.text.strip()
+                            item_data['text'] = content_element.text.strip()
                     except:
                         try:
                             content_element = item.find_element(By.CLASS_NAME, "WsJsvMP9")
                             if content_element:
-                                message_data['text'] = content_element.text.strip()
+                                item_data['text'] = content_element.text.strip()
                         except:
                             continue
                     
-                    if not message_data['text'] or not message_data['id']:
+                    if not item_data['text'] or not item_data['id']:
                         continue
                     
-                    # 判断消息类型并处理礼物信息
-                    message_type = MessageType.CHAT
-                    if "送出了" in message_data['text']:
-                        message_type = MessageType.GIFT
-                        try:
-                            # 获取礼物数量
-                            gift_count = 1
-                            if "×" in message_data['text']:
-                                count_str = message_data['text'].split("×")[1].strip()
-                                try:
-                                    gift_count = int(count_str)
-                                except:
-                                    gift_count = 1
-                            
-                            # 获取礼物图片信息
-                            img_elements = item.find_elements(By.TAG_NAME, "img")
-                            gift_md5 = None
-                            gift_image_url = None
-                            for img in img_elements:
-                                try:
-                                    gift_src = img.get_attribute("src")
-                                    # 排除用户等级图标
-                                    if not gift_src:
-                                        continue
-                                    if "new_user_grade_level" in gift_src:
-                                        continue
-                                    if "fansclub" in gift_src:
-                                        continue
-                                    if "webcast_admin_badge" in gift_src:
-                                        continue
-                                        
-                                    # 只处理礼物图片
-                                    if ("~tplv-obj" in gift_src or "webcast/gift" in gift_src):
-                                        if "~tplv-obj" in gift_src:
-                                            gift_md5 = gift_src.split("/")[-1].split("~")[0]
-                                        else:
-                                            gift_md5 = gift_src.split("/")[-1].split(".")[0]
-                                        
-                                        if gift_md5.endswith('.png'):
-                                            gift_md5 = gift_md5[:-4]
-                                        
-                                        gift_image_url = gift_src
-                                        break
-                                except:
-                                    continue
-                            
-                            # 更新礼物消息文本和数据
-                            if gift_md5:
-                                message_data['text'] = f"送出了 [md5: {gift_md5}] × {gift_count}"
-                                message_data['gift_md5'] = gift_md5
-                                message_data['gift_image_url'] = gift_image_url
-                            else:
-                                message_data['text'] = f"送出了礼物 × {gift_count}"
-                            message_data['gift_count'] = gift_count
-                        except Exception as e:
-                            print(f"处理礼物信息出错: {str(e)}")
-                    elif "为主播点赞了" in message_data['text'] or "点赞" in message_data['text']:
-                        message_type = MessageType.LIKE
-                    elif any(x in message_data['text'] for x in ["来了", "进入直播间", "欢迎光临"]):
-                        message_type = MessageType.ENTER
-                    elif "欢迎来到直播间！抖音严禁" in message_data['text']:
-                        continue
+                    # 只有礼物消息才需要读取图片地址
+                    if "送出了" in item_data['text']:
+                        for img in item.find_elements(By.TAG_NAME, "img"):
+                            try:
+                                item_data['img_srcs'].append(img.get_attribute("src"))
+                            except:
+                                continue
                     
-                    # 创建消息对象
-                    message = Message(
-                        message_id=message_data['id'],
-                        type=message_type,
-                        content=message_data['text'],
-                        user_name=message_data['user_id'],
-                        timestamp=datetime.now(),
-                        gift_md5=message_data.get('gift_md5'),
-                        gift_count=message_data.get('gift_count', 1) if message_type == MessageType.GIFT else None
-                    )
-                    current_messages.append(message)
+                    message = self._build_message(item_data)
+                    if message:
+                        current_messages.append(message)
                     
                 except Exception as e:
                     continue
@@ -213,8 +825,50 @@ class LiveCrawler:
             
         except Exception as e:
             print(f"获取消息错误: {str(e)}")
+            self.last_fetch_failed = True
             return []
             
+    def _build_message(self, item_data: dict) -> Optional[Message]:
+        """根据提取出的消息数据 {id, user, text, img_srcs} 创建消息对象"""
+        # 没有data-id时message_id为None，由消息缓存分配内容指纹
+        message_id = item_data.get('id')
+        text = item_data.get('text') or ''
+        if not text:
+            return None
+        
+        user_name = item_data.get('user')
+        if user_name is None:
+            user_name = "未知用户"
+        elif user_name.endswith('：'):
+            user_name = user_name[:-1]
+        
+        # 判断消息类型，礼物数量在同一次匹配中得到
+        message_type, gift_count = self.classifier.classify(text)
+        if message_type is None:
+            return None
+        
+        gift_md5 = gift_image_url = None
+        if message_type == MessageType.GIFT:
+            # 获取礼物图片信息，图片地址随消息传给界面下载礼物图标
+            gift_md5, gift_image_url = self.gift_resolver.resolve_first(item_data.get('img_srcs') or [])
+            
+            # 更新礼物消息文本
+            if gift_md5:
+                text = f"送出了 [md5: {gift_md5}] × {gift_count}"
+            else:
+                text = f"送出了礼物 × {gift_count}"
+        
+        return Message(
+            message_id=message_id,
+            type=message_type,
+            content=text,
+            user_name=user_name,
+            timestamp=datetime.now(),
+            gift_md5=gift_md5,
+            gift_count=gift_count,
+            gift_image_url=gift_image_url
+        )
+        
     def _parse_message(self, element) -> Message:
         """解析消息元素"""
         try:
@@ -242,6 +896,7 @@ class LiveCrawler:
                     content = ""
                     gift_md5 = None
                     gift_count = None
+                    gift_image_url = None
 
                     # 首先尝试获取emoji文本内容
                     try:
@@ -274,56 +929,25 @@ class LiveCrawler:
                     if not content:
                         return None
 
-                    # 处理礼物消息
-                    if "送出了" in content:
-                        try:
-                            # 获取礼物数量
-                            if "×" in content:
-                                count_str = content.split("×")[1].strip()
-                                gift_count = int(count_str)
-                            else:
-                                gift_count = 1
-
-                            # 获取礼物图片信息
-                            img_elements = element.find_elements(By.TAG_NAME, "img")
-                            for img in img_elements:
-                                gift_src = img.get_attribute("src")
-                                if gift_src and ("~tplv-obj" in gift_src or "webcast/gift" in gift_src):
-                                    gift_md5 = gift_src.split("/")[-1].split("~")[0]
-                                    if gift_md5.endswith('.png'):
-                                        gift_md5 = gift_md5[:-4]
-                                    break
-                        except Exception as e:
-                            print(f"处理礼物消息出错: {str(e)}")
-                            gift_count = 1
-
-                    # 创建原始数据字典
-                    raw_data = {
-                        "text": content,
-                        "user_id": user_id,
-                        "message_id": message_id,
-                        "gift_md5": gift_md5,
-                        "gift_count": gift_count
-                    }
-
                     # 判断消息类型
-                    message_type = MessageType.CHAT  # 默认为聊天消息
-                    if "送出了" in content:
-                        message_type = MessageType.GIFT
-                    elif "为主播点赞了" in content or "点赞" in content:
-                        message_type = MessageType.LIKE
-                    elif any(x in content for x in ["来了", "进入直播间", "欢迎光临"]):
-                        message_type = MessageType.ENTER
-                    elif "欢迎来到直播间！抖音严禁" in content:
+                    message_type, gift_count = self.classifier.classify(content)
+                    if message_type is None:
                         return None
 
+                    # 获取礼物图片信息
+                    if message_type == MessageType.GIFT:
+                        img_srcs = [img.get_attribute("src") for img in element.find_elements(By.TAG_NAME, "img")]
+                        gift_md5, gift_image_url = self.gift_resolver.resolve_first(img_srcs)
+
                     return Message(
+                        message_id=message_id,
                         type=message_type,
-                        user_id=user_id,
                         content=content,
+                        user_name=user_id,
                         timestamp=datetime.now(),
-                        raw_data=raw_data,
-                        message_id=message_id
+                        gift_md5=gift_md5,
+                        gift_count=gift_count,
+                        gift_image_url=gift_image_url
                     )
 
                 except Exception as e:
@@ -338,6 +962,16 @@ class LiveCrawler:
             return None
             
     def close(self):
-        """关闭浏览器"""
+        """关闭浏览器；使用浏览器池时归还浏览器以便下次直接复用"""
+        if self._parse_executor:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
+            self._parse_executor = None
+            self._pending_parses.clear()
+        self.save_seen_index()
         if self.driver:
-            self.driver.quit() 
\ No newline at end of file
+            if self._pool is not None:
+                self._pool.release(self._pool_key(), self.driver, self._profile_dir)
+            else:
+                self.driver.quit()
+            self.driver = None
+            self._pool = None 
\ No newline at end of file
@@ -1,19 +1,40 @@
 from collections import deque
 from datetime import datetime
+from typing import Callable, Optional
+import time
 from ..models.message import Message, MessageType
+from .seen_index import SeenIdIndex
+from .fingerprint import FingerprintAssigner
 
 class MessageCache:
-    def __init__(self):
+    def __init__(self, seen_index: Optional[SeenIdIndex] = None, fingerprint_ids: bool = False,
+                 clock: Callable[[], float] = time.time):
         self.last_message_ids = set()  # 上一次爬取的消息ID集合
         self.message_buffer = deque(maxlen=1000)  # 消息缓冲区，用于UI显示
+        
+        # 已发出过的消息ID；消息移出列表后再次出现（虚拟滚动、页面重载、爬虫重启）不会重复发出
+        self.seen_index = seen_index if seen_index is not None else SeenIdIndex()
+        
+        # 没有data-id的消息使用内容指纹作为ID；fingerprint_ids为True时（data-id在重新渲染时会变化）全部使用指纹
+        self.fingerprint_ids = fingerprint_ids
+        self.fingerprints = FingerprintAssigner()
+        # 指纹的粗粒度时间取自clock，离线回放时使用固定的时钟，保证结果可重复
+        self.clock = clock
+    
+    def _assign_ids(self, messages, incremental: bool = False, slots=None):
+        if self.fingerprint_ids or any(not msg.message_id for msg in messages):
+            self.fingerprints.assign(messages, replace_ids=self.fingerprint_ids, now=self.clock(),
+                                     incremental=incremental, slots=slots)
     
     def compare_and_store(self, current_messages):
         """比较当前消息和上次消息，找出新增的消息并存储"""
+        self._assign_ids(current_messages)
+        
         # 获取当前消息的ID集合
         current_message_ids = {msg.message_id for msg in current_messages}
         
-        # 找出新增的消息ID
-        new_message_ids = current_message_ids - self.last_message_ids
+        # 找出新增的消息ID，再排除之前已经发出过的
+        new_message_ids = self.seen_index.filter_new(current_message_ids - self.last_message_ids)
         
         # 获取新增的消息对象
         new_messages = [msg for msg in current_messages if msg.message_id in new_message_ids]
@@ -27,8 +48,24 @@ class MessageCache:
         
         return new_messages
     
+    def store_incremental(self, new_messages, full_list: bool = False, slots=None):
+        """
+        存储只包含新增部分的消息列表（流式/游标模式），过滤已出现过的ID
+        
+        full_list为True表示传入的是整个可见列表（游标失效后的全量扫描），按整个列表计算指纹；
+        slots为各消息在列表中的稳定位置，同一位置被重复读到时指纹不变（见FingerprintAssigner.assign）
+        """
+        self._assign_ids(new_messages, incremental=not full_list, slots=slots)
+        result = []
+        for msg in new_messages:
+            if self.seen_index.check_and_add(msg.message_id):
+                continue
+            self.message_buffer.append(msg)
+            result.append(msg)
+        return result
+    
     def get_new_messages(self):
         """获取并清空缓冲区中的消息"""
         messages = list(self.message_buffer)
         self.message_buffer.clear()
-        return messages
\ No newline at end of file
+        return messages
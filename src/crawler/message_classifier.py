@@ -0,0 +1,95 @@
+from typing import Optional
+import json
+import os
+import re
+
+from ..models.message import MessageType
+
+# 规则按顺序匹配，排在前面的优先；IGNORE 表示丢弃该消息（如系统公告）
+DEFAULT_RULES = {
+    "rules": [
+        {"type": "GIFT", "keywords": ["送出了"]},
+        {"type": "LIKE", "keywords": ["为主播点赞了", "点赞"]},
+        {"type": "ENTER", "keywords": ["来了", "进入直播间", "欢迎光临"]},
+        {"type": "IGNORE", "keywords": ["欢迎来到直播间！抖音严禁"]}
+    ],
+    # 礼物数量的写法，例如 "送出了 × 3"；数量必须放在命名组 (?P<count>...) 中
+    "gift_count_pattern": "×\\s*(?P<count>\\d+)"
+}
+
+IGNORE = "IGNORE"
+
+
+class MessageClassifier:
+    """把所有类型关键词编译成一个正则，一次扫描按规则优先级得到消息类型，礼物消息再匹配数量"""
+
+    def __init__(self, rules_file: Optional[str] = os.path.join('config', 'message_rules.json')):
+        self.rules_file = rules_file
+        self.load_rules()
+
+    def load_rules(self):
+        """加载规则文件并重新编译"""
+        rules = DEFAULT_RULES
+        try:
+            if self.rules_file and os.path.exists(self.rules_file):
+                with open(self.rules_file, 'r', encoding='utf-8') as f:
+                    rules = json.load(f)
+            self.compile(rules)
+        except Exception as e:
+            print(f"加载消息分类规则失败，使用默认规则: {str(e)}")
+            self.compile(DEFAULT_RULES)
+
+    def compile(self, rules: dict):
+        """编译规则：关键词 -> (优先级, 类型)，所有关键词合并为一个多模式正则；礼物数量单独编译"""
+        count_pattern = re.compile(rules.get("gift_count_pattern", DEFAULT_RULES["gift_count_pattern"]))
+        if "count" not in count_pattern.groupindex:
+            raise ValueError("gift_count_pattern 必须用命名组 (?P<count>...) 标出礼物数量")
+
+        keyword_rules = {}
+        for priority, rule in enumerate(rules.get("rules", [])):
+            rule_type = rule["type"]
+            message_type = None if rule_type == IGNORE else MessageType[rule_type]
+            for keyword in rule.get("keywords", []):
+                # 同一关键词只保留优先级最高的规则
+                keyword_rules.setdefault(keyword, (priority, message_type))
+
+        # 长关键词在前，避免被其前缀截断
+        keywords = sorted(keyword_rules, key=len, reverse=True)
+        self._keyword_rules = keyword_rules
+        # 没有关键词时用不会匹配任何文本的正则
+        self._keyword_pattern = re.compile("|".join(re.escape(k) for k in keywords) if keywords else "(?!)")
+        self._search = self._keyword_pattern.search
+        self._count_pattern = count_pattern
+
+    def classify(self, text: str) -> tuple[Optional[MessageType], Optional[int]]:
+        """
+        判断消息类型
+
+        Returns:
+            (消息类型, 礼物数量)；礼物数量仅对礼物消息有效，应丢弃的消息返回 (None, None)
+        """
+        match = self._search(text)
+        if match is None:
+            return MessageType.CHAT, None
+
+        # 多个关键词同时出现时取优先级最高的规则，遇到最高优先级的规则即停止扫描
+        best = self._keyword_rules[match.group()]
+        if best[0]:
+            for match in self._keyword_pattern.finditer(text, match.end()):
+                rule = self._keyword_rules[match.group()]
+                if rule[0] < best[0]:
+                    best = rule
+                    if not rule[0]:
+                        break
+
+        message_type = best[1]
+        if message_type is not MessageType.GIFT:
+            return message_type, None
+        gift_count = None
+        match = self._count_pattern.search(text)
+        if match:
+            try:
+                gift_count = int(match.group("count"))
+            except (TypeError, ValueError):
+                pass
+        return message_type, gift_count or 1
@@ -0,0 +1,80 @@
+import random
+import time
+
+
+class AdaptivePollScheduler:
+    """
+    根据新消息速率和消息列表更替情况动态调整轮询间隔
+
+    聊天列表只保留最近的 list_size 条消息，按当前速率列表全部更替需要 list_size / rate 秒，
+    轮询间隔取其 target_fill 倍，保证在消息被移出列表之前读到；安静的直播间逐步放慢到上限。
+    连续出错时按指数退避并加入随机抖动。
+    """
+
+    def __init__(self, floor_ms: int = 50, ceiling_ms: int = 1000, initial_ms: int = 200,
+                 target_fill: float = 0.25, smoothing: float = 0.3,
+                 error_base_ms: int = 400, error_max_ms: int = 10000, jitter: float = 0.2):
+        self.floor_ms = floor_ms
+        self.ceiling_ms = ceiling_ms
+        self.target_fill = target_fill  # 每次轮询之间允许列表更替的比例
+        self.smoothing = smoothing  # 速率的指数平滑系数
+        self.error_base_ms = error_base_ms
+        self.error_max_ms = error_max_ms
+        self.jitter = jitter
+
+        self.interval_ms = min(max(initial_ms, floor_ms), ceiling_ms)
+        self.rate = 0.0  # 平滑后的新消息速率（条/秒）
+        self.churn = 0.0  # 最近一次轮询中新消息占列表的比例
+        self.missed_estimate = 0.0  # 估计遗漏的消息总数
+        self.consecutive_errors = 0
+        self._last_tick = None
+
+    def on_tick(self, new_count: int, list_size: int = 0):
+        """一次成功的轮询后调用"""
+        now = time.perf_counter()
+        elapsed = now - self._last_tick if self._last_tick else self.interval_ms / 1000
+        self._last_tick = now
+        self.consecutive_errors = 0
+
+        instant_rate = new_count / elapsed if elapsed > 0 else 0.0
+        self.rate = self.smoothing * instant_rate + (1 - self.smoothing) * self.rate
+
+        if list_size > 0:
+            self.churn = min(new_count / list_size, 1.0)
+            # 列表全部更替时，超出列表长度的部分很可能被遗漏
+            if new_count >= list_size:
+                self.missed_estimate += max(0.0, self.rate * elapsed - list_size)
+
+        if self.rate > 0 and list_size > 0:
+            interval = self.target_fill * list_size / self.rate * 1000
+            if self.churn > self.target_fill:
+                # 更替过快，立即缩短间隔
+                interval = min(interval, self.interval_ms / 2)
+        elif new_count > 0:
+            interval = self.interval_ms * 0.7
+        else:
+            # 没有新消息，逐步放慢
+            interval = self.interval_ms * 1.3
+
+        self.interval_ms = int(min(max(interval, self.floor_ms), self.ceiling_ms))
+
+    def on_error(self):
+        """一次轮询出错后调用"""
+        self.consecutive_errors += 1
+        self._last_tick = None
+        backoff = min(self.error_base_ms * 2 ** (self.consecutive_errors - 1), self.error_max_ms)
+        self.interval_ms = int(backoff * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def next_interval_ms(self) -> int:
+        """下一次轮询前应等待的毫秒数"""
+        return self.interval_ms
+
+    def get_stats(self) -> dict:
+        """获取当前调度状态"""
+        return {
+            "interval_ms": self.interval_ms,
+            "rate": self.rate,
+            "churn": self.churn,
+            "missed_estimate": int(self.missed_estimate),
+            "consecutive_errors": self.consecutive_errors
+        }
@@ -0,0 +1,212 @@
+from typing import List, Optional
+import argparse
+import json
+import os
+import time
+
+from ..models.message import Message
+from .html_parser import parse_chat_items
+from .live_crawler import LiveCrawler
+from .message_cache import MessageCache
+
+GOLDEN_FILE = "golden.jsonl"
+
+# 回放使用的固定时钟：第一个快照在 REPLAY_EPOCH 秒，之后每个快照前进 REPLAY_INTERVAL 秒，
+# 内容指纹（fp:开头的ID）与回放的实际时间无关
+REPLAY_EPOCH = 1700000000.0
+REPLAY_INTERVAL = 1.0
+
+
+def incremental_window(items: List[dict], cursor_id: Optional[str], cursor_pos: int, cursor_tail: int) -> dict:
+    """与页面中INCREMENTAL_SCRIPT相同的游标定位，作用于解析出的消息项列表"""
+    anchor = -1
+    if cursor_id is not None:
+        if cursor_pos < len(items) and items[cursor_pos].get('id') == cursor_id:
+            anchor = cursor_pos
+        else:
+            for index in range(len(items) - 1, -1, -1):
+                if items[index].get('id') == cursor_id:
+                    anchor = index
+                    break
+    reset = anchor < 0
+    start = 0 if reset else anchor + 1 + cursor_tail
+    window = [dict(item, pos=pos) for pos, item in enumerate(items[start:], start)]
+    return {"reset": reset, "anchor": anchor, "start": start, "total": len(items), "items": window}
+
+
+def _snapshot_html(items: List[tuple]) -> str:
+    """由 [(data-id或None, 用户, 内容)] 生成聊天容器HTML"""
+    parts = []
+    for item_id, user_name, text in items:
+        id_attr = f' data-id="{item_id}"' if item_id else ''
+        parts.append(f'<div class="webcast-chatroom___item"{id_attr}><span class="u2QdU6ht">{user_name}：</span>'
+                     f'<span class="webcast-chatroom___content-with-emoji-text">{text}</span></div>')
+    return '<div class="webcast-chatroom___items">' + ''.join(parts) + '</div>'
+
+
+# 没有data-id的消息停留在列表末尾多个轮询周期，期间又有新消息插入，每条只能发出一次
+IDLESS_REGRESSION_TICKS = [
+    [("a", "用户A", "主播晚上好"), (None, "用户B", "666")],
+    [("a", "用户A", "主播晚上好"), (None, "用户B", "666")],
+    [("a", "用户A", "主播晚上好"), (None, "用户B", "666"), (None, "用户B", "666")],
+    [("a", "用户A", "主播晚上好"), (None, "用户B", "666"), (None, "用户B", "666")],
+    [("a", "用户A", "主播晚上好"), (None, "用户B", "666"), (None, "用户B", "666"), ("b", "用户C", "来了")],
+    [(None, "用户B", "666"), (None, "用户B", "666"), ("b", "用户C", "来了"), (None, "用户B", "666")],
+    [(None, "用户B", "666"), (None, "用户B", "666"), ("b", "用户C", "来了"), (None, "用户B", "666")],
+]
+IDLESS_REGRESSION_EXPECTED = [("用户A", "主播晚上好"), ("用户B", "666"), ("用户B", "666"),
+                              ("用户C", "来了"), ("用户B", "666")]
+
+
+def message_to_golden(message: Message) -> dict:
+    """消息中参与比对的字段（不含时间戳）"""
+    return {
+        "message_id": message.message_id,
+        "type": message.type.name,
+        "user_name": message.user_name,
+        "content": message.content,
+        "gift_md5": message.gift_md5,
+        "gift_count": message.gift_count
+    }
+
+
+class ReplayHarness:
+    """
+    离线回放录制的聊天容器HTML快照
+
+    快照目录由爬虫的录制模式生成（每次轮询一个 *.html 文件），
+    回放时走与在线采集相同的解析、分类和去重流程，并与 golden.jsonl 比对。
+    """
+
+    def __init__(self, snapshot_dir: str, crawler: Optional[LiveCrawler] = None):
+        self.snapshot_dir = snapshot_dir
+        self.crawler = crawler or LiveCrawler()
+
+    def load_snapshots(self) -> List[str]:
+        snapshots = []
+        for name in sorted(os.listdir(self.snapshot_dir)):
+            if name.endswith('.html'):
+                with open(os.path.join(self.snapshot_dir, name), 'r', encoding='utf-8') as f:
+                    snapshots.append(f.read())
+        return snapshots
+
+    def replay(self, snapshots: List[str]) -> List[Message]:
+        """按顺序回放快照，返回去重后的新消息"""
+        clock = [REPLAY_EPOCH]
+        cache = MessageCache(clock=lambda: clock[0])
+        messages = []
+        for index, html in enumerate(snapshots):
+            clock[0] = REPLAY_EPOCH + index * REPLAY_INTERVAL
+            current_messages = []
+            for item_data in parse_chat_items(html):
+                message = self.crawler._build_message(item_data)
+                if message:
+                    current_messages.append(message)
+            messages.extend(cache.compare_and_store(current_messages))
+        return messages
+
+    def replay_incremental(self, snapshots: List[str]) -> List[Message]:
+        """按游标增量模式回放快照：每个快照只处理游标之后的消息项，与在线采集的路径相同"""
+        clock = [REPLAY_EPOCH]
+        crawler = self.crawler
+        crawler.message_cache = MessageCache(clock=lambda: clock[0])
+        crawler._cursor_id, crawler._cursor_pos, crawler._cursor_tail = None, 0, 0
+        messages = []
+        for index, html in enumerate(snapshots):
+            clock[0] = REPLAY_EPOCH + index * REPLAY_INTERVAL
+            result = incremental_window(parse_chat_items(html), crawler._cursor_id, crawler._cursor_pos,
+                                        crawler._cursor_tail)
+            messages.extend(crawler._store_incremental_result(result))
+        return messages
+
+    def check_idless_regression(self) -> List[str]:
+        """同一条没有data-id的消息在多个轮询周期中被读到时，两种模式都只能发出一次；返回发现的问题"""
+        snapshots = [_snapshot_html(items) for items in IDLESS_REGRESSION_TICKS]
+        problems = []
+        for name, replay in [("快照", self.replay), ("增量", self.replay_incremental)]:
+            actual = [(message.user_name, message.content) for message in replay(snapshots)]
+            if actual != IDLESS_REGRESSION_EXPECTED:
+                problems.append(f"{name}模式: 期望 {IDLESS_REGRESSION_EXPECTED}, 实际 {actual}")
+        return problems
+
+    def load_golden(self) -> Optional[List[dict]]:
+        path = os.path.join(self.snapshot_dir, GOLDEN_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def save_golden(self, messages: List[Message]):
+        path = os.path.join(self.snapshot_dir, GOLDEN_FILE)
+        with open(path, 'w', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message_to_golden(message), ensure_ascii=False) + "\n")
+        print(f"已写入 {len(messages)} 条标准结果: {path}")
+
+    def run(self, update_golden: bool = False, rounds: int = 1) -> dict:
+        """
+        回放并比对结果
+
+        Returns:
+            {'snapshots', 'messages', 'seconds', 'messages_per_second', 'mismatches', 'regressions', 'passed'}
+        """
+        snapshots = self.load_snapshots()
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            messages = self.replay(snapshots)
+        elapsed = time.perf_counter() - start
+
+        if update_golden:
+            self.save_golden(messages)
+
+        mismatches = []
+        golden = self.load_golden()
+        if golden is not None:
+            actual = [message_to_golden(message) for message in messages]
+            for index in range(max(len(actual), len(golden))):
+                expected_item = golden[index] if index < len(golden) else None
+                actual_item = actual[index] if index < len(actual) else None
+                if expected_item != actual_item:
+                    mismatches.append({"index": index, "expected": expected_item, "actual": actual_item})
+
+        total = len(messages) * rounds
+        regressions = self.check_idless_regression()
+        return {
+            "snapshots": len(snapshots),
+            "messages": len(messages),
+            "seconds": elapsed,
+            "messages_per_second": total / elapsed if elapsed > 0 else 0.0,
+            "mismatches": mismatches,
+            "regressions": regressions,
+            "passed": golden is not None and not mismatches and not regressions
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放录制的聊天快照并检查解析结果")
+    parser.add_argument("snapshot_dir", help="录制的快照目录")
+    parser.add_argument("--update-golden", action="store_true", help="用本次结果更新golden.jsonl")
+    parser.add_argument("--rounds", type=int, default=1, help="重复回放次数，用于测量吞吐量")
+    args = parser.parse_args()
+
+    result = ReplayHarness(args.snapshot_dir).run(args.update_golden, args.rounds)
+    print(f"快照 {result['snapshots']} 个, 消息 {result['messages']} 条, "
+          f"耗时 {result['seconds']:.3f}s, {result['messages_per_second']:,.0f} 条/秒")
+    for mismatch in result['mismatches'][:20]:
+        print(f"第 {mismatch['index']} 条不一致:\n  期望: {mismatch['expected']}\n  实际: {mismatch['actual']}")
+    for problem in result['regressions']:
+        print(f"无data-id消息回归检查失败: {problem}")
+    if result['passed']:
+        print("回放结果与标准结果一致")
+    elif result['regressions']:
+        raise SystemExit(1)
+    elif not result['mismatches']:
+        print("没有标准结果，使用 --update-golden 生成")
+    else:
+        print(f"共 {len(result['mismatches'])} 条不一致")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+from typing import Dict, List, Optional
+import multiprocessing
+import os
+import queue
+import time
+
+from ..models.message import Message
+from ..models.message_batch import MessageBatch
+from ..models.message_store import MessageStore
+from ..models.message_codec import decode_records, encode_records
+from .live_crawler import LiveCrawler, MODE_SNAPSHOT, PROFILE_FULL
+from .browser_pool import PROFILE_ROOT
+from .seen_index import SEEN_INDEX_DIR
+from .poll_scheduler import AdaptivePollScheduler
+
+
+def room_id_from_url(live_url: str) -> str:
+    """从直播间链接中取出房间号，例如 https://live.douyin.com/123456 -> 123456"""
+    return live_url.split('?')[0].rstrip('/').split('/')[-1] or live_url
+
+
+def _room_worker(room_id: str, live_url: str, mode: str, profile: str, message_queue, stop_event):
+    """工作进程：独立的Chrome采集一个直播间，把新消息放入共享队列"""
+    # 每个直播间使用自己的持久化用户目录，多个浏览器不能共用同一目录
+    crawler = LiveCrawler(mode=mode, profile=profile,
+                          user_data_dir=os.path.join(PROFILE_ROOT, f"room-{room_id}"),
+                          seen_index_file=os.path.join(SEEN_INDEX_DIR, f"room-{room_id}.json"))
+    scheduler = AdaptivePollScheduler()
+    try:
+        crawler.setup()
+        crawler.start(live_url)
+        print(f"[{room_id}] 采集进程已启动")
+        while not stop_event.is_set():
+            try:
+                new_messages = crawler.fetch_messages()
+                if new_messages:
+                    for message in new_messages:
+                        message.room_id = room_id
+                    # 以二进制记录跨进程传递，比pickle消息对象更小更快
+                    message_queue.put((room_id, encode_records(new_messages)))
+                if crawler.last_fetch_failed:
+                    scheduler.on_error()
+                else:
+                    scheduler.on_tick(len(new_messages), crawler.last_list_size)
+                if not crawler.blocks_until_messages:
+                    time.sleep(scheduler.next_interval_ms() / 1000)
+            except Exception as e:
+                print(f"[{room_id}] 采集错误: {str(e)}")
+                scheduler.on_error()
+                time.sleep(scheduler.next_interval_ms() / 1000)
+    finally:
+        crawler.close()
+        print(f"[{room_id}] 采集进程已退出")
+
+
+class RoomSupervisor:
+    """多直播间采集：每个直播间一个工作进程，消息汇总到同一个MessageStore（或MessageBus）"""
+
+    def __init__(self, message_store: MessageStore, mode: str = MODE_SNAPSHOT,
+                 profile: str = PROFILE_FULL, restart_delay: float = 5.0):
+        self.message_store = message_store
+        self.mode = mode
+        self.profile = profile
+        self.restart_delay = restart_delay  # 工作进程退出后等待多久再重启
+
+        # Windows下只能使用spawn，这里统一使用以保证行为一致
+        self._context = multiprocessing.get_context('spawn')
+        self.message_queue = self._context.Queue()
+        self.rooms: Dict[str, dict] = {}
+
+    def add_room(self, live_url: str, room_id: Optional[str] = None) -> str:
+        """添加直播间并启动其工作进程"""
+        room_id = room_id or room_id_from_url(live_url)
+        if room_id in self.rooms:
+            print(f"直播间 {room_id} 已在采集中")
+            return room_id
+
+        self.rooms[room_id] = {
+            'url': live_url,
+            'process': None,
+            'stop_event': None,
+            'restarts': 0,
+            'died_at': None,
+            'total': 0,
+        }
+        self._start_worker(room_id)
+        return room_id
+
+    def remove_room(self, room_id: str):
+        """停止并移除直播间"""
+        room = self.rooms.pop(room_id, None)
+        if room:
+            self._stop_worker(room)
+
+    def _start_worker(self, room_id: str):
+        room = self.rooms[room_id]
+        stop_event = self._context.Event()
+        process = self._context.Process(
+            target=_room_worker,
+            args=(room_id, room['url'], self.mode, self.profile, self.message_queue, stop_event),
+            name=f"room-{room_id}",
+            daemon=True
+        )
+        process.start()
+        room['process'] = process
+        room['stop_event'] = stop_event
+        room['died_at'] = None
+        print(f"已启动直播间 {room_id} 的采集进程 (pid={process.pid})")
+
+    def _stop_worker(self, room: dict, timeout: float = 10.0):
+        process = room['process']
+        if not process:
+            return
+        room['stop_event'].set()
+        process.join(timeout=timeout)
+        if process.is_alive():
+            print(f"采集进程 {process.name} 未能及时退出，强制结束")
+            process.terminate()
+            process.join(timeout=2)
+
+    def check_workers(self):
+        """检查工作进程，重启意外退出的进程（不影响其他直播间）"""
+        now = time.time()
+        for room_id, room in self.rooms.items():
+            process = room['process']
+            if process and process.is_alive():
+                continue
+            if room['died_at'] is None:
+                exit_code = process.exitcode if process else None
+                print(f"直播间 {room_id} 的采集进程已退出 (exitcode={exit_code})，{self.restart_delay}秒后重启")
+                room['died_at'] = now
+            elif now - room['died_at'] >= self.restart_delay:
+                room['restarts'] += 1
+                self._start_worker(room_id)
+
+    def drain(self, timeout: float = 0.2, max_batches: int = 100) -> List[Message]:
+        """从队列中取出新消息并整批写入存储，最多等待timeout秒"""
+        messages = []
+        try:
+            room_id, records = self.message_queue.get(timeout=timeout)
+        except queue.Empty:
+            return messages
+
+        for _ in range(max_batches):
+            batch = decode_records(records)
+            room = self.rooms.get(room_id)
+            if room:
+                room['total'] += len(batch)
+            messages.extend(batch)
+            try:
+                room_id, records = self.message_queue.get_nowait()
+            except queue.Empty:
+                break
+        if messages:
+            self.message_store.add_batch(MessageBatch.from_messages(messages))
+        return messages
+
+    def get_throughput(self) -> Dict[str, dict]:
+        """获取每个直播间的累计条数和进程状态；速率从 MessageStore.throughput 按直播间查询"""
+        stats = {}
+        for room_id, room in self.rooms.items():
+            process = room['process']
+            stats[room_id] = {
+                'total': room['total'],
+                'alive': bool(process and process.is_alive()),
+                'restarts': room['restarts'],
+            }
+        return stats
+
+    def stop(self):
+        """停止所有工作进程"""
+        for room in self.rooms.values():
+            room['stop_event'].set()
+        for room in self.rooms.values():
+            self._stop_worker(room)
+        self.rooms.clear()
+        print("所有直播间采集已停止")
@@ -0,0 +1,222 @@
+from collections import deque
+from typing import Iterable, Optional
+import base64
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+SEEN_INDEX_VERSION = 1
+SEEN_INDEX_DIR = os.path.join('config', 'seen_ids')
+
+
+class BloomFilter:
+    """简单的布隆过滤器，用于以很小的内存记住较长时间窗口内的消息ID"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def to_dict(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+            "bits": base64.b64encode(bytes(self.bits)).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BloomFilter":
+        bloom = cls(data["capacity"], data["error_rate"])
+        bits = base64.b64decode(data["bits"])
+        if len(bits) == len(bloom.bits):
+            bloom.bits = bytearray(bits)
+            bloom.count = data.get("count", 0)
+        return bloom
+
+
+class SeenIdIndex:
+    """
+    有界的已见消息ID索引
+
+    最近的ID保存在有序队列 + 集合中，按数量（max_ids）和时间（max_age_seconds）淘汰；
+    启用 bloom_capacity 后，被淘汰的ID转入两代轮换的布隆过滤器，在更长的窗口内仍能识别
+    （存在很低的误判率，误判的结果是漏掉一条消息而不是重复发送）。
+    索引可以保存到文件，爬虫重启或页面重新加载后继续去重。
+    """
+
+    def __init__(self, max_ids: int = 10000, max_age_seconds: Optional[float] = 600,
+                 bloom_capacity: int = 0, bloom_error_rate: float = 0.001):
+        self.max_ids = max_ids
+        self.max_age_seconds = max_age_seconds
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+
+        self._order = deque()  # (消息ID, 记录时间)，按时间先后排列
+        self._ids = set()
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate) if bloom_capacity else None
+        self._old_bloom = None
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.bloom_hits = 0
+        self.lookup_ns = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, message_id: str) -> bool:
+        with self._lock:
+            return self._contains(message_id)
+
+    def _contains(self, message_id: str) -> bool:
+        if message_id in self._ids:
+            return True
+        if self._bloom is not None:
+            if message_id in self._bloom or (self._old_bloom is not None and message_id in self._old_bloom):
+                self.bloom_hits += 1
+                return True
+        return False
+
+    def _evict(self, now: float):
+        expire_before = now - self.max_age_seconds if self.max_age_seconds else None
+        while self._order and (len(self._order) > self.max_ids or
+                               (expire_before is not None and self._order[0][1] < expire_before)):
+            message_id, _ = self._order.popleft()
+            self._ids.discard(message_id)
+            if self._bloom is not None:
+                if self._bloom.count >= self.bloom_capacity:
+                    # 当前一代已满，轮换：旧的一代被丢弃
+                    self._old_bloom = self._bloom
+                    self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+                self._bloom.add(message_id)
+
+    def add(self, message_id: str, now: Optional[float] = None):
+        """记录一个消息ID"""
+        with self._lock:
+            if message_id in self._ids:
+                return
+            now = time.time() if now is None else now
+            self._ids.add(message_id)
+            self._order.append((message_id, now))
+            self._evict(now)
+
+    def check_and_add(self, message_id: str, now: Optional[float] = None) -> bool:
+        """ID已见过时返回True；否则记录该ID并返回False"""
+        start = time.perf_counter_ns()
+        with self._lock:
+            self.lookups += 1
+            seen = self._contains(message_id)
+            if seen:
+                self.hits += 1
+            else:
+                now = time.time() if now is None else now
+                self._ids.add(message_id)
+                self._order.append((message_id, now))
+                self._evict(now)
+            self.lookup_ns += time.perf_counter_ns() - start
+        return seen
+
+    def filter_new(self, message_ids: Iterable[str]) -> set:
+        """返回未见过的ID，并把它们记录下来"""
+        now = time.time()
+        return {message_id for message_id in message_ids if not self.check_and_add(message_id, now)}
+
+    def clear(self):
+        with self._lock:
+            self._order.clear()
+            self._ids.clear()
+            if self._bloom is not None:
+                self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+            self._old_bloom = None
+
+    def memory_bytes(self) -> int:
+        """估算索引占用的内存（集合、队列、ID字符串和布隆过滤器）"""
+        with self._lock:
+            total = sys.getsizeof(self._ids) + sys.getsizeof(self._order)
+            for message_id, timestamp in self._order:
+                total += sys.getsizeof(message_id) + sys.getsizeof(timestamp) + 56  # 元组本身
+            for bloom in (self._bloom, self._old_bloom):
+                if bloom is not None:
+                    total += sys.getsizeof(bloom.bits)
+            return total
+
+    def get_stats(self) -> dict:
+        """获取索引大小、每个ID的内存占用和平均查找耗时"""
+        memory = self.memory_bytes()
+        with self._lock:
+            size = len(self._ids)
+            bloom_count = sum(bloom.count for bloom in (self._bloom, self._old_bloom) if bloom is not None)
+            return {
+                "size": size,
+                "bloom_size": bloom_count,
+                "memory_bytes": memory,
+                "bytes_per_id": memory / size if size else 0.0,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "bloom_hits": self.bloom_hits,
+                "avg_lookup_ns": self.lookup_ns / self.lookups if self.lookups else 0.0
+            }
+
+    def save(self, path: str):
+        """保存索引到文件（先写临时文件再替换，避免写到一半时损坏）"""
+        with self._lock:
+            data = {
+                "version": SEEN_INDEX_VERSION,
+                "ids": [[message_id, timestamp] for message_id, timestamp in self._order],
+                "bloom": self._bloom.to_dict() if self._bloom is not None else None,
+                "old_bloom": self._old_bloom.to_dict() if self._old_bloom is not None else None
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def load(self, path: str) -> int:
+        """从文件加载索引，返回加载的ID数量；文件不存在或版本不符时不加载"""
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != SEEN_INDEX_VERSION:
+            print(f"已见消息索引版本不符，忽略: {path}")
+            return 0
+
+        with self._lock:
+            for message_id, timestamp in data.get("ids", []):
+                if message_id not in self._ids:
+                    self._ids.add(message_id)
+                    self._order.append((message_id, timestamp))
+            if self.bloom_capacity:
+                if data.get("bloom"):
+                    self._bloom = BloomFilter.from_dict(data["bloom"])
+                if data.get("old_bloom"):
+                    self._old_bloom = BloomFilter.from_dict(data["old_bloom"])
+            self._evict(time.time())
+            return len(self._ids)
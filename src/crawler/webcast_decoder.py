@@ -0,0 +1,240 @@
+# 抖音直播推送通道（webcast push）帧解码
+# 直播间页面通过WebSocket接收protobuf编码的PushFrame，payload为gzip压缩的Response，
+# 其中包含若干条 WebcastChatMessage / WebcastGiftMessage 等消息。
+# 这里只解析用到的字段，不依赖protobuf库。
+from datetime import datetime
+from typing import Iterator, List, Optional
+import base64
+import gzip
+import json
+import os
+
+from ..models.message import Message, MessageType
+from .gift_resolver import gift_resolver
+
+# 各消息的字段编号（与抖音webcast协议一致）
+_FRAME_HEADERS = 5
+_FRAME_PAYLOAD_TYPE = 7
+_FRAME_PAYLOAD = 8
+_RESPONSE_MESSAGES = 1
+_ITEM_METHOD = 1
+_ITEM_PAYLOAD = 2
+_ITEM_MSG_ID = 3
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    """读取一个varint，返回 (值, 新位置)"""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def iter_fields(data: bytes) -> Iterator[tuple[int, object]]:
+    """遍历protobuf消息的字段，返回 (字段编号, 值)；长度类型字段的值为bytes"""
+    pos = 0
+    end = len(data)
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x07
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value = data[pos:pos + length]
+            pos += length
+        elif wire_type == 1:
+            value = data[pos:pos + 8]
+            pos += 8
+        elif wire_type == 5:
+            value = data[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"不支持的protobuf字段类型: {wire_type}")
+        yield field, value
+
+
+def _fields(data: bytes) -> dict:
+    """把消息字段读入字典，重复字段只保留最后一个值"""
+    return dict(iter_fields(data))
+
+
+def _decode_user_name(data: bytes) -> str:
+    """User: 3 = nickName"""
+    nick_name = _fields(data).get(3)
+    return nick_name.decode('utf-8', 'replace') if nick_name else "未知用户"
+
+
+def _decode_image_urls(data: bytes) -> List[str]:
+    """Image: 1 = urlListList (repeated)"""
+    return [value.decode('utf-8', 'replace') for field, value in iter_fields(data) if field == 1]
+
+
+def _decode_chat(payload: bytes, message_id: Optional[str]) -> Optional[Message]:
+    """ChatMessage: 2 = user, 3 = content"""
+    fields = _fields(payload)
+    content = fields.get(3, b'').decode('utf-8', 'replace').strip()
+    if not content:
+        return None
+    return Message(
+        message_id=message_id,
+        type=MessageType.CHAT,
+        content=content,
+        user_name=_decode_user_name(fields.get(2, b'')),
+        timestamp=datetime.now()
+    )
+
+
+def _decode_gift(payload: bytes, message_id: Optional[str]) -> Optional[Message]:
+    """GiftMessage: 5 = repeatCount, 6 = comboCount, 7 = user, 15 = gift(GiftStruct: 1 = image)"""
+    fields = _fields(payload)
+    gift_count = fields.get(6) or fields.get(5) or 1
+
+    gift_md5 = gift_image_url = None
+    gift_struct = fields.get(15)
+    if gift_struct:
+        image = _fields(gift_struct).get(1)
+        if image:
+            gift_md5, gift_image_url = gift_resolver.resolve_first(_decode_image_urls(image))
+
+    if gift_md5:
+        content = f"送出了 [md5: {gift_md5}] × {gift_count}"
+    else:
+        content = f"送出了礼物 × {gift_count}"
+    return Message(
+        message_id=message_id,
+        type=MessageType.GIFT,
+        content=content,
+        user_name=_decode_user_name(fields.get(7, b'')),
+        timestamp=datetime.now(),
+        gift_md5=gift_md5,
+        gift_count=gift_count,
+        gift_image_url=gift_image_url
+    )
+
+
+def _decode_like(payload: bytes, message_id: Optional[str]) -> Optional[Message]:
+    """LikeMessage: 5 = user"""
+    fields = _fields(payload)
+    return Message(
+        message_id=message_id,
+        type=MessageType.LIKE,
+        content="为主播点赞了",
+        user_name=_decode_user_name(fields.get(5, b'')),
+        timestamp=datetime.now()
+    )
+
+
+def _decode_member(payload: bytes, message_id: Optional[str]) -> Optional[Message]:
+    """MemberMessage: 2 = user"""
+    fields = _fields(payload)
+    return Message(
+        message_id=message_id,
+        type=MessageType.ENTER,
+        content="来了",
+        user_name=_decode_user_name(fields.get(2, b'')),
+        timestamp=datetime.now()
+    )
+
+
+# 消息method与解码函数的对应关系，其余类型的消息直接忽略
+_DECODERS = {
+    "WebcastChatMessage": _decode_chat,
+    "WebcastGiftMessage": _decode_gift,
+    "WebcastLikeMessage": _decode_like,
+    "WebcastMemberMessage": _decode_member,
+}
+
+
+def decode_push_frame(frame: bytes) -> List[Message]:
+    """解码一个PushFrame，返回其中包含的消息"""
+    payload = None
+    payload_type = b''
+    compressed = False
+    for field, value in iter_fields(frame):
+        if field == _FRAME_PAYLOAD:
+            payload = value
+        elif field == _FRAME_PAYLOAD_TYPE:
+            payload_type = value
+        elif field == _FRAME_HEADERS:
+            header = _fields(value)
+            if header.get(1) == b'compress_type' and header.get(2) == b'gzip':
+                compressed = True
+
+    # 只处理消息帧，心跳/ack等帧没有消息内容
+    if not payload or (payload_type and payload_type != b'msg'):
+        return []
+    if compressed or payload[:2] == b'\x1f\x8b':
+        payload = gzip.decompress(payload)
+
+    messages = []
+    for field, item in iter_fields(payload):
+        if field != _RESPONSE_MESSAGES:
+            continue
+        item_fields = _fields(item)
+        method = item_fields.get(_ITEM_METHOD, b'').decode('utf-8', 'replace')
+        decoder = _DECODERS.get(method)
+        if not decoder:
+            continue
+        # 没有msgId的消息ID为None，由消息缓存像页面中没有data-id的消息一样分配内容指纹
+        msg_id = item_fields.get(_ITEM_MSG_ID)
+        try:
+            message = decoder(item_fields.get(_ITEM_PAYLOAD, b''), str(msg_id) if msg_id else None)
+            if message:
+                messages.append(message)
+        except Exception as e:
+            print(f"解码{method}失败: {str(e)}")
+    return messages
+
+
+def extract_frames_from_performance_log(entries, socket_ids: set) -> List[bytes]:
+    """
+    从Chrome performance日志中取出webcast推送通道的二进制帧
+
+    Args:
+        entries: driver.get_log('performance') 的返回值
+        socket_ids: 已识别的推送通道requestId集合，会被就地更新
+    """
+    frames = []
+    for entry in entries:
+        try:
+            event = json.loads(entry['message'])['message']
+            method = event.get('method')
+            params = event.get('params', {})
+            if method == 'Network.webSocketCreated':
+                if 'webcast' in params.get('url', ''):
+                    socket_ids.add(params.get('requestId'))
+            elif method == 'Network.webSocketFrameReceived':
+                # 没有识别到推送通道时接收所有二进制帧，解码失败的帧会被忽略
+                if socket_ids and params.get('requestId') not in socket_ids:
+                    continue
+                response = params.get('response', {})
+                if response.get('opcode') == 2:
+                    frames.append(base64.b64decode(response.get('payloadData', '')))
+        except Exception:
+            continue
+    return frames
+
+
+def iter_fixture_frames(directory: str) -> Iterator[bytes]:
+    """按文件名顺序读取录制的帧文件（*.bin，每个文件一个PushFrame）"""
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.bin'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                yield f.read()
+
+
+def decode_fixture_dir(directory: str) -> List[Message]:
+    """离线解码一个录制目录中的全部帧"""
+    messages = []
+    for frame in iter_fixture_frames(directory):
+        try:
+            messages.extend(decode_push_frame(frame))
+        except Exception as e:
+            print(f"解码录制帧失败: {str(e)}")
+    return messages
@@ -3,52 +3,171 @@ from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, Q
 from PySide6.QtCore import QThread, Signal, QTimer, Qt
 from .ui.main_window import MainWindow
 from .crawler.live_crawler import LiveCrawler
+from .crawler.room_supervisor import RoomSupervisor
+from .crawler.poll_scheduler import AdaptivePollScheduler
+from .crawler.browser_pool import BrowserPool
+from .crawler.seen_index import SEEN_INDEX_DIR
 from .models.message import MessageType
+from .models.message_batch import MessageBatch
 from .models.message_store import MessageStore
+from .models.message_bus import MessageBus, POLICY_COALESCE
+from .models.message_log import MessageLog
+from .models.history_store import HistoryStore
+from .models.user_index import UserAggregateIndex
 from .minecraft import MinecraftCommandWindow
+import json
+import os
 import time
 from selenium.webdriver.common.by import By
 
+# 程序配置文件；不存在或缺少某项时使用默认值
+APP_CONFIG_FILE = os.path.join('config', 'app_config.json')
+DEFAULT_APP_CONFIG = {
+    # 历史消息库：消息同时写入持久化日志（data/message_log）和SQLite（data/history.db），默认关闭
+    "history_enabled": False
+}
+
+
+def load_app_config(path: str = APP_CONFIG_FILE) -> dict:
+    """加载程序配置"""
+    config = dict(DEFAULT_APP_CONFIG)
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+    except Exception as e:
+        print(f"加载程序配置失败，使用默认配置: {str(e)}")
+    return config
+
 class CrawlerThread(QThread):
-    message_received = Signal(list)  # 发送新消息信号
+    scheduler_updated = Signal(dict)  # 轮询调度状态
 
-    def __init__(self, crawler, message_store):
+    def __init__(self, crawler, message_bus: MessageBus, measure_interval: float = 0,
+                 scheduler: AdaptivePollScheduler = None):
         super().__init__()
         self.crawler = crawler
-        self.message_store = message_store
+        self.message_bus = message_bus
+        self.measure_interval = measure_interval  # 浏览器资源统计间隔（秒），0表示不统计
+        self.scheduler = scheduler or AdaptivePollScheduler()
         self.is_running = True
 
     def run(self):
         print("爬虫线程启动")
+        last_measure = time.time()
+        last_report = time.time()
         while self.is_running:
             try:
-                new_messages = self.crawler.fetch_messages()
-                if new_messages:
-                    print(f"获取到 {len(new_messages)} 条新消息")
-                    # 将消息添加到存储
-                    for message in new_messages:
-                        self.message_store.add_message(message)
-                    # 发送消息到UI
-                    self.message_received.emit(new_messages)
-                self.msleep(200)  # 正常延迟200ms
+                if self.measure_interval and time.time() - last_measure >= self.measure_interval:
+                    last_measure = time.time()
+                    usage = self.crawler.sample_browser_usage()
+                    if usage:
+                        print(f"浏览器资源[{usage['profile']}]: CPU {usage['cpu_percent']:.1f}%, "
+                              f"内存 {usage['rss_mb']:.0f}MB, 进程数 {usage['processes']}")
+                    metrics = self.crawler.get_metrics()
+                    print(f"选择器探测: {metrics['discovery_runs']} 次, {metrics['discovery_seconds']:.2f}s; "
+                          f"消息提取: {metrics['extraction_runs']} 次, {metrics['extraction_seconds']:.2f}s")
+                    seen = metrics['seen_index']
+                    print(f"已见消息索引: {seen['size']} 条, 每条约 {seen['bytes_per_id']:.0f} 字节, "
+                          f"平均查找 {seen['avg_lookup_ns']:.0f}ns, 命中 {seen['hits']} 次")
+                    for name, stats in self.message_bus.get_stats().items():
+                        print(f"订阅者[{name}]: 排队 {stats['queued_messages']} 条, "
+                              f"延迟 {stats['lag_seconds'] * 1000:.0f}ms, 丢弃 {stats['dropped']} 条, "
+                              f"合并 {stats['coalesced']} 条")
+                
+                batch = self.crawler.fetch_batch()
+                if batch:
+                    print(f"获取到 {len(batch)} 条新消息")
+                    # 整批写入存储并分发给各订阅者，订阅者在自己的线程中消费
+                    self.message_bus.publish(batch)
+                
+                if self.crawler.last_fetch_failed:
+                    self.scheduler.on_error()
+                else:
+                    self.scheduler.on_tick(len(batch), self.crawler.last_list_size)
+                
+                # 每秒发布一次调度状态
+                if time.time() - last_report >= 1:
+                    last_report = time.time()
+                    self.scheduler_updated.emit(self.scheduler.get_stats())
+                
+                if not self.crawler.blocks_until_messages:
+                    self.msleep(self.scheduler.next_interval_ms())
             except Exception as e:
                 print(f"爬虫错误: {str(e)}")
                 import traceback
                 print(traceback.format_exc())
-                self.msleep(400)  # 出错时延迟400ms
+                self.scheduler.on_error()
+                self.msleep(self.scheduler.next_interval_ms())
 
     def stop(self):
         print("正在停止爬虫线程...")
         self.is_running = False
 
+class RoomSupervisorThread(QThread):
+    throughput_updated = Signal(dict)  # 各直播间吞吐量
+
+    def __init__(self, supervisor):
+        super().__init__()
+        self.supervisor = supervisor
+        self.is_running = True
+
+    def run(self):
+        print("多直播间汇总线程启动")
+        last_report = time.time()
+        while self.is_running:
+            try:
+                # 汇总的消息由supervisor整批发布到消息总线
+                self.supervisor.drain(timeout=0.2)
+                self.supervisor.check_workers()
+                
+                # 每5秒报告一次各直播间吞吐量
+                if time.time() - last_report >= 5:
+                    last_report = time.time()
+                    self.throughput_updated.emit(self.supervisor.get_throughput())
+            except Exception as e:
+                print(f"汇总线程错误: {str(e)}")
+                self.msleep(400)
+
+    def stop(self):
+        print("正在停止多直播间汇总线程...")
+        self.is_running = False
+
 class MainApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("抖音直播数据采集")
         self.setGeometry(100, 100, 1200, 800)
         
-        # 创建消息存储系统
-        self.message_store = MessageStore()
+        # 按用户累计的统计，从上次关闭时保存的快照继续累计
+        self.user_index_file = os.path.join('data', 'user_index.json')
+        self.user_index = UserAggregateIndex()
+        try:
+            self.user_index.load(self.user_index_file)
+        except Exception as e:
+            print(f"加载用户统计快照失败: {str(e)}")
+        
+        self.config = load_app_config()
+        
+        # 创建消息存储系统；开启历史消息库时消息同时写入持久化日志，程序崩溃或消费者落后时可以回放
+        message_log = None
+        if self.config.get("history_enabled"):
+            message_log = MessageLog(os.path.join('data', 'message_log'))
+        self.message_store = MessageStore(message_log=message_log, user_index=self.user_index)
+        
+        # 历史消息库（可选）：后台把消息批量写入SQLite，供长期查询
+        self.history_store = None
+        if message_log is not None:
+            self.history_store = HistoryStore(message_store=self.message_store)
+            self.history_store.start()
+            print("历史消息库已开启")
+        
+        # 消息总线：采集线程只负责发布，界面和Minecraft转换器各自订阅，慢的消费者不会拖住采集
+        self.message_bus = MessageBus(self.message_store)
+        # 界面订阅：处理不过来时合并批次，每100ms在界面线程中取出一次
+        self.ui_subscription = self.message_bus.subscribe('ui', maxsize=20, policy=POLICY_COALESCE)
+        self.ui_timer = QTimer()
+        self.ui_timer.timeout.connect(self.poll_ui_subscription)
+        self.ui_timer.start(100)
         
         # 创建主窗口
         self.main_window = MainWindow(self.message_store)
@@ -69,32 +188,49 @@ class MainApp(QMainWindow):
         # Minecraft命令转换器窗口
         self.mc_window = None
         
-        # 初始化爬虫
-        self.crawler = LiveCrawler()
+        # 初始化爬虫；勾选预热时停止采集后保留浏览器，下次开始只需跳转页面
+        self.browser_pool = BrowserPool(size=1)
+        # HTML批量解析模式下用两个进程解析容器HTML；已见消息ID保存到文件，重启后不会重复发出
+        self.crawler = LiveCrawler(parse_workers=2,
+                                   seen_index_file=os.path.join(SEEN_INDEX_DIR, 'default.json'))
+        self.main_window.warm_checkbox.toggled.connect(self.toggle_warm_browser)
         self.crawler_thread = None
         
+        # 多直播间采集
+        self.supervisor = None
+        self.supervisor_thread = None
+        
         # 连接信号
         self.main_window.start_button.clicked.connect(self.start_crawler)
         self.main_window.stop_button.clicked.connect(self.stop_crawler)
         
     def start_crawler(self):
         """启动爬虫"""
-        if self.crawler_thread and self.crawler_thread.isRunning():
+        if (self.crawler_thread and self.crawler_thread.isRunning()) or self.supervisor:
             print("爬虫线程已在运行中")
             return
             
-        live_url = self.main_window.url_input.text().strip()
-        if not live_url:
+        # 多个直播间链接用空格或逗号分隔
+        live_urls = self.main_window.url_input.text().replace(',', ' ').split()
+        if not live_urls:
             self.main_window.status_label.setText("请输入直播间链接")
             return
+        if len(live_urls) > 1:
+            self.start_supervisor(live_urls)
+            return
             
+        live_url = live_urls[0]
         print(f"准备访问直播间: {live_url}")
         try:
+            self.crawler.mode = self.main_window.mode_combo.currentData()
+            self.crawler.profile = self.main_window.profile_combo.currentData()
+            print(f"采集模式: {self.crawler.mode}, 浏览器配置: {self.crawler.profile}")
             self.crawler.setup()
             self.crawler.start(live_url)
             
-            self.crawler_thread = CrawlerThread(self.crawler, self.message_store)
-            self.crawler_thread.message_received.connect(self.handle_messages)
+            measure_interval = 5 if self.main_window.measure_checkbox.isChecked() else 0
+            self.crawler_thread = CrawlerThread(self.crawler, self.message_bus, measure_interval)
+            self.crawler_thread.scheduler_updated.connect(self.show_scheduler_stats)
             self.crawler_thread.start()
             
             self.main_window.status_label.setText("采集已启动")
@@ -106,8 +242,71 @@ class MainApp(QMainWindow):
             self.main_window.status_label.setText(error_msg)
             print(error_msg)
             
+    def toggle_warm_browser(self, checked):
+        """开启或关闭预热浏览器"""
+        if checked:
+            self.browser_pool.enable()
+            self.crawler.browser_pool = self.browser_pool
+            self.crawler.mode = self.main_window.mode_combo.currentData()
+            self.crawler.profile = self.main_window.profile_combo.currentData()
+            if not self.crawler.driver:
+                self.crawler.prewarm()
+        else:
+            # 正在使用的浏览器在采集停止时归还给池，由池退出并删除其用户目录
+            self.crawler.browser_pool = None
+            self.browser_pool.disable()
+        
+    def start_supervisor(self, live_urls):
+        """启动多直播间采集"""
+        try:
+            mode = self.main_window.mode_combo.currentData()
+            profile = self.main_window.profile_combo.currentData()
+            print(f"准备采集 {len(live_urls)} 个直播间, 模式: {mode}, 浏览器配置: {profile}")
+            self.supervisor = RoomSupervisor(self.message_bus, mode=mode, profile=profile)
+            for live_url in live_urls:
+                self.supervisor.add_room(live_url)
+            
+            self.supervisor_thread = RoomSupervisorThread(self.supervisor)
+            self.supervisor_thread.throughput_updated.connect(self.show_throughput)
+            self.supervisor_thread.start()
+            
+            self.main_window.status_label.setText(f"采集已启动 ({len(live_urls)} 个直播间)")
+            self.main_window.start_button.setEnabled(False)
+            self.main_window.stop_button.setEnabled(True)
+        except Exception as e:
+            error_msg = f"启动失败: {str(e)}"
+            self.main_window.status_label.setText(error_msg)
+            print(error_msg)
+            
+    def show_scheduler_stats(self, stats):
+        """显示轮询调度状态，速率从消息存储的吞吐量统计读取"""
+        throughput = self.message_store.throughput
+        self.main_window.status_label.setText(
+            f"采集中 | 间隔 {stats['interval_ms']}ms | {throughput.rate(10):.1f}条/秒 | "
+            f"峰值(P95) {throughput.percentile(95, 60):.0f}条/秒 | 估计遗漏 {stats['missed_estimate']}"
+        )
+        
+    def show_throughput(self, stats):
+        """显示各直播间吞吐量，速率从消息存储的吞吐量统计读取"""
+        parts = []
+        for room_id, room_stats in stats.items():
+            state = "" if room_stats['alive'] else " (重启中)"
+            rate = self.message_store.throughput.rate(10, room_id=room_id)
+            parts.append(f"{room_id}: {rate:.1f}条/秒{state}")
+        text = " | ".join(parts)
+        print(f"直播间吞吐量: {text}")
+        self.main_window.status_label.setText(text)
+        
     def stop_crawler(self):
         """停止爬虫"""
+        if self.supervisor_thread:
+            self.supervisor_thread.stop()
+            self.supervisor_thread.wait()
+            self.supervisor_thread = None
+        if self.supervisor:
+            self.supervisor.stop()
+            self.supervisor = None
+            
         if self.crawler_thread:
             print("正在停止爬虫...")
             self.crawler_thread.stop()
@@ -120,40 +319,50 @@ class MainApp(QMainWindow):
         self.main_window.start_button.setEnabled(True)
         self.main_window.stop_button.setEnabled(False)
         
-    def handle_messages(self, messages):
-        """处理新消息"""
+    def poll_ui_subscription(self):
+        """取出界面订阅队列中的全部消息并显示"""
+        batch = self.ui_subscription.drain()
+        if batch:
+            self.handle_messages(batch)
+        
+    def handle_messages(self, batch: MessageBatch):
+        """处理一批新消息，每个面板整批追加一次"""
         try:
-            for message in messages:
-                print(f"处理消息: 类型={message.type}, 内容={message.content}")
-                if message.type == MessageType.CHAT:
-                    self.main_window.chat_panel.add_message(message)
-                elif message.type == MessageType.GIFT:
-                    self.main_window.gift_panel.add_message(message)
-                    self.handle_gift_message(message)
-                elif message.type == MessageType.LIKE:
-                    self.main_window.like_panel.add_message(message)
-                elif message.type == MessageType.ENTER:
-                    self.main_window.enter_panel.add_message(message)
+            counts = batch.count_by_type()
+            print("处理消息: " + ", ".join(f"{message_type.name}={count}" for message_type, count in counts.items()))
+            panels = {
+                MessageType.CHAT: self.main_window.chat_panel,
+                MessageType.GIFT: self.main_window.gift_panel,
+                MessageType.LIKE: self.main_window.like_panel,
+                MessageType.ENTER: self.main_window.enter_panel
+            }
+            for message_type, panel in panels.items():
+                if counts[message_type]:
+                    panel.add_messages(batch.messages_of_type(message_type))
+            if counts[MessageType.GIFT]:
+                self.handle_gift_messages(batch)
         except Exception as e:
             print(f"处理消息时出错: {str(e)}")
             
-    def handle_gift_message(self, message):
-        """处理礼物消息，更新礼物统计"""
-        if message.type == MessageType.GIFT and message.gift_md5:
-            try:
-                # 暂时不处理礼物图片
-                self.main_window.gift_stats_panel.add_gift(message.gift_md5, "")
-            except Exception as e:
-                print(f"处理礼物统计失败: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
+    def handle_gift_messages(self, batch: MessageBatch):
+        """处理礼物消息，按礼物md5汇总后更新礼物统计"""
+        try:
+            # 图片地址随消息从采集线程或工作进程传来
+            image_urls = batch.gift_images()
+            for gift_md5, times in batch.gifts_per_md5(weighted=False).items():
+                if times:
+                    self.main_window.gift_stats_panel.add_gift(gift_md5, image_urls.get(gift_md5), times=times)
+        except Exception as e:
+            print(f"处理礼物统计失败: {str(e)}")
+            import traceback
+            print(traceback.format_exc())
         
     def open_minecraft_converter(self):
         """打开Minecraft命令转换器窗口"""
         try:
             if not self.mc_window:
                 print("创建新的Minecraft命令转换器窗口")
-                self.mc_window = MinecraftCommandWindow(self.message_store)
+                self.mc_window = MinecraftCommandWindow(self.message_bus)
             print("显示Minecraft命令转换器窗口")
             self.mc_window.show()
             self.mc_window.raise_()  # 将窗口置于最前
@@ -166,8 +375,18 @@ class MainApp(QMainWindow):
         """窗口关闭事件"""
         print("正在关闭程序...")
         self.stop_crawler()
+        if self.mc_window:
+            self.mc_window.stop_conversion()
+        self.ui_timer.stop()
+        self.browser_pool.shutdown()
+        if getattr(self, 'history_store', None):
+            self.history_store.stop()
         if hasattr(self, 'message_store'):
             self.message_store.shutdown()
+        try:
+            self.user_index.save(self.user_index_file)
+        except Exception as e:
+            print(f"保存用户统计快照失败: {str(e)}")
         event.accept()
 
 def main():
@@ -5,6 +5,7 @@ import json
 import os
 from mcrcon import MCRcon
 from src.models.message_store import MessageStore, MessageType, Message
+from src.models.message_batch import MessageBatch
 
 class MinecraftCommandConverter:
     def __init__(self, message_store: MessageStore, host: str = 'localhost', port: int = 25575, password: str = 'Pzx030709'):
@@ -23,8 +24,9 @@ class MinecraftCommandConverter:
         self.password = password
         self.last_processed_time = datetime.now()
         
-        # 记录已处理的消息ID
-        self.processed_messages = set()
+        # 消息存储的读取游标，从创建时的最新序号开始，每次只读取之后写入的消息；
+        # 不从0开始，否则会把持久化日志中的历史礼物重新执行一遍
+        self.cursor = message_store.last_sequence
         
         # 加载配置文件
         self.config_file = os.path.join('config', 'minecraft_commands.json')
@@ -141,67 +143,57 @@ class MinecraftCommandConverter:
         self.save_config()
         print("已清空所有命令配置")
     
-    def process_new_messages(self):
-        """处理新消息并转换为Minecraft命令"""
+    def process_new_messages(self, batch: Optional[MessageBatch] = None):
+        """
+        处理新消息并转换为Minecraft命令
+        
+        Args:
+            batch: 消息总线投递的批次；为None时从消息存储读取上次处理之后的消息
+        """
         current_time = datetime.now()
         
-        # 获取所有类型的新消息
-        chat_messages = self.message_store.get_messages(MessageType.CHAT)
-        gift_messages = self.message_store.get_messages(MessageType.GIFT)
+        if batch is None:
+            # 读取上次处理之后的礼物和聊天消息，整理为一个批次
+            messages, self.cursor = self.message_store.read_since(
+                self.cursor, types=(MessageType.GIFT, MessageType.CHAT))
+            batch = MessageBatch.from_messages(messages)
         
         commands = []
         
-        # 处理礼物消息
-        for message in gift_messages:
-            # 检查消息是否已处理
-            if message.message_id in self.processed_messages:
-                continue
-                
-            if message.gift_md5:
-                command = self._convert_gift_to_command(message)
-                if command:
-                    commands.append(command)
-                    # 记录已处理的消息ID
-                    self.processed_messages.add(message.message_id)
+        # 处理礼物消息：同一礼物的数量先在批次内汇总
+        for gift_md5, gift_count in batch.gifts_per_md5().items():
+            command = self._convert_gift_to_command(gift_md5, gift_count)
+            if command:
+                commands.append(command)
         
         # 处理聊天消息
-        for message in chat_messages:
-            # 检查消息是否已处理
-            if message.message_id in self.processed_messages:
-                continue
-                
+        for message in batch.messages_of_type(MessageType.CHAT):
             command = self._convert_chat_to_command(message)
             if command:
                 commands.append(command)
-                # 记录已处理的消息ID
-                self.processed_messages.add(message.message_id)
         
         self.last_processed_time = current_time
         
-        # 清理旧的消息ID记录（保留最近1000条）
-        if len(self.processed_messages) > 1000:
-            self.processed_messages = set(list(self.processed_messages)[-1000:])
-        
         # 执行命令
         if commands:
             self._execute_commands(commands)
         
         return commands
     
-    def _convert_gift_to_command(self, message: Message) -> Optional[str]:
-        """将礼物消息转换为Minecraft命令"""
-        if not message.gift_md5:
+    def _convert_gift_to_command(self, gift_md5: str, gift_count: int) -> Optional[str]:
+        """将礼物（同一md5在本批次中的总数量）转换为Minecraft命令"""
+        if not gift_md5:
             return None
             
-        gift_config = self.config['gift_commands'].get(message.gift_md5)
+        gift_config = self.config['gift_commands'].get(gift_md5)
         if gift_config:
             base_command = gift_config['command']
             base_count = gift_config.get('count', 1)  # 基础执行次数
             
             # 计算实际执行次数 = 礼物数量 × 基础执行次数
-            actual_count = (message.gift_count or 1) * base_count
-            print(f"收到礼物 {message.gift_md5}:")
-            print(f"- 礼物数量: {message.gift_count}")
+            actual_count = (gift_count or 1) * base_count
+            print(f"收到礼物 {gift_md5}:")
+            print(f"- 礼物数量: {gift_count}")
             print(f"- 基础执行次数: {base_count}")
             print(f"- 实际执行次数: {actual_count}")
             
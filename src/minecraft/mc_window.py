@@ -3,20 +3,51 @@ from PySide6.QtWidgets import (
     QPushButton, QTextEdit, QLabel, QSpinBox, QTabWidget,
     QTableWidget, QTableWidgetItem, QLineEdit, QMessageBox, QGroupBox
 )
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QFont, QIcon, QColor, QTextCursor
 from datetime import datetime
 
 from .mc_command_converter import MinecraftCommandConverter
+from src.models.message import MessageType
+from src.models.message_bus import MessageBus, POLICY_COALESCE
+
+class CommandDispatchThread(QThread):
+    """在后台线程中消费订阅队列并执行RCON命令，RCON阻塞时不影响界面和采集"""
+    commands_executed = Signal(list)  # 已执行的命令
+    dispatch_failed = Signal(object)  # 执行失败的异常
+
+    def __init__(self, converter, subscription):
+        super().__init__()
+        self.converter = converter
+        self.subscription = subscription
+        self.is_running = True
+
+    def run(self):
+        while self.is_running:
+            batch = self.subscription.get(timeout=0.5)
+            if not batch:
+                continue
+            try:
+                commands = self.converter.process_new_messages(batch)
+                if commands:
+                    self.commands_executed.emit(commands)
+            except Exception as e:
+                self.dispatch_failed.emit(e)
+
+    def stop(self):
+        self.is_running = False
 
 class MinecraftCommandWindow(QMainWindow):
-    def __init__(self, message_store):
+    def __init__(self, message_bus: MessageBus):
         super().__init__()
-        self.message_store = message_store
+        self.message_bus = message_bus
+        self.message_store = message_bus.message_store
         self.unsaved_changes = False
+        self.subscription = None
+        self.dispatch_thread = None
         
         # 创建命令转换器
-        self.converter = MinecraftCommandConverter(message_store)
+        self.converter = MinecraftCommandConverter(self.message_store)
         print("创建命令转换器完成")
         
         self.init_ui()
@@ -415,10 +446,6 @@ class MinecraftCommandWindow(QMainWindow):
         # 添加聊天配置页面到标签页
         tabs.addTab(chat_tab, "聊天命令配置")
         
-        # 创建定时器
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.process_messages)
-        
         # 加载现有配置
         self.load_command_tables()
         
@@ -552,12 +579,24 @@ class MinecraftCommandWindow(QMainWindow):
         self.port_input.setEnabled(False)
         self.password_input.setEnabled(False)
         
-        self.timer.start(1000)  # 每秒检查一次新消息
+        # 订阅礼物和聊天消息；RCON处理不过来时把新消息合并到队尾批次，礼物数量不会丢失
+        self.subscription = self.message_bus.subscribe(
+            'minecraft', types=(MessageType.GIFT, MessageType.CHAT), maxsize=50, policy=POLICY_COALESCE)
+        self.dispatch_thread = CommandDispatchThread(self.converter, self.subscription)
+        self.dispatch_thread.commands_executed.connect(self.show_commands)
+        self.dispatch_thread.dispatch_failed.connect(self.handle_dispatch_error)
+        self.dispatch_thread.start()
         self.log_message("开始转换消息...")
         
     def stop_conversion(self):
         """停止转换消息"""
-        self.timer.stop()
+        if self.subscription:
+            self.message_bus.unsubscribe(self.subscription)
+            self.subscription = None
+        if self.dispatch_thread:
+            self.dispatch_thread.stop()
+            self.dispatch_thread.wait()
+            self.dispatch_thread = None
         
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
@@ -567,25 +606,26 @@ class MinecraftCommandWindow(QMainWindow):
         
         self.log_message("停止转换消息")
         
-    def process_messages(self):
-        """处理新消息"""
-        try:
-            commands = self.converter.process_new_messages()
-            for command in commands:
-                self.log_message(f"生成命令: {command}")
-        except ConnectionRefusedError as e:
+    def show_commands(self, commands: list):
+        """显示后台线程已执行的命令"""
+        for command in commands:
+            self.log_message(f"生成命令: {command}")
+        
+    def handle_dispatch_error(self, error: Exception):
+        """处理后台线程执行命令时的错误"""
+        if isinstance(error, ConnectionRefusedError):
             self.log_message("错误: RCON连接被拒绝，请检查:")
             self.log_message("1. Minecraft服务器是否已启动")
             self.log_message("2. server.properties中enable-rcon是否设为true")
             self.log_message("3. rcon.port是否与配置的端口匹配")
             self.log_message("4. rcon.password是否与配置的密码匹配")
             self.stop_conversion()  # 停止转换
-        except Exception as e:
-            self.log_message(f"错误: {str(e)}")
-            if "Authentication failed" in str(e):
+        else:
+            self.log_message(f"错误: {str(error)}")
+            if "Authentication failed" in str(error):
                 self.log_message("RCON密码验证失败，请检查密码是否正确")
                 self.stop_conversion()  # 停止转换
-            elif "Connection refused" in str(e):
+            elif "Connection refused" in str(error):
                 self.log_message("无法连接到服务器，请检查地址和端口是否正确")
                 self.stop_conversion()  # 停止转换
             
@@ -0,0 +1,219 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+
+from .message import Message, MessageType
+from .message_store import MessageStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    type INTEGER NOT NULL,
+    content TEXT,
+    user_name TEXT,
+    timestamp_ms INTEGER NOT NULL,
+    gift_md5 TEXT,
+    gift_count INTEGER,
+    room_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_time ON messages (timestamp_ms);
+CREATE INDEX IF NOT EXISTS idx_messages_type_time ON messages (type, timestamp_ms);
+CREATE INDEX IF NOT EXISTS idx_messages_user_time ON messages (user_name, timestamp_ms);
+CREATE INDEX IF NOT EXISTS idx_messages_gift_time ON messages (gift_md5, timestamp_ms);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_INSERT = """
+INSERT OR IGNORE INTO messages (seq, message_id, type, content, user_name, timestamp_ms, gift_md5, gift_count, room_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_COLUMNS = "message_id, type, content, user_name, timestamp_ms, gift_md5, gift_count, room_id"
+
+
+def _row_to_message(row) -> Message:
+    message_id, type_code, content, user_name, timestamp_ms, gift_md5, gift_count, room_id = row
+    return Message(message_id, MessageType(type_code), content, user_name, timestamp_ms,
+                   gift_md5, gift_count, room_id)
+
+
+class HistoryStore:
+    """
+    SQLite历史消息库
+
+    后台线程用游标从MessageStore读取新消息，每批在一个事务中批量写入（WAL模式），
+    游标保存在数据库中，重启后从上次的位置继续（配合持久化日志不会漏写）。
+    按时间、类型、用户和礼物md5建立索引，常用查询不需要全表扫描。
+    """
+
+    def __init__(self, db_path: str = os.path.join('data', 'history.db'),
+                 message_store: Optional[MessageStore] = None,
+                 batch_size: int = 2000, poll_interval: float = 0.5):
+        self.db_path = db_path
+        self.message_store = message_store
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.inserted = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_conn = self._connect()
+        self._write_conn.executescript(_SCHEMA)
+        self._write_lock = threading.Lock()
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        self.cursor = self._load_meta('cursor')
+        # 写入数据库的序号 = 存储中的序号 + seq_offset；消息日志被删除或重建后存储序号从1重新开始，
+        # 偏移保证新的序号接在库中已有的记录之后
+        self.seq_offset = self._load_meta('seq_offset')
+        if message_store is not None and self.cursor > message_store.last_sequence:
+            self._reset_cursor()
+
+        self.is_running = False
+        self._thread = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _load_meta(self, key: str) -> int:
+        row = self._write_conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _reset_cursor(self):
+        """存储的序号比保存的游标小（消息日志被删除或重建），游标归零并把新序号排在已有记录之后"""
+        max_seq = self._write_conn.execute("SELECT MAX(seq) FROM messages").fetchone()[0] or 0
+        print(f"历史消息库游标 {self.cursor} 超过消息存储的最新序号 {self.message_store.last_sequence}，"
+              f"消息日志可能已被重建，从头开始同步（序号偏移 {max_seq}）")
+        self.cursor = 0
+        self.seq_offset = max_seq
+        with self._write_conn:
+            self._write_conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [('cursor', '0'), ('seq_offset', str(max_seq))])
+
+    def start(self):
+        """启动后台写入线程"""
+        if self.message_store is None or self.is_running:
+            return
+        self.is_running = True
+        self._thread = threading.Thread(target=self._sync_loop, daemon=True)
+        self._thread.start()
+        print(f"历史消息库已启动: {self.db_path}, 游标 {self.cursor}")
+
+    def _sync_loop(self):
+        while self.is_running:
+            try:
+                if not self.sync_once():
+                    time.sleep(self.poll_interval)
+            except Exception as e:
+                print(f"写入历史消息失败: {str(e)}")
+                time.sleep(5)
+
+    def sync_once(self) -> int:
+        """从MessageStore读取一批新消息写入数据库，返回写入的条数"""
+        # 需要完整历史：落后于内存中的消息时从持久化日志补读
+        entries, next_cursor = self.message_store.read_entries_since(self.cursor, limit=self.batch_size,
+                                                                     replay_log=True)
+        if next_cursor == self.cursor:
+            return 0
+        self.insert_entries(entries, next_cursor)
+        return len(entries)
+
+    def insert_entries(self, entries: Iterable[Tuple[int, Message]], cursor: Optional[int] = None):
+        """在一个事务中批量写入 (存储中的序号, 消息)，同时保存游标"""
+        rows = [
+            (sequence + self.seq_offset, message.message_id, message.type_code, message.content, message.user_name,
+             message.timestamp_ms, message.gift_md5, message.gift_count, message.room_id)
+            for sequence, message in entries
+        ]
+        with self._write_lock:
+            with self._write_conn:
+                self._write_conn.executemany(_INSERT, rows)
+                if cursor is not None:
+                    self._write_conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('cursor', ?)", (str(cursor),))
+        if cursor is not None:
+            self.cursor = cursor
+        self.inserted += len(rows)
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def top_gifters(self, seconds: float = 3600, limit: int = 10) -> List[Dict]:
+        """最近seconds秒内送礼数量最多的用户"""
+        since_ms = int((time.time() - seconds) * 1000)
+        rows = self._query(
+            "SELECT user_name, SUM(COALESCE(gift_count, 1)) AS total, COUNT(*) FROM messages "
+            "WHERE type = ? AND timestamp_ms >= ? GROUP BY user_name ORDER BY total DESC LIMIT ?",
+            (MessageType.GIFT.value, since_ms, limit))
+        return [{"user_name": user_name, "gift_count": total, "messages": count}
+                for user_name, total, count in rows]
+
+    def gift_totals(self, seconds: float = 3600) -> Dict[str, int]:
+        """最近seconds秒内每种礼物的总数量"""
+        since_ms = int((time.time() - seconds) * 1000)
+        rows = self._query(
+            "SELECT gift_md5, SUM(COALESCE(gift_count, 1)) FROM messages "
+            "WHERE type = ? AND timestamp_ms >= ? AND gift_md5 IS NOT NULL GROUP BY gift_md5",
+            (MessageType.GIFT.value, since_ms))
+        return {gift_md5: total for gift_md5, total in rows}
+
+    def messages_by_user(self, user_name: str, limit: int = 100,
+                         since_ms: Optional[int] = None) -> List[Message]:
+        """某个用户的消息，按时间倒序"""
+        rows = self._query(
+            f"SELECT {_COLUMNS} FROM messages WHERE user_name = ? AND timestamp_ms >= ? "
+            "ORDER BY timestamp_ms DESC LIMIT ?",
+            (user_name, since_ms or 0, limit))
+        return [_row_to_message(row) for row in rows]
+
+    def messages_between(self, start_ms: int, end_ms: int, message_type: Optional[MessageType] = None,
+                         limit: int = 1000) -> List[Message]:
+        """时间范围内的消息，可按类型筛选"""
+        if message_type is None:
+            rows = self._query(
+                f"SELECT {_COLUMNS} FROM messages WHERE timestamp_ms BETWEEN ? AND ? "
+                "ORDER BY timestamp_ms LIMIT ?", (start_ms, end_ms, limit))
+        else:
+            rows = self._query(
+                f"SELECT {_COLUMNS} FROM messages WHERE type = ? AND timestamp_ms BETWEEN ? AND ? "
+                "ORDER BY timestamp_ms LIMIT ?", (message_type.value, start_ms, end_ms, limit))
+        return [_row_to_message(row) for row in rows]
+
+    def count_by_type(self, seconds: float = 3600) -> Dict[MessageType, int]:
+        """最近seconds秒内每种类型的消息条数"""
+        since_ms = int((time.time() - seconds) * 1000)
+        counts = {message_type: 0 for message_type in MessageType}
+        for message_type in MessageType:
+            row = self._query("SELECT COUNT(*) FROM messages WHERE type = ? AND timestamp_ms >= ?",
+                              (message_type.value, since_ms))
+            counts[message_type] = row[0][0]
+        return counts
+
+    def stop(self):
+        """停止后台线程，写入剩余消息并关闭数据库"""
+        self.is_running = False
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        try:
+            if self.message_store is not None:
+                while self.sync_once():
+                    pass
+        except Exception as e:
+            print(f"写入历史消息失败: {str(e)}")
+        with self._write_lock:
+            self._write_conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+        print("历史消息库已关闭")
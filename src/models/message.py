@@ -1,7 +1,8 @@
 from enum import Enum, auto
-from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
+import sys
+import time
 
 class MessageType(Enum):
     CHAT = auto()    # 聊天消息
@@ -9,20 +10,109 @@ class MessageType(Enum):
     LIKE = auto()    # 点赞消息
     ENTER = auto()   # 进入消息
 
-@dataclass
+# 类型编号 -> 消息类型，消息中只保存编号
+_TYPES_BY_CODE = {message_type.value: message_type for message_type in MessageType}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """驻留重复出现的字符串（用户名、礼物md5），相同的值只保存一份"""
+    return sys.intern(value) if value else value
+
+
+def _to_epoch_ms(timestamp: Union[datetime, int, float, None]) -> int:
+    if timestamp is None:
+        return int(time.time() * 1000)
+    if isinstance(timestamp, datetime):
+        return int(timestamp.timestamp() * 1000)
+    return int(timestamp)
+
+
 class Message:
-    message_id: str              # 消息唯一ID
-    type: MessageType           # 消息类型
-    content: str               # 消息内容
-    user_name: str            # 用户名
-    timestamp: datetime = None  # 消息时间戳
-    gift_md5: Optional[str] = None  # 礼物MD5值，仅在type为GIFT时有效
-    gift_count: Optional[int] = None # 礼物数量，仅在type为GIFT时有效
-    
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.now()
-    
+    """
+    直播间消息
+
+    使用 __slots__ 的紧凑表示：类型保存为小整数，时间戳保存为毫秒级整数，
+    用户名和礼物md5经过字符串驻留。type 和 timestamp 属性仍返回 MessageType 和 datetime，
+    需要原始值时使用 type_code 和 timestamp_ms。
+    """
+    __slots__ = ('message_id', 'type_code', 'content', 'user_name', 'timestamp_ms',
+                 'gift_md5', 'gift_count', 'room_id', 'gift_image_url')
+
+    def __init__(self, message_id: str, type: MessageType, content: str, user_name: str,
+                 timestamp: Union[datetime, int, None] = None,  # datetime或毫秒时间戳，默认当前时间
+                 gift_md5: Optional[str] = None,  # 礼物MD5值，仅在type为GIFT时有效
+                 gift_count: Optional[int] = None,  # 礼物数量，仅在type为GIFT时有效
+                 room_id: Optional[str] = None,  # 直播间ID，多直播间采集时有效
+                 gift_image_url: Optional[str] = None):  # 礼物图片地址，仅在type为GIFT时有效
+        self.message_id = message_id
+        self.type_code = type.value
+        self.content = content
+        self.user_name = _intern(user_name)
+        self.timestamp_ms = _to_epoch_ms(timestamp)
+        self.gift_md5 = _intern(gift_md5)
+        self.gift_count = gift_count
+        self.room_id = _intern(room_id)
+        self.gift_image_url = _intern(gift_image_url)
+
+    @property
+    def type(self) -> MessageType:
+        return _TYPES_BY_CODE[self.type_code]
+
+    @type.setter
+    def type(self, message_type: MessageType):
+        self.type_code = message_type.value
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp_ms / 1000)
+
+    @timestamp.setter
+    def timestamp(self, timestamp: Union[datetime, int, None]):
+        self.timestamp_ms = _to_epoch_ms(timestamp)
+
+    def to_tuple(self) -> tuple:
+        """转换为紧凑的元组 (id, 类型编号, 内容, 用户名, 毫秒时间戳, 礼物md5, 礼物数量, 直播间ID, 礼物图片地址)"""
+        return (self.message_id, self.type_code, self.content, self.user_name, self.timestamp_ms,
+                self.gift_md5, self.gift_count, self.room_id, self.gift_image_url)
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> "Message":
+        """从 to_tuple() 的结果恢复消息"""
+        message_id, type_code, content, user_name, timestamp_ms, gift_md5, gift_count, room_id = values[:8]
+        gift_image_url = values[8] if len(values) > 8 else None
+        return cls(message_id, _TYPES_BY_CODE[type_code], content, user_name, timestamp_ms,
+                   gift_md5, gift_count, room_id, gift_image_url)
+
+    def to_dict(self) -> dict:
+        """转换为普通字典，类型使用名称、时间使用毫秒时间戳"""
+        return {
+            "message_id": self.message_id,
+            "type": self.type.name,
+            "content": self.content,
+            "user_name": self.user_name,
+            "timestamp_ms": self.timestamp_ms,
+            "gift_md5": self.gift_md5,
+            "gift_count": self.gift_count,
+            "room_id": self.room_id,
+            "gift_image_url": self.gift_image_url
+        }
+
+    def __reduce__(self):
+        # 跨进程传递时重新驻留字符串
+        return (Message.from_tuple, (self.to_tuple(),))
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self.to_tuple() == other.to_tuple()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"Message(message_id={self.message_id!r}, type={self.type}, content={self.content!r}, "
+                f"user_name={self.user_name!r}, timestamp_ms={self.timestamp_ms}, gift_md5={self.gift_md5!r}, "
+                f"gift_count={self.gift_count!r}, room_id={self.room_id!r}, gift_image_url={self.gift_image_url!r})")
+
     def __str__(self):
         if self.type == MessageType.GIFT:
             return f"{self.user_name} 送出了 [md5: {self.gift_md5}] × {self.gift_count}"
@@ -31,4 +121,4 @@ class Message:
         elif self.type == MessageType.ENTER:
             return f"{self.user_name} {self.content}"
         else:
-            return f"{self.user_name}: {self.content}"
\ No newline at end of file
+            return f"{self.user_name}: {self.content}"
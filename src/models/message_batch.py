@@ -0,0 +1,162 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+from .message import Message, MessageType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# gift_indices / room_indices 中表示“没有”的值
+NO_INDEX = -1
+
+_GIFT_CODE = MessageType.GIFT.value
+
+
+class MessageBatch:
+    """
+    一次轮询得到的一批消息的列式表示
+
+    每列是一个并行数组：类型编号、毫秒时间戳、用户名下标、礼物md5下标、礼物数量、直播间下标；
+    用户名、礼物md5和直播间ID在批次内各自去重后保存在字符串表中，礼物图片地址按礼物md5保存在对应的表中。
+    按类型筛选、按礼物统计等操作直接在数组上完成，安装了NumPy时使用向量化计算。
+    批次不保留原来的Message对象，逐条访问时由各列重建。
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.contents: List[str] = []
+        self.type_codes = array('b')
+        self.timestamps = array('q')  # 毫秒时间戳
+        self.user_indices = array('l')
+        self.gift_indices = array('l')
+        self.gift_counts = array('l')  # 非礼物消息为0
+        self.room_indices = array('l')
+
+        self.users: List[str] = []
+        self.gift_md5s: List[str] = []
+        self.gift_image_urls: List[Optional[str]] = []  # 与gift_md5s对应
+        self.rooms: List[str] = []
+        self._user_lookup: Dict[str, int] = {}
+        self._gift_lookup: Dict[str, int] = {}
+        self._room_lookup: Dict[str, int] = {}
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[Message]) -> "MessageBatch":
+        batch = cls()
+        for message in messages:
+            batch.append(message)
+        return batch
+
+    @staticmethod
+    def _index(value: Optional[str], table: List[str], lookup: Dict[str, int]) -> int:
+        if value is None:
+            return NO_INDEX
+        index = lookup.get(value)
+        if index is None:
+            index = len(table)
+            table.append(value)
+            lookup[value] = index
+        return index
+
+    def append(self, message: Message):
+        self.ids.append(message.message_id)
+        self.contents.append(message.content)
+        self.type_codes.append(message.type_code)
+        self.timestamps.append(message.timestamp_ms)
+        self.user_indices.append(self._index(message.user_name, self.users, self._user_lookup))
+        gift_index = self._index(message.gift_md5, self.gift_md5s, self._gift_lookup)
+        if gift_index != NO_INDEX:
+            if gift_index == len(self.gift_image_urls):
+                self.gift_image_urls.append(message.gift_image_url)
+            elif self.gift_image_urls[gift_index] is None:
+                self.gift_image_urls[gift_index] = message.gift_image_url
+        self.gift_indices.append(gift_index)
+        self.gift_counts.append(message.gift_count or 0)
+        self.room_indices.append(self._index(message.room_id, self.rooms, self._room_lookup))
+
+    def extend(self, other: "MessageBatch"):
+        for message in other:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __bool__(self) -> bool:
+        return bool(self.ids)
+
+    def message_at(self, index: int) -> Message:
+        """由各列重建第 index 条消息（每次返回新的Message对象）"""
+        gift_index = self.gift_indices[index]
+        room_index = self.room_indices[index]
+        user_index = self.user_indices[index]
+        type_code = self.type_codes[index]
+        # 各列中的值已经是规范化的（编号、毫秒时间戳、驻留过的字符串），直接填入槽位，不经过构造函数
+        message = Message.__new__(Message)
+        message.message_id = self.ids[index]
+        message.type_code = type_code
+        message.content = self.contents[index]
+        message.user_name = self.users[user_index] if user_index != NO_INDEX else None
+        message.timestamp_ms = self.timestamps[index]
+        if gift_index != NO_INDEX:
+            message.gift_md5 = self.gift_md5s[gift_index]
+            message.gift_image_url = self.gift_image_urls[gift_index]
+        else:
+            message.gift_md5 = message.gift_image_url = None
+        message.gift_count = self.gift_counts[index] if type_code == _GIFT_CODE else None
+        message.room_id = self.rooms[room_index] if room_index != NO_INDEX else None
+        return message
+
+    def __iter__(self) -> Iterator[Message]:
+        for index in range(len(self.ids)):
+            yield self.message_at(index)
+
+    def to_messages(self) -> List[Message]:
+        return list(self)
+
+    def indices_of_type(self, message_type: MessageType) -> List[int]:
+        """指定类型消息的下标"""
+        code = message_type.value
+        if np is not None:
+            return np.flatnonzero(np.frombuffer(self.type_codes, dtype=np.int8) == code).tolist()
+        return [index for index, type_code in enumerate(self.type_codes) if type_code == code]
+
+    def messages_of_type(self, message_type: MessageType) -> List[Message]:
+        """指定类型的消息"""
+        return [self.message_at(index) for index in self.indices_of_type(message_type)]
+
+    def count_by_type(self) -> Dict[MessageType, int]:
+        """每种类型的消息条数"""
+        if np is not None:
+            counts = np.bincount(np.frombuffer(self.type_codes, dtype=np.int8),
+                                 minlength=len(MessageType) + 1)
+            return {message_type: int(counts[message_type.value]) for message_type in MessageType}
+        counts = {message_type: 0 for message_type in MessageType}
+        for type_code in self.type_codes:
+            counts[MessageType(type_code)] += 1
+        return counts
+
+    def gift_images(self) -> Dict[str, Optional[str]]:
+        """本批次中各礼物md5对应的图片地址"""
+        return dict(zip(self.gift_md5s, self.gift_image_urls))
+
+    def gifts_per_md5(self, weighted: bool = True) -> Dict[str, int]:
+        """
+        按礼物md5统计本批次的礼物
+
+        Args:
+            weighted: True时累加礼物数量，False时统计礼物消息条数
+        """
+        if not self.gift_md5s:
+            return {}
+        if np is not None:
+            indices = np.frombuffer(self.gift_indices, dtype=self.gift_indices.typecode)
+            mask = indices != NO_INDEX
+            weights = np.frombuffer(self.gift_counts, dtype=self.gift_counts.typecode)[mask] if weighted else None
+            totals = np.bincount(indices[mask], weights=weights, minlength=len(self.gift_md5s))
+            return {md5: int(total) for md5, total in zip(self.gift_md5s, totals)}
+        totals = [0] * len(self.gift_md5s)
+        for gift_index, gift_count in zip(self.gift_indices, self.gift_counts):
+            if gift_index != NO_INDEX:
+                totals[gift_index] += gift_count if weighted else 1
+        return dict(zip(self.gift_md5s, totals))
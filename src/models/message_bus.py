@@ -0,0 +1,178 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+import threading
+import time
+
+from .message import MessageType
+from .message_batch import MessageBatch
+from .message_store import MessageStore
+
+# 订阅者队列已满时的处理方式
+POLICY_BLOCK = "block"              # 发布方等待（最多 block_timeout 秒，超时后丢弃最早的批次）
+POLICY_DROP_OLDEST = "drop_oldest"  # 丢弃最早的批次
+POLICY_COALESCE = "coalesce"        # 合并到最新的批次中，不丢消息，只限制批次数
+
+
+class Subscription:
+    """一个订阅者：按消息类型过滤，拥有自己的有界批次队列"""
+
+    def __init__(self, name: str, types: Optional[Iterable[MessageType]] = None, maxsize: int = 100,
+                 policy: str = POLICY_COALESCE, block_timeout: float = 1.0):
+        self.name = name
+        self.type_codes = {message_type.value for message_type in types} if types is not None else None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue = deque()  # (入队时间, 批次)
+        self._condition = threading.Condition()
+        self.closed = False
+
+        self.published = 0  # 投递给该订阅者的消息数
+        self.delivered = 0  # 已被取走的消息数
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked_seconds = 0.0
+
+    def _filter(self, batch: MessageBatch) -> MessageBatch:
+        """按类型过滤，总是返回新的批次：队列中的批次会被合并时原地扩展，不能与其他订阅者共用"""
+        filtered = MessageBatch()
+        for index, type_code in enumerate(batch.type_codes):
+            if self.type_codes is None or type_code in self.type_codes:
+                filtered.append(batch.message_at(index))
+        return filtered
+
+    def put(self, batch: MessageBatch):
+        """由总线调用：按订阅的类型过滤后放入队列"""
+        batch = self._filter(batch)
+        if not batch:
+            return
+        with self._condition:
+            if self.closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                if self.policy == POLICY_BLOCK:
+                    start = time.perf_counter()
+                    self._condition.wait_for(lambda: len(self._queue) < self.maxsize or self.closed,
+                                             self.block_timeout)
+                    self.blocked_seconds += time.perf_counter() - start
+                if self.policy == POLICY_COALESCE:
+                    # 合并到最新的批次，不占用新的队列位置，也不丢消息
+                    _, newest = self._queue[-1]
+                    newest.extend(batch)
+                    self.published += len(batch)
+                    self.coalesced += len(batch)
+                    self._condition.notify_all()
+                    return
+                while len(self._queue) >= self.maxsize:
+                    _, dropped = self._queue.popleft()
+                    self.dropped += len(dropped)
+            self._queue.append((time.time(), batch))
+            self.published += len(batch)
+            self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[MessageBatch]:
+        """取出下一个批次；timeout为0时不等待，没有批次时返回None"""
+        with self._condition:
+            if not self._queue and timeout != 0:
+                self._condition.wait_for(lambda: self._queue or self.closed, timeout)
+            if not self._queue:
+                return None
+            _, batch = self._queue.popleft()
+            self.delivered += len(batch)
+            self._condition.notify_all()
+            return batch
+
+    def drain(self) -> Optional[MessageBatch]:
+        """不等待，取出并合并队列中所有批次"""
+        merged = None
+        while True:
+            batch = self.get(timeout=0)
+            if batch is None:
+                return merged
+            if merged is None:
+                merged = batch
+            else:
+                merged.extend(batch)
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict:
+        """队列深度、最早未取批次的等待时间（延迟）和丢弃/合并统计"""
+        with self._condition:
+            pending = sum(len(batch) for _, batch in self._queue)
+            lag_seconds = time.time() - self._queue[0][0] if self._queue else 0.0
+            return {
+                "policy": self.policy,
+                "queued_batches": len(self._queue),
+                "queued_messages": pending,
+                "lag_seconds": lag_seconds,
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "blocked_seconds": self.blocked_seconds
+            }
+
+
+class MessageBus:
+    """
+    消息总线
+
+    发布的批次先写入MessageStore，再按消息类型分发给各订阅者的有界队列。
+    每个订阅者在自己的线程中消费，队列满时按各自的策略处理，慢的消费者不会拖住采集线程。
+    """
+
+    def __init__(self, message_store: Optional[MessageStore] = None):
+        self.message_store = message_store
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, name: str, types: Optional[Iterable[MessageType]] = None, maxsize: int = 100,
+                  policy: str = POLICY_COALESCE, block_timeout: float = 1.0) -> Subscription:
+        """订阅指定类型的消息，同名的订阅会被替换"""
+        subscription = Subscription(name, types, maxsize, policy, block_timeout)
+        with self._lock:
+            previous = self._subscriptions.get(name)
+            self._subscriptions[name] = subscription
+        if previous:
+            previous.close()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if self._subscriptions.get(subscription.name) is subscription:
+                del self._subscriptions[subscription.name]
+        subscription.close()
+
+    def publish(self, batch: MessageBatch) -> MessageBatch:
+        """写入存储，只把新存入的消息分发给所有订阅者，返回分发的批次"""
+        if not batch:
+            return batch
+        if self.message_store is not None:
+            # 存储中已有的消息ID（例如工作进程重启后重新发出的列表）不再分发
+            stored = self.message_store.add_batch(batch)
+            if len(stored) != len(batch):
+                batch = MessageBatch.from_messages(stored)
+            if not batch:
+                return batch
+        with self._lock:
+            subscriptions: List[Subscription] = list(self._subscriptions.values())
+        for subscription in subscriptions:
+            try:
+                subscription.put(batch)
+            except Exception as e:
+                print(f"分发消息给 {subscription.name} 失败: {str(e)}")
+        return batch
+
+    # 与MessageStore相同的写入接口，可以代替存储传给采集组件
+    add_batch = publish
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """各订阅者的队列和延迟统计"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        return {subscription.name: subscription.get_stats() for subscription in subscriptions}
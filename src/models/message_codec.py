@@ -0,0 +1,251 @@
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO
+import json
+import socket
+import struct
+
+from .message import Message, MessageType
+
+# 编码格式版本，每条记录都带有版本号，格式变化时递增
+CODEC_VERSION = 1
+
+# 二进制记录: [uint32 长度][负载]
+# 负载: [uint8 版本][uint8 类型编号][uint8 标志][int64 毫秒时间戳][int32 礼物数量]
+#       [uint16 长度 + 消息ID][uint32 长度 + 内容][uint16 长度 + 用户名]
+#       [uint16 长度 + 礼物md5]（标志位1）[uint16 长度 + 直播间ID]（标志位2）
+#       [uint16 长度 + 礼物图片地址]（标志位16）
+# 礼物数量超出int32范围时按边界值保存；uint16长度的字段超过65535字节时编码失败（CodecError）
+_LENGTH = struct.Struct('<I')
+_HEADER = struct.Struct('<BBBqi')
+_SHORT = struct.Struct('<H')
+
+_FLAG_GIFT_MD5 = 1
+_FLAG_ROOM_ID = 2
+_FLAG_GIFT_COUNT = 4
+_FLAG_USER_NAME = 8
+_FLAG_GIFT_IMAGE_URL = 16
+
+_INT32_MIN = -(1 << 31)
+_INT32_MAX = (1 << 31) - 1
+_SHORT_MAX = 0xFFFF
+
+_TYPES_BY_CODE = {message_type.value: message_type for message_type in MessageType}
+
+
+class CodecError(ValueError):
+    """记录损坏、版本不支持或消息无法编码"""
+
+
+def _pack_short(value: str, field: str) -> bytes:
+    data = value.encode('utf-8')
+    if len(data) > _SHORT_MAX:
+        raise CodecError(f"{field}过长: {len(data)} 字节")
+    return _SHORT.pack(len(data)) + data
+
+
+def encode_binary(message: Message) -> bytes:
+    """把消息编码为二进制负载（不含长度前缀），字段超出格式限制时抛出CodecError"""
+    flags = 0
+    if message.gift_md5:
+        flags |= _FLAG_GIFT_MD5
+    if message.room_id:
+        flags |= _FLAG_ROOM_ID
+    if message.gift_count is not None:
+        flags |= _FLAG_GIFT_COUNT
+    if message.user_name is not None:
+        flags |= _FLAG_USER_NAME
+    if message.gift_image_url:
+        flags |= _FLAG_GIFT_IMAGE_URL
+
+    gift_count = min(max(message.gift_count or 0, _INT32_MIN), _INT32_MAX)
+    content = (message.content or '').encode('utf-8')
+    try:
+        header = _HEADER.pack(CODEC_VERSION, message.type_code, flags, message.timestamp_ms, gift_count)
+        content_length = _LENGTH.pack(len(content))
+    except struct.error as e:
+        raise CodecError(f"消息无法编码: {str(e)}")
+    parts = [
+        header,
+        _pack_short(message.message_id or '', "消息ID"),
+        content_length, content,
+        _pack_short(message.user_name or '', "用户名")
+    ]
+    if message.gift_md5:
+        parts.append(_pack_short(message.gift_md5, "礼物md5"))
+    if message.room_id:
+        parts.append(_pack_short(message.room_id, "直播间ID"))
+    if message.gift_image_url:
+        parts.append(_pack_short(message.gift_image_url, "礼物图片地址"))
+    return b''.join(parts)
+
+
+def decode_binary(payload: bytes) -> Message:
+    """从二进制负载解码消息"""
+    try:
+        version, type_code, flags, timestamp_ms, gift_count = _HEADER.unpack_from(payload, 0)
+        if version != CODEC_VERSION:
+            raise CodecError(f"不支持的记录版本: {version}")
+        offset = _HEADER.size
+
+        (length,) = _SHORT.unpack_from(payload, offset)
+        offset += 2
+        message_id = payload[offset:offset + length].decode('utf-8')
+        offset += length
+        (length,) = _LENGTH.unpack_from(payload, offset)
+        offset += 4
+        content = payload[offset:offset + length].decode('utf-8')
+        offset += length
+        (length,) = _SHORT.unpack_from(payload, offset)
+        offset += 2
+        user_name = payload[offset:offset + length].decode('utf-8') if flags & _FLAG_USER_NAME else None
+        offset += length
+        gift_md5 = room_id = gift_image_url = None
+        if flags & _FLAG_GIFT_MD5:
+            (length,) = _SHORT.unpack_from(payload, offset)
+            offset += 2
+            gift_md5 = payload[offset:offset + length].decode('utf-8')
+            offset += length
+        if flags & _FLAG_ROOM_ID:
+            (length,) = _SHORT.unpack_from(payload, offset)
+            offset += 2
+            room_id = payload[offset:offset + length].decode('utf-8')
+            offset += length
+        if flags & _FLAG_GIFT_IMAGE_URL:
+            (length,) = _SHORT.unpack_from(payload, offset)
+            offset += 2
+            gift_image_url = payload[offset:offset + length].decode('utf-8')
+    except (struct.error, UnicodeDecodeError) as e:
+        raise CodecError(f"记录已损坏: {str(e)}")
+
+    message_type = _TYPES_BY_CODE.get(type_code)
+    if message_type is None:
+        raise CodecError(f"未知的消息类型编号: {type_code}")
+    return Message(message_id, message_type, content, user_name, timestamp_ms, gift_md5,
+                   gift_count if flags & _FLAG_GIFT_COUNT else None, room_id, gift_image_url)
+
+
+def encode_records(messages: Iterable[Message]) -> bytes:
+    """把多条消息编码为连续的带长度前缀的二进制记录，跳过无法编码的消息"""
+    parts = []
+    for message in messages:
+        try:
+            payload = encode_binary(message)
+        except CodecError as e:
+            print(f"跳过无法编码的消息: {str(e)}")
+            continue
+        parts.append(_LENGTH.pack(len(payload)))
+        parts.append(payload)
+    return b''.join(parts)
+
+
+def decode_records(data: bytes) -> List[Message]:
+    """解码 encode_records() 的结果"""
+    messages = []
+    offset = 0
+    while offset < len(data):
+        if offset + _LENGTH.size > len(data):
+            raise CodecError("记录长度不完整")
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        if offset + length > len(data):
+            raise CodecError("记录内容不完整")
+        messages.append(decode_binary(data[offset:offset + length]))
+        offset += length
+    return messages
+
+
+def write_binary(stream: BinaryIO, messages: Iterable[Message]) -> int:
+    """把消息以二进制记录写入文件或socket.makefile('wb')，跳过无法编码的消息，返回写入的条数"""
+    count = 0
+    for message in messages:
+        try:
+            payload = encode_binary(message)
+        except CodecError as e:
+            print(f"跳过无法编码的消息: {str(e)}")
+            continue
+        stream.write(_LENGTH.pack(len(payload)))
+        stream.write(payload)
+        count += 1
+    return count
+
+
+def iter_binary(stream: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[Message]:
+    """从文件或socket.makefile('rb')中逐条读取二进制记录，流结束时停止"""
+    # read1 只返回当前可读的数据，socket上的消息不必等缓冲区读满才产出
+    read = getattr(stream, 'read1', stream.read)
+    buffer = b''
+    offset = 0
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            if offset < len(buffer):
+                raise CodecError("记录在流结束处被截断")
+            return
+        buffer = buffer[offset:] + chunk
+        offset = 0
+        # 解析缓冲区中所有完整的记录，剩余部分留到下一次读取
+        while offset + 4 <= len(buffer):
+            (length,) = _LENGTH.unpack_from(buffer, offset)
+            if offset + 4 + length > len(buffer):
+                break
+            yield decode_binary(buffer[offset + 4:offset + 4 + length])
+            offset += 4 + length
+
+
+def encode_json(message: Message) -> str:
+    """把消息编码为一行JSON（不含换行符）"""
+    data = message.to_dict()
+    data["v"] = CODEC_VERSION
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def decode_json(line: str) -> Message:
+    """从一行JSON解码消息"""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise CodecError(f"JSON记录已损坏: {str(e)}")
+    if data.get("v") != CODEC_VERSION:
+        raise CodecError(f"不支持的记录版本: {data.get('v')}")
+    try:
+        return Message(
+            message_id=data["message_id"],
+            type=MessageType[data["type"]],
+            content=data["content"],
+            user_name=data.get("user_name"),
+            timestamp=data["timestamp_ms"],
+            gift_md5=data.get("gift_md5"),
+            gift_count=data.get("gift_count"),
+            room_id=data.get("room_id"),
+            gift_image_url=data.get("gift_image_url")
+        )
+    except KeyError as e:
+        raise CodecError(f"JSON记录缺少字段: {str(e)}")
+
+
+def write_jsonl(stream: TextIO, messages: Iterable[Message]) -> int:
+    """把消息以JSON Lines写入文本文件或socket.makefile('w')，返回写入的条数"""
+    count = 0
+    for message in messages:
+        stream.write(encode_json(message))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+def iter_jsonl(stream: TextIO) -> Iterator[Message]:
+    """从文本文件或socket.makefile('r')中逐行读取消息，跳过空行"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield decode_json(line)
+
+
+def send_messages(sock: socket.socket, messages: Iterable[Message]):
+    """通过socket发送二进制记录"""
+    sock.sendall(encode_records(messages))
+
+
+def iter_socket_messages(sock: socket.socket) -> Iterator[Message]:
+    """从socket读取二进制记录，直到对方关闭连接"""
+    with sock.makefile('rb') as stream:
+        yield from iter_binary(stream)
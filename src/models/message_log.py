@@ -0,0 +1,274 @@
+from typing import Iterator, List, Optional, Tuple
+import os
+import struct
+import threading
+import time
+
+from .message import Message
+from .message_codec import CodecError, decode_binary, encode_binary
+
+# 日志记录: [uint32 负载长度][uint64 序号][负载（message_codec二进制格式）]
+_RECORD_HEADER = struct.Struct('<IQ')
+# 索引项: [uint64 序号][uint64 该记录在段文件中的偏移]
+_INDEX_ENTRY = struct.Struct('<QQ')
+
+SEGMENT_SUFFIX = '.log'
+INDEX_SUFFIX = '.idx'
+
+
+class MessageLog:
+    """
+    追加写入的持久化消息日志
+
+    记录按序号写入段文件（文件名为段内第一条记录的序号），单个段超过 segment_bytes 后切换到新段，
+    只保留最近 retain_segments 个段。每隔 index_interval 条记录在同名 .idx 文件中记录一次
+    序号 -> 偏移，回放时先按索引定位再顺序读取。
+    写入在后台线程中成组提交：等待 commit_interval 秒或攒够 commit_batch 条后一次写入并刷盘。
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, retain_segments: Optional[int] = 20,
+                 index_interval: int = 64, commit_interval: float = 0.05, commit_batch: int = 1024,
+                 fsync: bool = True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retain_segments = retain_segments
+        self.index_interval = index_interval
+        self.commit_interval = commit_interval
+        self.commit_batch = commit_batch
+        self.fsync = fsync
+
+        self._pending: List[Tuple[int, Message]] = []
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._segment_file = None
+        self._index_file = None
+        self._segment_size = 0
+        self._records_in_segment = 0
+        self.last_sequence = 0
+        self.commits = 0
+        self.records_written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+        self.is_running = True
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
+
+    def _segment_starts(self) -> List[int]:
+        starts = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                try:
+                    starts.append(int(name[:-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(starts)
+
+    def _segment_path(self, first_sequence: int, suffix: str = SEGMENT_SUFFIX) -> str:
+        return os.path.join(self.directory, f"{first_sequence:020d}{suffix}")
+
+    def _recover(self):
+        """打开最后一个段，找到最后一条完整记录，截断写到一半的尾部"""
+        starts = self._segment_starts()
+        if not starts:
+            return
+        path = self._segment_path(starts[-1])
+        valid_size = 0
+        records = 0
+        last_sequence = starts[-1] - 1
+        with open(path, 'rb') as f:
+            data = f.read()
+        while valid_size + _RECORD_HEADER.size <= len(data):
+            length, sequence = _RECORD_HEADER.unpack_from(data, valid_size)
+            end = valid_size + _RECORD_HEADER.size + length
+            if end > len(data):
+                break
+            valid_size = end
+            last_sequence = sequence
+            records += 1
+        if valid_size < len(data):
+            print(f"消息日志尾部不完整，截断 {len(data) - valid_size} 字节: {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(valid_size)
+        self._recover_index(starts[-1], valid_size, last_sequence)
+
+        self.last_sequence = last_sequence
+        self._segment_file = open(path, 'ab')
+        self._index_file = open(self._segment_path(starts[-1], INDEX_SUFFIX), 'ab')
+        self._segment_size = valid_size
+        self._records_in_segment = records
+
+    def _recover_index(self, segment_start: int, valid_size: int, last_sequence: int):
+        """
+        去掉索引中指向被截断部分的项（偏移不小于valid_size或序号大于last_sequence）
+
+        这些项对应的序号会被之后写入的记录重新使用，保留下来会让回放定位到错误的偏移。
+        """
+        path = self._segment_path(segment_start, INDEX_SUFFIX)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        entries = []
+        for position in range(0, len(data) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size):
+            sequence, offset = _INDEX_ENTRY.unpack_from(data, position)
+            if offset >= valid_size or sequence > last_sequence:
+                break
+            entries.append(data[position:position + _INDEX_ENTRY.size])
+        valid = b''.join(entries)
+        if valid != data:
+            print(f"消息日志索引与日志不一致，丢弃 {(len(data) - len(valid)) // _INDEX_ENTRY.size} 项: {path}")
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(valid)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+
+    def append(self, sequence: int, message: Message):
+        """加入待写入队列，由后台线程成组提交"""
+        with self._condition:
+            self._pending.append((sequence, message))
+            if len(self._pending) >= self.commit_batch:
+                self._condition.notify()
+
+    def _writer_loop(self):
+        while self.is_running:
+            with self._condition:
+                if len(self._pending) < self.commit_batch:
+                    self._condition.wait(self.commit_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"写入消息日志失败: {str(e)}")
+                time.sleep(1)
+
+    def flush(self):
+        """立即提交所有待写入的记录"""
+        with self._write_lock:
+            with self._condition:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+
+            parts = []
+            written = 0
+            for sequence, message in pending:
+                # 单条消息无法编码时只跳过这一条，不影响同一批的其他记录
+                try:
+                    payload = encode_binary(message)
+                except CodecError as e:
+                    print(f"跳过无法写入日志的消息 {sequence}: {str(e)}")
+                    continue
+                if self._segment_file is None or self._segment_size >= self.segment_bytes:
+                    self._write_parts(parts)
+                    parts = []
+                    self._rotate(sequence)
+                if self._records_in_segment % self.index_interval == 0:
+                    self._index_file.write(_INDEX_ENTRY.pack(sequence, self._segment_size))
+                parts.append(_RECORD_HEADER.pack(len(payload), sequence))
+                parts.append(payload)
+                self._segment_size += _RECORD_HEADER.size + len(payload)
+                self._records_in_segment += 1
+                self.last_sequence = sequence
+                written += 1
+            self._write_parts(parts)
+            self.commits += 1
+            self.records_written += written
+
+    def _write_parts(self, parts: List[bytes]):
+        if self._segment_file is None:
+            return
+        if parts:
+            self._segment_file.write(b''.join(parts))
+        self._segment_file.flush()
+        self._index_file.flush()
+        if self.fsync:
+            os.fsync(self._segment_file.fileno())
+
+    def _rotate(self, first_sequence: int):
+        """切换到以first_sequence开头的新段，并删除超出保留数量的旧段"""
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._index_file.close()
+        self._segment_file = open(self._segment_path(first_sequence), 'ab')
+        self._index_file = open(self._segment_path(first_sequence, INDEX_SUFFIX), 'ab')
+        self._segment_size = 0
+        self._records_in_segment = 0
+
+        if self.retain_segments:
+            for start in self._segment_starts()[:-self.retain_segments]:
+                for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                    try:
+                        os.remove(self._segment_path(start, suffix))
+                    except OSError:
+                        pass
+
+    def first_sequence(self) -> Optional[int]:
+        """日志中最早的序号，日志为空时返回None"""
+        starts = self._segment_starts()
+        return starts[0] if starts else None
+
+    def _seek_offset(self, segment_start: int, sequence: int) -> int:
+        """按索引找到不晚于sequence的记录偏移"""
+        offset = 0
+        path = self._segment_path(segment_start, INDEX_SUFFIX)
+        if not os.path.exists(path):
+            return offset
+        with open(path, 'rb') as f:
+            data = f.read()
+        for position in range(0, len(data) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size):
+            indexed_sequence, indexed_offset = _INDEX_ENTRY.unpack_from(data, position)
+            if indexed_sequence > sequence:
+                break
+            offset = indexed_offset
+        return offset
+
+    def replay(self, from_sequence: int = 0, to_sequence: Optional[int] = None) -> Iterator[Tuple[int, Message]]:
+        """按顺序回放序号在 [from_sequence, to_sequence] 内的消息，返回 (序号, 消息)"""
+        self.flush()
+        starts = self._segment_starts()
+        for position, start in enumerate(starts):
+            next_start = starts[position + 1] if position + 1 < len(starts) else None
+            if next_start is not None and next_start <= from_sequence:
+                continue
+            if to_sequence is not None and start > to_sequence:
+                return
+
+            offset = self._seek_offset(start, from_sequence) if start < from_sequence else 0
+            # 从索引位置逐条读取（先读记录头，再读负载），不把整个段读入内存，消费方停止迭代时即可结束
+            with open(self._segment_path(start), 'rb') as f:
+                f.seek(offset)
+                while True:
+                    header = f.read(_RECORD_HEADER.size)
+                    if len(header) < _RECORD_HEADER.size:
+                        break
+                    length, sequence = _RECORD_HEADER.unpack(header)
+                    if to_sequence is not None and sequence > to_sequence:
+                        return
+                    if sequence < from_sequence:
+                        f.seek(length, os.SEEK_CUR)
+                        continue
+                    payload = f.read(length)
+                    if len(payload) < length:
+                        break
+                    try:
+                        yield sequence, decode_binary(payload)
+                    except CodecError as e:
+                        print(f"跳过损坏的日志记录 {sequence}: {str(e)}")
+
+    def close(self):
+        """提交剩余记录并关闭文件"""
+        self.is_running = False
+        with self._condition:
+            self._condition.notify()
+        if self._writer_thread.is_alive():
+            self._writer_thread.join(timeout=2)
+        self.flush()
+        with self._write_lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._index_file.close()
+                self._segment_file = None
+                self._index_file = None
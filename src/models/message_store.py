@@ -1,24 +1,69 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
 from .message import Message, MessageType
+from .message_batch import MessageBatch
+from .message_log import MessageLog
+from .user_index import UserAggregateIndex
+from .throughput import ThroughputMetrics
 import threading
 import time
 
 class MessageStore:
-    def __init__(self, ttl_seconds: int = 30):
+    def __init__(self, ttl_seconds: int = 30, lazy_expiry: bool = False, cleanup_interval: float = 1.0,
+                 message_log: Optional[MessageLog] = None, user_index: Optional[UserAggregateIndex] = None,
+                 throughput_history_seconds: int = 3600):
+        """
+        Args:
+            ttl_seconds: 消息保留时间
+            lazy_expiry: 为True时不启动清理线程，在读写时顺带清理过期消息
+            cleanup_interval: 后台清理间隔；每次只处理过期的消息，间隔越短持锁时间越短
+            message_log: 持久化日志；写入的消息同时追加到日志，过期后仍可按序号回放
+            user_index: 按用户累计的统计；每条新消息写入时同时更新，不随消息过期
+            throughput_history_seconds: 吞吐量统计保留的秒数，每种类型和每个直播间各一个环形缓冲区
+        """
         # 首先初始化线程锁
         self._lock = threading.Lock()
         
+        # 每种类型的消息按到达顺序保存，最早的在最前面，清理时只需要从头部弹出过期的消息；
+        # 过期按写入存储时记录的单调时钟判断，与消息自带的（采集端的）时间戳无关
         self.ttl_seconds = ttl_seconds
-        self.chat_messages: Dict[str, tuple[Message, datetime]] = {}
-        self.gift_messages: Dict[str, tuple[Message, datetime]] = {}
-        self.like_messages: Dict[str, tuple[Message, datetime]] = {}
-        self.enter_messages: Dict[str, tuple[Message, datetime]] = {}
+        self.lazy_expiry = lazy_expiry
+        self.cleanup_interval = cleanup_interval
+        self.chat_messages: "OrderedDict[str, Message]" = OrderedDict()
+        self.gift_messages: "OrderedDict[str, Message]" = OrderedDict()
+        self.like_messages: "OrderedDict[str, Message]" = OrderedDict()
+        self.enter_messages: "OrderedDict[str, Message]" = OrderedDict()
+        self._storages = {
+            MessageType.CHAT.value: self.chat_messages,
+            MessageType.GIFT.value: self.gift_messages,
+            MessageType.LIKE.value: self.like_messages,
+            MessageType.ENTER.value: self.enter_messages
+        }
+        # 与各类型存储中的消息一一对应的到达时间（time.monotonic()），顺序相同
+        self._arrivals: Dict[int, deque] = {type_code: deque() for type_code in self._storages}
+        
+        # 所有类型的消息按写入顺序排列的日志，第 i 条的序号为 _log_head_seq + i；
+        # 消费者各自保存读到的序号（游标），通过 read_since 只读取更新的消息
+        self._log = deque()
+        self._log_head_seq = 1
+        self.last_sequence = 0  # 最近写入的消息序号
+        
+        # 使用持久化日志时，序号接着日志中最后一条继续
+        self.message_log = message_log
+        if message_log is not None:
+            self.last_sequence = message_log.last_sequence
+            self._log_head_seq = message_log.last_sequence + 1
+        
+        self.user_index = user_index
+        
+        # 按到达时间的每秒计数，界面和指标导出通过 throughput 查询速率
+        self.throughput = ThroughputMetrics(throughput_history_seconds)
         
         # 启动清理线程
         self.is_running = True
-        self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
-        self.cleanup_thread.start()
+        if not lazy_expiry:
+            self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
+            self.cleanup_thread.start()
         
         print("消息存储系统已初始化")
     
@@ -26,32 +71,132 @@ class MessageStore:
         """添加新消息到存储"""
         try:
             with self._lock:
-                current_time = datetime.now()
-                
                 # 根据消息类型选择存储位置
-                if message.type == MessageType.CHAT:
-                    self.chat_messages[message.message_id] = (message, current_time)
-                elif message.type == MessageType.GIFT:
-                    self.gift_messages[message.message_id] = (message, current_time)
-                elif message.type == MessageType.LIKE:
-                    self.like_messages[message.message_id] = (message, current_time)
-                elif message.type == MessageType.ENTER:
-                    self.enter_messages[message.message_id] = (message, current_time)
+                storage = self._storages.get(message.type_code)
+                if storage is not None and self._store(storage, message):
+                    self.throughput.record(message)
+                if self.lazy_expiry:
+                    self._expire_locked()
         except Exception as e:
             print(f"添加消息失败: {str(e)}")
     
+    def add_batch(self, batch: MessageBatch) -> List[Message]:
+        """添加一批消息，整批只获取一次锁，返回新存入的消息（已存在的消息ID不包含在内）"""
+        stored = []
+        try:
+            with self._lock:
+                for index, type_code in enumerate(batch.type_codes):
+                    storage = self._storages.get(type_code)
+                    if storage is not None:
+                        message = batch.message_at(index)
+                        if self._store(storage, message):
+                            stored.append(message)
+                self.throughput.record_many(stored)
+                if self.lazy_expiry:
+                    self._expire_locked()
+        except Exception as e:
+            print(f"添加消息失败: {str(e)}")
+        return stored
+    
+    def _store(self, storage: "OrderedDict[str, Message]", message: Message) -> bool:
+        """写入消息并分配序号（需持有锁），返回是否为新的消息ID"""
+        message_id = message.message_id
+        # 重复的消息ID（无论是否为同一对象）保留最早到达的一条，不分配新序号，
+        # 游标读取的消费者因此不会收到同一条消息两次
+        if message_id in storage:
+            return False
+        if self.user_index is not None:
+            self.user_index.add(message)
+        storage[message_id] = message
+        self._arrivals[message.type_code].append(time.monotonic())
+        self._log.append(message)
+        self.last_sequence += 1
+        if self.message_log is not None:
+            self.message_log.append(self.last_sequence, message)
+        return True
+    
+    def _is_current(self, message: Message) -> bool:
+        """日志中的消息是否仍在存储中（未过期、未被同ID的新消息替换）"""
+        storage = self._storages.get(message.type_code)
+        return storage is not None and storage.get(message.message_id) is message
+    
+    def read_since(self, cursor: int = 0, types: Optional[Iterable[MessageType]] = None,
+                   limit: Optional[int] = None, replay_log: bool = False) -> Tuple[List[Message], int]:
+        """
+        读取序号大于cursor的消息
+        
+        新的消费者应从 last_sequence 开始读取，只接收之后写入的消息。
+        
+        Args:
+            cursor: 上次读取返回的游标，0表示从内存中最早的有效消息开始
+            types: 只返回这些类型的消息，None表示全部类型
+            limit: 最多返回的条数
+            replay_log: 为True时，游标之后已从内存中过期的消息从持久化日志中补读；
+                配合游标0会回放日志中的全部历史，只有需要完整历史的消费者才应使用
+        
+        Returns:
+            (消息列表, 下一次读取使用的游标)
+        """
+        entries, cursor = self.read_entries_since(cursor, types, limit, replay_log)
+        return [message for _, message in entries], cursor
+    
+    def read_entries_since(self, cursor: int = 0, types: Optional[Iterable[MessageType]] = None,
+                           limit: Optional[int] = None,
+                           replay_log: bool = False) -> Tuple[List[Tuple[int, Message]], int]:
+        """与 read_since 相同，但返回 (序号, 消息) 列表"""
+        type_codes = {message_type.value for message_type in types} if types is not None else None
+        entries = []
+        
+        # 游标之后的消息已从内存中过期时，先从持久化日志中补读
+        if replay_log and self.message_log is not None and cursor + 1 < self._log_head_seq:
+            try:
+                head_seq = self._log_head_seq
+                for sequence, message in self.message_log.replay(cursor + 1, head_seq - 1):
+                    if limit is not None and len(entries) >= limit:
+                        break
+                    cursor = sequence
+                    if type_codes is None or message.type_code in type_codes:
+                        entries.append((sequence, message))
+                else:
+                    cursor = max(cursor, head_seq - 1)
+                if limit is not None and len(entries) >= limit:
+                    return entries, cursor
+                limit = limit - len(entries) if limit is not None else None
+            except Exception as e:
+                print(f"从日志读取消息失败: {str(e)}")
+        
+        try:
+            with self._lock:
+                if self.lazy_expiry:
+                    self._expire_locked()
+                # 游标之前的消息已过期时从最早的有效消息开始
+                index = max(cursor + 1 - self._log_head_seq, 0)
+                found = 0
+                log_length = len(self._log)
+                while index < log_length:
+                    if limit is not None and found >= limit:
+                        break
+                    message = self._log[index]
+                    index += 1
+                    if type_codes is not None and message.type_code not in type_codes:
+                        continue
+                    if self._is_current(message):
+                        entries.append((self._log_head_seq + index - 1, message))
+                        found += 1
+                return entries, max(cursor, self._log_head_seq + index - 1)
+        except Exception as e:
+            print(f"读取消息失败: {str(e)}")
+        return entries, cursor
+    
     def get_messages(self, message_type: MessageType) -> List[Message]:
         """获取指定类型的所有有效消息"""
         try:
             with self._lock:
-                if message_type == MessageType.CHAT:
-                    return [msg for msg, _ in self.chat_messages.values()]
-                elif message_type == MessageType.GIFT:
-                    return [msg for msg, _ in self.gift_messages.values()]
-                elif message_type == MessageType.LIKE:
-                    return [msg for msg, _ in self.like_messages.values()]
-                elif message_type == MessageType.ENTER:
-                    return [msg for msg, _ in self.enter_messages.values()]
+                if self.lazy_expiry:
+                    self._expire_locked()
+                storage = self._storages.get(message_type.value)
+                if storage is not None:
+                    return list(storage.values())
         except Exception as e:
             print(f"获取消息失败: {str(e)}")
         return []
@@ -60,42 +205,41 @@ class MessageStore:
         """根据消息ID获取消息"""
         try:
             with self._lock:
+                if self.lazy_expiry:
+                    self._expire_locked()
                 # 在所有存储中查找消息
-                for storage in [self.chat_messages, self.gift_messages, 
-                              self.like_messages, self.enter_messages]:
+                for storage in self._storages.values():
                     if message_id in storage:
-                        return storage[message_id][0]
+                        return storage[message_id]
         except Exception as e:
             print(f"获取消息失败: {str(e)}")
         return None
     
+    def _expire_locked(self) -> int:
+        """从每种类型的头部弹出过期消息（需持有锁），只访问过期的条目"""
+        expiration = time.monotonic() - self.ttl_seconds
+        expired_count = 0
+        for type_code, storage in self._storages.items():
+            # 到达时间与存储顺序一致，头部最早
+            arrivals = self._arrivals[type_code]
+            while arrivals and arrivals[0] < expiration:
+                arrivals.popleft()
+                storage.popitem(last=False)
+                expired_count += 1
+        
+        # 日志头部已过期或被替换的消息一并移除
+        while self._log and not self._is_current(self._log[0]):
+            self._log.popleft()
+            self._log_head_seq += 1
+        return expired_count
+    
     def _cleanup_expired_messages(self):
         """清理过期消息"""
         try:
             with self._lock:
-                current_time = datetime.now()
-                expiration_time = current_time - timedelta(seconds=self.ttl_seconds)
-                
-                # 清理每个存储的过期消息
-                def cleanup_storage(storage: Dict[str, tuple[Message, datetime]]):
-                    expired_keys = [
-                        key for key, (_, timestamp) in storage.items()
-                        if timestamp < expiration_time
-                    ]
-                    for key in expired_keys:
-                        del storage[key]
-                    return len(expired_keys)
-                
-                # 清理所有存储
-                expired_count = sum([
-                    cleanup_storage(self.chat_messages),
-                    cleanup_storage(self.gift_messages),
-                    cleanup_storage(self.like_messages),
-                    cleanup_storage(self.enter_messages)
-                ])
-                
-                if expired_count > 0:
-                    print(f"已清理 {expired_count} 条过期消息")
+                expired_count = self._expire_locked()
+            if expired_count > 0:
+                print(f"已清理 {expired_count} 条过期消息")
         except Exception as e:
             print(f"清理消息失败: {str(e)}")
     
@@ -104,7 +248,7 @@ class MessageStore:
         while self.is_running:
             try:
                 self._cleanup_expired_messages()
-                time.sleep(1)  # 每秒检查一次
+                time.sleep(self.cleanup_interval)
             except Exception as e:
                 print(f"清理循环出错: {str(e)}")
                 time.sleep(5)  # 出错时等待更长时间
@@ -113,6 +257,8 @@ class MessageStore:
         """获取当前存储统计信息"""
         try:
             with self._lock:
+                if self.lazy_expiry:
+                    self._expire_locked()
                 return {
                     "chat": len(self.chat_messages),
                     "gift": len(self.gift_messages),
@@ -129,6 +275,8 @@ class MessageStore:
             self.is_running = False
             if hasattr(self, 'cleanup_thread') and self.cleanup_thread.is_alive():
                 self.cleanup_thread.join(timeout=2)  # 最多等待2秒
+            if self.message_log is not None:
+                self.message_log.close()
             print("消息存储系统已关闭")
         except Exception as e:
             print(f"关闭存储系统失败: {str(e)}") 
\ No newline at end of file
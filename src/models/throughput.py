@@ -0,0 +1,143 @@
+from array import array
+from typing import Dict, Iterable, List, Optional
+import threading
+import time
+
+from .message import Message, MessageType
+
+
+class RateCounter:
+    """
+    每秒计数的环形缓冲区
+
+    第 t 秒的计数保存在 t % history_seconds 槽位，同时记录槽位对应的秒数；
+    槽位被新的一秒复用时先清零，因此写入为O(1)，也不需要后台线程清理。
+    """
+
+    def __init__(self, history_seconds: int = 3600):
+        self.history_seconds = history_seconds
+        self._counts = array('l', [0]) * history_seconds
+        self._seconds = array('q', [-1]) * history_seconds
+        self.total = 0
+
+    def add(self, second: int, count: int = 1):
+        slot = second % self.history_seconds
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+        self._counts[slot] += count
+        self.total += count
+
+    def per_second(self, window_seconds: int, now_second: int) -> List[int]:
+        """最近window_seconds秒（不含正在计数的当前秒）每秒的计数，按时间先后排列"""
+        window_seconds = max(1, min(window_seconds, self.history_seconds - 1))
+        counts = []
+        for second in range(now_second - window_seconds, now_second):
+            slot = second % self.history_seconds
+            counts.append(self._counts[slot] if self._seconds[slot] == second else 0)
+        return counts
+
+
+def percentile(values: List[int], p: float) -> float:
+    """线性插值的百分位数，p取0~100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class ThroughputMetrics:
+    """
+    消息吞吐量统计
+
+    按消息类型、直播间和全部消息分别维护最近 history_seconds 秒的每秒计数，
+    可以查询任意窗口内的平均速率和每秒条数的百分位数。界面和指标导出都从这里读取。
+    """
+
+    def __init__(self, history_seconds: int = 3600):
+        self.history_seconds = history_seconds
+        self._total = RateCounter(history_seconds)
+        self._types: Dict[int, RateCounter] = {
+            message_type.value: RateCounter(history_seconds) for message_type in MessageType
+        }
+        self._rooms: Dict[str, RateCounter] = {}
+        self._lock = threading.Lock()
+
+    def record(self, message: Message, now: Optional[float] = None):
+        """记录一条消息，now为到达时间，默认取当前时间"""
+        self.record_many((message,), now)
+
+    def record_many(self, messages: Iterable[Message], now: Optional[float] = None):
+        """记录同一时刻到达的一批消息，先按类型和直播间汇总，每个计数器只更新一次"""
+        second = int(now if now is not None else time.time())
+        type_counts: Dict[int, int] = {}
+        room_counts: Dict[str, int] = {}
+        total = 0
+        for message in messages:
+            total += 1
+            type_code = message.type_code
+            type_counts[type_code] = type_counts.get(type_code, 0) + 1
+            room_id = message.room_id
+            if room_id:
+                room_counts[room_id] = room_counts.get(room_id, 0) + 1
+        if not total:
+            return
+        with self._lock:
+            self._total.add(second, total)
+            for type_code, count in type_counts.items():
+                counter = self._types.get(type_code)
+                if counter is not None:
+                    counter.add(second, count)
+            for room_id, count in room_counts.items():
+                counter = self._rooms.get(room_id)
+                if counter is None:
+                    counter = self._rooms[room_id] = RateCounter(self.history_seconds)
+                counter.add(second, count)
+
+    def _counter(self, message_type: Optional[MessageType], room_id: Optional[str]) -> Optional[RateCounter]:
+        if room_id is not None:
+            return self._rooms.get(room_id)
+        if message_type is not None:
+            return self._types.get(message_type.value)
+        return self._total
+
+    def per_second(self, window_seconds: int = 60, message_type: Optional[MessageType] = None,
+                   room_id: Optional[str] = None, now: Optional[float] = None) -> List[int]:
+        """最近window_seconds秒每秒的消息条数；指定room_id时按直播间统计，否则按类型（不指定则为全部）"""
+        now_second = int(now if now is not None else time.time())
+        with self._lock:
+            counter = self._counter(message_type, room_id)
+            if counter is None:
+                return [0] * max(1, window_seconds)
+            return counter.per_second(window_seconds, now_second)
+
+    def rate(self, window_seconds: int = 10, message_type: Optional[MessageType] = None,
+             room_id: Optional[str] = None, now: Optional[float] = None) -> float:
+        """最近window_seconds秒的平均速率（条/秒）"""
+        counts = self.per_second(window_seconds, message_type, room_id, now)
+        return sum(counts) / len(counts)
+
+    def percentile(self, p: float, window_seconds: int = 60, message_type: Optional[MessageType] = None,
+                   room_id: Optional[str] = None, now: Optional[float] = None) -> float:
+        """最近window_seconds秒内每秒条数的百分位数，例如 p=95 为峰值附近的速率"""
+        return percentile(self.per_second(window_seconds, message_type, room_id, now), p)
+
+    def rooms(self) -> List[str]:
+        with self._lock:
+            return list(self._rooms)
+
+    def get_summary(self, window_seconds: int = 10) -> Dict:
+        """各类型和各直播间在窗口内的速率，以及累计条数，供界面和指标导出使用"""
+        now = time.time()
+        return {
+            "window_seconds": window_seconds,
+            "rate": self.rate(window_seconds, now=now),
+            "p95": self.percentile(95, window_seconds, now=now),
+            "total": self._total.total,
+            "types": {message_type.name.lower(): self.rate(window_seconds, message_type, now=now)
+                      for message_type in MessageType},
+            "rooms": {room_id: self.rate(window_seconds, room_id=room_id, now=now) for room_id in self.rooms()}
+        }
@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import heapq
+import json
+import os
+import threading
+import time
+
+from .message import Message, MessageType
+
+USER_INDEX_VERSION = 1
+
+# 可用于排行的指标
+METRIC_GIFTS = "gifts"        # 送出礼物的总数量
+METRIC_MESSAGES = "messages"  # 消息总条数
+
+
+class UserStats:
+    """单个用户的累计统计"""
+
+    __slots__ = ('user_name', 'type_counts', 'gift_counts', 'gift_total', 'message_total',
+                 'first_seen_ms', 'last_seen_ms', 'ranked')
+
+    def __init__(self, user_name: str, first_seen_ms: int = 0):
+        self.user_name = user_name
+        self.type_counts = [0] * (max(message_type.value for message_type in MessageType) + 1)
+        self.gift_counts: Dict[str, int] = {}  # 礼物md5 -> 总数量
+        self.gift_total = 0
+        self.message_total = 0
+        self.first_seen_ms = first_seen_ms
+        self.last_seen_ms = first_seen_ms
+        self.ranked: Dict[str, int] = {}  # 指标 -> 最近一次放入排行堆的值
+
+    def value(self, metric: str) -> int:
+        return self.gift_total if metric == METRIC_GIFTS else self.message_total
+
+    def to_dict(self) -> dict:
+        return {
+            "user_name": self.user_name,
+            "type_counts": {message_type.name.lower(): self.type_counts[message_type.value]
+                            for message_type in MessageType},
+            "gift_counts": dict(self.gift_counts),
+            "gift_total": self.gift_total,
+            "message_total": self.message_total,
+            "first_seen_ms": self.first_seen_ms,
+            "last_seen_ms": self.last_seen_ms
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UserStats":
+        stats = cls(data["user_name"], data.get("first_seen_ms", 0))
+        for message_type in MessageType:
+            stats.type_counts[message_type.value] = data.get("type_counts", {}).get(message_type.name.lower(), 0)
+        stats.gift_counts = dict(data.get("gift_counts", {}))
+        stats.gift_total = data.get("gift_total", 0)
+        stats.message_total = data.get("message_total", 0)
+        stats.last_seen_ms = data.get("last_seen_ms", stats.first_seen_ms)
+        return stats
+
+
+class UserAggregateIndex:
+    """
+    按用户累计的消息统计
+
+    每条消息写入时O(1)更新该用户的各类型条数、各礼物数量和首次/最近出现时间。
+    用户按最近活跃顺序保存在OrderedDict中，超过 max_users 时淘汰最久未活跃的用户。
+    排行榜使用惰性堆：写入时只把用户记为待更新，查询时才把新值放入堆中，
+    弹出时跳过值已过期或已被淘汰的旧项，前k名查询为 O(k log n)。
+    """
+
+    def __init__(self, max_users: int = 50000):
+        self.max_users = max_users
+        self._users: "OrderedDict[str, UserStats]" = OrderedDict()
+        self._dirty = set()
+        self._heaps: Dict[str, List[Tuple[int, str]]] = {METRIC_GIFTS: [], METRIC_MESSAGES: []}
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def add(self, message: Message):
+        """累计一条消息"""
+        user_name = message.user_name
+        if not user_name:
+            return
+        timestamp_ms = message.timestamp_ms
+        with self._lock:
+            stats = self._users.get(user_name)
+            if stats is None:
+                stats = UserStats(user_name, timestamp_ms)
+                self._users[user_name] = stats
+                if len(self._users) > self.max_users:
+                    self._evict()
+            else:
+                self._users.move_to_end(user_name)
+            stats.type_counts[message.type_code] += 1
+            stats.message_total += 1
+            if message.type_code == MessageType.GIFT.value:
+                count = message.gift_count or 1
+                stats.gift_total += count
+                if message.gift_md5:
+                    stats.gift_counts[message.gift_md5] = stats.gift_counts.get(message.gift_md5, 0) + count
+            if timestamp_ms < stats.first_seen_ms:
+                stats.first_seen_ms = timestamp_ms
+            if timestamp_ms > stats.last_seen_ms:
+                stats.last_seen_ms = timestamp_ms
+            self._dirty.add(user_name)
+
+    def _evict(self):
+        """淘汰最久未活跃的用户（需持有锁）；堆中的旧项在查询时被跳过"""
+        while len(self._users) > self.max_users:
+            user_name, _ = self._users.popitem(last=False)
+            self._dirty.discard(user_name)
+            self.evicted += 1
+
+    def get(self, user_name: str) -> Optional[dict]:
+        """某个用户的累计统计，不存在时返回None"""
+        with self._lock:
+            stats = self._users.get(user_name)
+            return stats.to_dict() if stats is not None else None
+
+    def _refresh_heaps(self):
+        """把待更新用户的新值放入各排行堆（需持有锁）"""
+        for user_name in self._dirty:
+            stats = self._users[user_name]
+            for metric, heap in self._heaps.items():
+                value = stats.value(metric)
+                if value and stats.ranked.get(metric) != value:
+                    heapq.heappush(heap, (-value, user_name))
+                    stats.ranked[metric] = value
+        self._dirty.clear()
+
+        # 过期项太多时按当前值重建，堆的大小保持在用户数的常数倍
+        for metric, heap in self._heaps.items():
+            if len(heap) > 2 * len(self._users) + 1024:
+                rebuilt = []
+                for stats in self._users.values():
+                    value = stats.value(metric)
+                    if value:
+                        rebuilt.append((-value, stats.user_name))
+                    stats.ranked[metric] = value
+                heapq.heapify(rebuilt)
+                self._heaps[metric] = rebuilt
+
+    def top(self, k: int = 10, metric: str = METRIC_GIFTS) -> List[dict]:
+        """按指标排名的前k个用户"""
+        with self._lock:
+            self._refresh_heaps()
+            heap = self._heaps[metric]
+            result = []
+            popped = []
+            seen = set()
+            while heap and len(result) < k:
+                entry = heapq.heappop(heap)
+                negative_value, user_name = entry
+                stats = self._users.get(user_name)
+                # 用户已被淘汰、值已更新，或被淘汰后重新出现留下的重复项直接丢弃
+                if stats is None or stats.ranked.get(metric) != -negative_value or user_name in seen:
+                    continue
+                seen.add(user_name)
+                popped.append(entry)
+                result.append(stats.to_dict())
+            for entry in popped:
+                heapq.heappush(heap, entry)
+            return result
+
+    def save(self, path: str):
+        """保存快照到文件（先写临时文件再替换，避免写到一半时损坏）"""
+        with self._lock:
+            data = {
+                "version": USER_INDEX_VERSION,
+                "saved_at": time.time(),
+                "users": [stats.to_dict() for stats in self._users.values()]
+            }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def load(self, path: str) -> int:
+        """从快照加载，返回加载的用户数；文件不存在或版本不符时不加载"""
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != USER_INDEX_VERSION:
+            print(f"用户统计快照版本不符，忽略: {path}")
+            return 0
+
+        with self._lock:
+            # 快照按最近活跃顺序保存，依次写入即可恢复淘汰顺序
+            for user_data in data.get("users", []):
+                stats = UserStats.from_dict(user_data)
+                self._users[stats.user_name] = stats
+                self._users.move_to_end(stats.user_name)
+                self._dirty.add(stats.user_name)
+            self._evict()
+            return len(self._users)
+
+    def get_stats(self) -> Dict[str, int]:
+        """索引规模统计"""
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "evicted": self.evicted,
+                "pending": len(self._dirty),
+                "heap_entries": sum(len(heap) for heap in self._heaps.values())
+            }
@@ -1,13 +1,17 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, 
                              QScrollArea, QGridLayout, QFrame, QHBoxLayout,
                              QPushButton, QMessageBox, QSizePolicy)
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QPixmap, QImage, QFont, QPalette, QColor
 import json
 import os
+import threading
 import requests
 from datetime import datetime
 
+# 下载礼物图标的超时时间（秒）
+ICON_DOWNLOAD_TIMEOUT = 5
+
 class GiftCard(QFrame):
     """礼物卡片组件"""
     def __init__(self, image_path, md5, last_seen, count):
@@ -49,7 +53,7 @@ class GiftCard(QFrame):
         image_layout = QHBoxLayout()
         image_layout.setContentsMargins(2, 2, 2, 2)
         image_label = QLabel()
-        if os.path.exists(image_path):
+        if image_path and os.path.exists(image_path):
             pixmap = QPixmap(image_path)
             image_label.setPixmap(pixmap.scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation))
         image_label.setAlignment(Qt.AlignCenter)
@@ -125,10 +129,15 @@ class GiftCard(QFrame):
         self.setLayout(layout)
 
 class GiftStatsPanel(QWidget):
+    # 后台线程下载完礼物图标后发出，由界面线程刷新显示
+    icon_downloaded = Signal(str, bool)
+    
     def __init__(self):
         super().__init__()
         self.init_ui()
         self.gift_data = {}
+        self._downloading = set()  # 正在下载图标的礼物md5
+        self.icon_downloaded.connect(self.on_icon_downloaded)
         self.load_gift_data()
         
     def init_ui(self):
@@ -295,9 +304,9 @@ class GiftStatsPanel(QWidget):
             import traceback
             print(traceback.format_exc())
             
-    def add_gift(self, md5, image_url):
-        """添加新的礼物数据"""
-        if not md5 or not image_url:
+    def add_gift(self, md5, image_url=None, times=1):
+        """添加礼物数据；image_url为消息中携带的礼物图片地址，times为本次收到的次数"""
+        if not md5:
             print("无效的礼物数据")
             return
             
@@ -307,32 +316,25 @@ class GiftStatsPanel(QWidget):
         try:
             if md5 not in self.gift_data:
                 print(f"新礼物: {md5}")
-                # 下载图片
-                response = requests.get(image_url)
-                if response.status_code == 200:
-                    # 保存图片
-                    os.makedirs('gift_images', exist_ok=True)
-                    image_path = f'gift_images/{md5}.png'
-                    with open(image_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    # 更新数据
-                    self.gift_data[md5] = {
-                        'image_path': image_path,
-                        'last_seen': current_time,
-                        'count': 1,
-                        'total_count': 1
-                    }
-                    print(f"已保存新礼物图片: {image_path}")
-                else:
-                    print(f"下载礼物图片失败: {response.status_code}")
-                    return
+                self.gift_data[md5] = {
+                    'image_path': f'gift_images/{md5}.png',
+                    'last_seen': current_time,
+                    'count': times,
+                    'total_count': times
+                }
             else:
                 print(f"更新已有礼物: {md5}")
                 # 更新时间和计数
                 self.gift_data[md5]['last_seen'] = current_time
-                self.gift_data[md5]['count'] += 1
-                self.gift_data[md5]['total_count'] += 1
+                self.gift_data[md5]['count'] += times
+                self.gift_data[md5]['total_count'] += times
+            
+            # 图标还没有下载时在后台下载，先显示没有图标的卡片
+            if not os.path.exists(self.gift_data[md5].setdefault('image_path', f'gift_images/{md5}.png')):
+                if image_url:
+                    self.download_icon(md5, image_url)
+                else:
+                    print(f"礼物没有图片地址，暂不显示图标: {md5}")
             
             self.update_display()
             self.save_gift_data()
@@ -342,6 +344,37 @@ class GiftStatsPanel(QWidget):
             import traceback
             print(traceback.format_exc())
             
+    def download_icon(self, md5, image_url):
+        """在后台线程下载礼物图标，完成后通过icon_downloaded信号回到界面线程"""
+        if md5 in self._downloading:
+            return
+        self._downloading.add(md5)
+        image_path = self.gift_data[md5]['image_path']
+        
+        def download():
+            saved = False
+            try:
+                response = requests.get(image_url, timeout=ICON_DOWNLOAD_TIMEOUT)
+                if response.status_code == 200:
+                    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+                    with open(image_path, 'wb') as f:
+                        f.write(response.content)
+                    saved = True
+                    print(f"已保存新礼物图片: {image_path}")
+                else:
+                    print(f"下载礼物图片失败: {response.status_code}")
+            except Exception as e:
+                print(f"下载礼物图片失败: {str(e)}")
+            self.icon_downloaded.emit(md5, saved)
+            
+        threading.Thread(target=download, daemon=True).start()
+        
+    def on_icon_downloaded(self, md5, saved):
+        """礼物图标下载结束（界面线程）"""
+        self._downloading.discard(md5)
+        if saved:
+            self.update_display()
+            
     def update_display(self):
         """更新显示"""
         try:
@@ -366,14 +399,11 @@ class GiftStatsPanel(QWidget):
             )
             
             # 添加礼物卡片（堆叠显示）
+            # 图标尚未下载的礼物也显示，只是没有图片
             for row, (md5, data) in enumerate(sorted_gifts):
-                if not os.path.exists(data.get('image_path', '')):
-                    print(f"礼物图片不存在: {data.get('image_path', '未知路径')}")
-                    continue
-                    
                 try:
                     card = GiftCard(
-                        data['image_path'],
+                        data.get('image_path'),
                         md5,
                         data.get('last_seen', '未知时间'),
                         data.get('total_count', 0)
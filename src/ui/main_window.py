@@ -1,9 +1,12 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, 
-                           QPushButton, QLineEdit, QLabel, QMessageBox)
+                           QPushButton, QLineEdit, QLabel, QMessageBox, QComboBox,
+                           QCheckBox)
 from PySide6.QtCore import QThread, Signal
 from .message_panels import MessagePanel
 from .gift_stats_panel import GiftStatsPanel
 from ..models.message import MessageType
+from ..crawler.live_crawler import (MODE_SNAPSHOT, MODE_STREAM, MODE_NETWORK, MODE_HTML, MODE_ELEMENT,
+                                    PROFILE_FULL, PROFILE_LEAN)
 
 class MainWindow(QWidget):
     def __init__(self, message_store):
@@ -22,6 +25,25 @@ class MainWindow(QWidget):
         self.url_input = QLineEdit()
         self.url_input.setPlaceholderText("请输入抖音直播间链接")
         
+        # 采集模式选择
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("快照轮询", MODE_SNAPSHOT)
+        self.mode_combo.addItem("实时推送", MODE_STREAM)
+        self.mode_combo.addItem("网络帧解码", MODE_NETWORK)
+        self.mode_combo.addItem("HTML批量解析", MODE_HTML)
+        self.mode_combo.addItem("逐元素轮询", MODE_ELEMENT)
+        
+        # 浏览器配置选择
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItem("完整浏览器", PROFILE_FULL)
+        self.profile_combo.addItem("精简无头", PROFILE_LEAN)
+        
+        # 保持一个预热的浏览器，加快开始采集和切换直播间
+        self.warm_checkbox = QCheckBox("预热浏览器")
+        
+        # 定期输出浏览器CPU/内存占用
+        self.measure_checkbox = QCheckBox("统计资源")
+        
         # 控制按钮
         self.start_button = QPushButton("开始采集")
         self.stop_button = QPushButton("停止采集")
@@ -32,6 +54,10 @@ class MainWindow(QWidget):
         
         # 添加控件到控制栏
         control_layout.addWidget(self.url_input)
+        control_layout.addWidget(self.mode_combo)
+        control_layout.addWidget(self.profile_combo)
+        control_layout.addWidget(self.warm_checkbox)
+        control_layout.addWidget(self.measure_checkbox)
         control_layout.addWidget(self.start_button)
         control_layout.addWidget(self.stop_button)
         control_layout.addWidget(self.status_label)
@@ -73,7 +99,5 @@ class MainWindow(QWidget):
         
     def handle_gift_message(self, message):
         """处理礼物消息，更新礼物统计"""
-        if message.type == MessageType.GIFT and 'gift_md5' in message.raw_data:
-            md5 = message.raw_data['gift_md5']
-            if md5 and 'gift_image_url' in message.raw_data:
-                self.gift_stats_panel.add_gift(md5, message.raw_data['gift_image_url'])
\ No newline at end of file
+        if message.type == MessageType.GIFT and message.gift_md5:
+            self.gift_stats_panel.add_gift(message.gift_md5, message.gift_image_url)
\ No newline at end of file
@@ -25,9 +25,15 @@ class MessagePanel(QWidget):
         
     def add_message(self, message):
         """添加新消息到面板"""
+        self.add_messages([message])
+        
+    def add_messages(self, messages):
+        """一次性添加多条消息到面板"""
         try:
-            time_str = message.timestamp.strftime('%H:%M:%S')
-            formatted_message = f"[{time_str}] {message.user_name}: {message.content}\n"
+            formatted_message = "".join(
+                f"[{message.timestamp.strftime('%H:%M:%S')}] {message.user_name}: {message.content}\n"
+                for message in messages
+            )
             
             # 获取当前滚动条位置
             scrollbar = self.text_area.verticalScrollBar()